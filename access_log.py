@@ -0,0 +1,184 @@
+import asyncio
+import csv
+import io
+import os
+import time
+from log_segments import SEGMENT_GRACE_S
+
+OVERFLOW_POLICIES = ('drop', 'block')
+
+class AccessLogWriter:
+    """Batched CSV log writer. With segments (a log_segments.LogSegments) the live file is
+    rotated into compressed, indexed segments once it gets too large or too old."""
+
+    def __init__(self, path, fieldnames, max_queue_size=10000, batch_size=500,
+                 flush_interval_s=0.5, overflow_policy='drop', segments=None):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow_policy must be one of {OVERFLOW_POLICIES}, got {overflow_policy!r}")
+        self.path = path
+        self.fieldnames = fieldnames
+        self.max_queue_size = max_queue_size
+        self.batch_size = batch_size
+        self.flush_interval_s = flush_interval_s
+        self.overflow_policy = overflow_policy
+        self.segments = segments
+        self.written_entries = 0
+        self.dropped_entries = 0
+        self.failed_batches = 0
+        self.closed_segments = 0
+        self._queue = None
+        self._batch_ready = None
+        self._writer_task = None
+        self._file = None
+        self._closing = False
+        self._file_started_at = None
+        self._segment_tasks = set()
+
+    def _set_aside_mismatched_file(self):
+        with open(self.path, 'r', newline='') as f:
+            existing_header = next(csv.reader(f), [])
+        if existing_header != list(self.fieldnames):
+            root, ext = os.path.splitext(self.path)
+            archived_path = f"{root}.{int(time.time())}{ext}"
+            os.replace(self.path, archived_path)
+            print(f"Log columns changed; moved old log to {archived_path}", flush=True)
+
+    def prepare_file(self):
+        # Also called by the parent before forking workers, so only one process checks the header
+        if os.path.exists(self.path) and os.path.getsize(self.path) > 0:
+            self._set_aside_mismatched_file()
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            with open(self.path, 'w', newline='') as f:
+                csv.DictWriter(f, fieldnames=self.fieldnames).writeheader()
+
+    def _open_file(self):
+        self.prepare_file()
+        if self.segments is not None:
+            self._file_started_at = self.segments.live_file_started_at()
+        return open(self.path, 'a', newline='')
+
+    def _reopen_file(self):
+        self._file.close()
+        self._file = self._open_file()
+
+    def _rotated_elsewhere(self):
+        # With --workers another process may have moved the live file into a segment
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def _rotate(self):
+        with self.segments.locked():
+            segment_path = None if self._rotated_elsewhere() else self.segments.close_live_file()
+            self._reopen_file()
+        return segment_path
+
+    def _write_rows(self, rows):
+        """Append rows; returns the path of the segment this closed, if the write triggered a rotation."""
+        if self.segments is not None and self._rotated_elsewhere():
+            self._reopen_file()
+        # One write() per batch keeps appends from several processes from interleaving mid-row
+        buffer = io.StringIO()
+        csv.DictWriter(buffer, fieldnames=self.fieldnames).writerows(rows)
+        self._file.write(buffer.getvalue())
+        self._file.flush()
+        if self.segments is not None and self.segments.rotation_due(os.fstat(self._file.fileno()).st_size,
+                                                                    self._file_started_at):
+            return self._rotate()
+        return None
+
+    def _finish_segment_later(self, segment_path):
+        task = asyncio.create_task(self._finish_segment(segment_path))
+        self._segment_tasks.add(task)
+        task.add_done_callback(self._segment_tasks.discard)
+
+    async def _finish_segment(self, segment_path):
+        await asyncio.sleep(SEGMENT_GRACE_S) # Lets appends already in flight from other workers land first
+        try:
+            entry = await asyncio.get_running_loop().run_in_executor(None, self.segments.finish_segment, segment_path)
+        except Exception as segment_err:
+            print(f"Compressing log segment {segment_path} failed: {segment_err}", flush=True)
+            return
+        if entry is not None:
+            self.closed_segments += 1
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._batch_ready = asyncio.Event()
+        self._closing = False
+        loop = asyncio.get_running_loop()
+        self._file = await loop.run_in_executor(None, self._open_file)
+        self._writer_task = asyncio.create_task(self._run())
+        if self.segments is not None:
+            for segment_path in await loop.run_in_executor(None, self.segments.pending_segments):
+                self._finish_segment_later(segment_path) # Left over from a run that stopped mid-rotation
+
+    def submit_nowait(self, entry):
+        # For callers outside a coroutine; always drops on overflow regardless of overflow_policy
+        if self._queue is None:
+            self.dropped_entries += 1
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped_entries += 1
+            return
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+
+    async def submit(self, entry):
+        if self.overflow_policy != 'block' or self._queue is None:
+            self.submit_nowait(entry)
+            return
+        await self._queue.put(entry)
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+
+    def _drain_batch(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_ready.wait(), self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._batch_ready.clear()
+
+            batch = self._drain_batch()
+            while batch:
+                try:
+                    segment_path = await loop.run_in_executor(None, self._write_rows, batch)
+                    self.written_entries += len(batch)
+                    if segment_path is not None:
+                        self._finish_segment_later(segment_path)
+                except Exception as log_err:
+                    self.failed_batches += 1
+                    print(f"Log write failed ({len(batch)} entries): {log_err}", flush=True)
+                batch = self._drain_batch()
+
+            if self._closing and self._queue.empty():
+                return
+
+    async def close(self):
+        if self._writer_task is None:
+            return
+        self._closing = True
+        self._batch_ready.set()
+        await self._writer_task
+        self._writer_task = None
+        if self._segment_tasks:
+            await asyncio.gather(*self._segment_tasks)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._file.close)
+        self._file = None
+        segments_note = f", {self.closed_segments} segments closed" if self.segments is not None else ""
+        print(f"Closed {self.path}: {self.written_entries} written, {self.dropped_entries} dropped{segments_note}", flush=True)
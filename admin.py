@@ -0,0 +1,30 @@
+import hmac
+from aiohttp import web
+
+ADMIN_PATH_PREFIX = '/admin/'
+ADMIN_TOKEN_ENV = 'PROXY_ADMIN_TOKEN'
+
+def admin_auth_middleware(token):
+    """Require `Authorization: Bearer <token>` on /admin/ routes. Without a configured token
+    they are refused outright, so the admin API is off unless explicitly enabled."""
+
+    @web.middleware
+    async def check_admin_token(request, handler):
+        if request.path.startswith(ADMIN_PATH_PREFIX):
+            if not token:
+                raise web.HTTPForbidden(text=f"Admin API disabled; set {ADMIN_TOKEN_ENV} to enable it")
+            supplied = request.headers.get('Authorization', '').encode('utf-8')
+            if not hmac.compare_digest(supplied, f"Bearer {token}".encode('utf-8')):
+                raise web.HTTPUnauthorized(text="Invalid admin token", headers={'WWW-Authenticate': 'Bearer'})
+        return await handler(request)
+
+    return check_admin_token
+
+async def read_json_object(request):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(text="Request body must be JSON")
+    if not isinstance(body, dict):
+        raise web.HTTPBadRequest(text="Request body must be a JSON object")
+    return body
@@ -0,0 +1,109 @@
+import asyncio
+import collections
+import time
+
+class BackendOverloaded(Exception):
+    """Raised instead of queueing a request when its backend is saturated."""
+
+    def __init__(self, backend_url, reason, retry_after_s):
+        super().__init__(f"{backend_url} overloaded ({reason})")
+        self.backend_url = backend_url
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+
+class BackendAdmission:
+    def __init__(self):
+        self.active = 0
+        self.waiters = collections.deque() # Futures of queued requests, oldest first
+        self.last_empty_at = time.monotonic()
+        self.admitted = 0
+        self.queued = 0
+        self.shed = collections.Counter()
+
+class AdmissionController:
+    """Per-backend concurrency limit with a bounded FIFO wait queue and controlled-delay shedding.
+
+    Up to max_concurrency requests per backend run at once; the rest wait in a queue of at most
+    max_queue. While a backend's queue keeps draining, a waiter may sit for up to interval_s.
+    Once the queue has not been empty for interval_s the backend is treated as overloaded and
+    waits are cut to target_s (CoDel-style), so a standing queue is shed quickly instead of
+    turning into timeouts. Queue-full and queue-timeout rejections raise BackendOverloaded.
+    """
+
+    def __init__(self, max_concurrency=64, max_queue=256, target_s=0.01, interval_s=0.1, retry_after_s=1):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.target_s = target_s
+        self.interval_s = interval_s
+        self.retry_after_s = retry_after_s
+        self.backends = {}
+
+    def _state_for(self, url):
+        state = self.backends.get(url)
+        if state is None:
+            state = self.backends[url] = BackendAdmission()
+        return state
+
+    def _shed(self, url, state, reason):
+        state.shed[reason] += 1
+        raise BackendOverloaded(url, reason, self.retry_after_s)
+
+    async def acquire(self, url):
+        """Wait for a slot on url and return the time spent queueing in ms."""
+        state = self._state_for(url)
+        if state.active < self.max_concurrency and not state.waiters:
+            state.active += 1
+            state.admitted += 1
+            state.last_empty_at = time.monotonic()
+            return 0
+        if len(state.waiters) >= self.max_queue:
+            self._shed(url, state, 'queue_full')
+
+        enqueued_at = time.monotonic()
+        overloaded = enqueued_at - state.last_empty_at > self.interval_s
+        waiter = asyncio.get_running_loop().create_future()
+        state.waiters.append(waiter)
+        state.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.target_s if overloaded else self.interval_s)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                state.waiters.remove(waiter)
+                self._note_if_empty(state)
+                self._shed(url, state, 'queue_timeout')
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release(url) # The slot was handed over just as the client went away
+            else:
+                state.waiters.remove(waiter)
+                self._note_if_empty(state)
+            raise
+        # release() handed this waiter its slot, so active already counts it
+        state.admitted += 1
+        return round((time.monotonic() - enqueued_at) * 1000)
+
+    def release(self, url):
+        state = self._state_for(url)
+        while state.waiters:
+            waiter = state.waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None) # Hand the slot straight to the oldest waiter
+                self._note_if_empty(state)
+                return
+        state.active -= 1
+        self._note_if_empty(state)
+
+    def _note_if_empty(self, state):
+        if not state.waiters:
+            state.last_empty_at = time.monotonic()
+
+    def snapshot(self):
+        return {
+            url: {'active': state.active, 'queued_now': len(state.waiters), 'admitted': state.admitted,
+                  'queued': state.queued, 'shed': dict(state.shed)}
+            for url, state in self.backends.items()
+        }
+
+    def summary(self):
+        return " ".join(f"{url}: admitted={state.admitted} queued={state.queued} "
+                        f"shed={sum(state.shed.values())}" for url, state in self.backends.items())
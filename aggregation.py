@@ -0,0 +1,62 @@
+import pandas as pd
+
+class RollingLatencyState:
+    """What the per-backend SMA/EWMA looked like after the last processed row, carried between batches."""
+
+    def __init__(self):
+        self.recent_latencies = {} # port -> last sma_window valid latencies
+        self.sma = {}
+        self.ewma = {}
+
+    def backends(self):
+        return sorted(set(self.sma) | set(self.ewma))
+
+def rolling_backend_latencies(df, sma_window, ewma_alpha, state=None):
+    """Per-row SMA and EWMA of every backend, as the proxy saw them just before that row was logged.
+
+    df must be in log order with 'backend_port' and 'latency_ms' columns. Each backend's
+    series is computed with one rolling()/ewm() call, seeded from state so that a log read
+    in batches gives the same values as one read all at once. Returns (sma_before,
+    ewma_before, state): two DataFrames indexed like df with one column per backend, and
+    the updated state. Non-positive latencies are skipped, as in record_backend_performance.
+    """
+    state = state if state is not None else RollingLatencyState()
+    valid = df[df['latency_ms'] > 0]
+    sma_after = {}
+    ewma_after = {}
+    for port, latencies in valid.groupby('backend_port', sort=False)['latency_ms']:
+        latencies = latencies.astype(float)
+        carried = state.recent_latencies.get(port, [])
+        series = pd.concat([pd.Series(carried, dtype=float), latencies], ignore_index=True)
+        sma = series.rolling(sma_window, min_periods=1).mean().iloc[len(carried):]
+        sma.index = latencies.index
+
+        seed = state.ewma.get(port)
+        if seed is None:
+            ewma = latencies.ewm(alpha=ewma_alpha, adjust=False).mean() # First sample seeds the EWMA, as in the proxy
+        else:
+            ewma = pd.concat([pd.Series([seed]), latencies], ignore_index=True) \
+                .ewm(alpha=ewma_alpha, adjust=False).mean().iloc[1:]
+            ewma.index = latencies.index
+
+        sma_after[port] = sma
+        ewma_after[port] = ewma
+        state.recent_latencies[port] = series.iloc[-sma_window:].tolist()
+
+    backends = sorted(set(state.backends()) | set(sma_after))
+    sma_before = values_before_each_row(df.index, sma_after, state.sma, backends)
+    ewma_before = values_before_each_row(df.index, ewma_after, state.ewma, backends)
+    for port in sma_after:
+        state.sma[port] = sma_after[port].iloc[-1]
+        state.ewma[port] = ewma_after[port].iloc[-1]
+    return sma_before, ewma_before, state
+
+def values_before_each_row(index, values_after, previous, backends):
+    # Forward-fill each backend's value across the rows of other backends, then shift by one
+    # row so every row shows the state from before its own latency was recorded.
+    after = pd.DataFrame(values_after, index=index, columns=backends)
+    seed_row = pd.DataFrame([{port: previous.get(port) for port in backends}], columns=backends, dtype=float)
+    filled = pd.concat([seed_row, after.reset_index(drop=True)], ignore_index=True).ffill()
+    before = filled.iloc[:-1]
+    before.index = index
+    return before
@@ -0,0 +1,141 @@
+import itertools
+import json
+import os
+import random
+
+DEFAULT_BODY_BYTES = 0 # Just the greeting line
+DEFAULT_ERROR_STATUS = 500
+DEFAULT_HANG_S = 300.0
+MAX_BODY_BYTES = 64 * 1024 * 1024
+
+# The original fixed cycles, kept as the default profiles so A/B/C behave as before
+LEGACY_PROFILES = {
+    'A': {'latency': {'type': 'cycle', 'values_ms': [10, 15, 20, 400, 400, 400, 10, 15, 20]}},
+    'B': {'latency': {'type': 'cycle', 'values_ms': [200]}},
+    'C': {'latency': {'type': 'cycle', 'values_ms': [250]}},
+}
+
+class LatencyDistribution:
+    """Draws per-request latencies in ms from a spec such as
+    {"type": "lognormal", "median_ms": 80, "sigma": 0.5}.
+
+    Types: fixed (ms), cycle (values_ms), uniform (min_ms, max_ms), exponential (mean_ms),
+    lognormal (median_ms, sigma), bimodal (fast, slow, slow_probability — each a nested
+    spec) and pareto (scale_ms, shape) for heavy tails. Any spec may set max_ms to cap samples.
+    """
+
+    def __init__(self, spec, rng):
+        self.spec = spec
+        self.kind = spec.get('type', 'fixed')
+        self.rng = rng
+        self.max_ms = spec.get('max_ms')
+        if self.kind == 'cycle':
+            self._cycle = itertools.cycle(spec['values_ms'])
+        elif self.kind == 'bimodal':
+            self._fast = LatencyDistribution(spec['fast'], rng)
+            self._slow = LatencyDistribution(spec['slow'], rng)
+        elif self.kind not in ('fixed', 'uniform', 'exponential', 'lognormal', 'pareto'):
+            raise ValueError(f"Unknown latency distribution type: {self.kind}")
+
+    def sample_ms(self):
+        spec = self.spec
+        if self.kind == 'fixed':
+            latency_ms = spec['ms']
+        elif self.kind == 'cycle':
+            latency_ms = next(self._cycle)
+        elif self.kind == 'uniform':
+            latency_ms = self.rng.uniform(spec['min_ms'], spec['max_ms'])
+        elif self.kind == 'exponential':
+            latency_ms = self.rng.expovariate(1.0 / spec['mean_ms'])
+        elif self.kind == 'lognormal':
+            latency_ms = spec['median_ms'] * self.rng.lognormvariate(0.0, spec.get('sigma', 0.5))
+        elif self.kind == 'bimodal':
+            slow = self.rng.random() < spec.get('slow_probability', 0.1)
+            latency_ms = (self._slow if slow else self._fast).sample_ms()
+        else:
+            latency_ms = spec['scale_ms'] * self.rng.paretovariate(spec.get('shape', 1.5))
+        if self.max_ms is not None:
+            latency_ms = min(latency_ms, self.max_ms)
+        return max(0.0, latency_ms)
+
+class BackendProfile:
+    """How one simulated backend behaves.
+
+    latency: a LatencyDistribution spec. Under load each extra concurrent request adds
+    latency_per_inflight_ms, and with capacity set only that many requests are served at
+    once while the rest queue. body_bytes pads the response to a fixed size or {"min": .., "max": ..}.
+    error_rate returns error_status, hang_rate holds the request open for hang_s.
+    phases schedule degradation relative to server start, e.g.
+    {"start_s": 30, "duration_s": 20, "latency_multiplier": 4, "error_rate": 0.1};
+    a phase may also replace latency, latency_per_inflight_ms, error_rate or hang_rate.
+    With phase_cycle_s set the schedule repeats.
+    """
+
+    def __init__(self, name, spec):
+        self.name = name
+        self.spec = spec
+        self.rng = random.Random(spec.get('seed'))
+        self.latency = LatencyDistribution(spec.get('latency', {'type': 'fixed', 'ms': 100}), self.rng)
+        self.latency_per_inflight_ms = spec.get('latency_per_inflight_ms', 0.0)
+        self.capacity = spec.get('capacity')
+        self.body_bytes = spec.get('body_bytes', DEFAULT_BODY_BYTES)
+        self.error_rate = spec.get('error_rate', 0.0)
+        self.error_status = spec.get('error_status', DEFAULT_ERROR_STATUS)
+        self.hang_rate = spec.get('hang_rate', 0.0)
+        self.hang_s = spec.get('hang_s', DEFAULT_HANG_S)
+        self.phases = spec.get('phases', [])
+        self.phase_cycle_s = spec.get('phase_cycle_s')
+        # Phase latency overrides are built once so cycle distributions keep their position
+        self._phase_latencies = [
+            LatencyDistribution(phase['latency'], self.rng) if 'latency' in phase else None
+            for phase in self.phases
+        ]
+
+    def active_phase(self, elapsed_s):
+        if self.phase_cycle_s:
+            elapsed_s %= self.phase_cycle_s
+        for index, phase in enumerate(self.phases):
+            start_s = phase.get('start_s', 0.0)
+            if start_s <= elapsed_s < start_s + phase.get('duration_s', float('inf')):
+                return index, phase
+        return None, {}
+
+    def plan_request(self, elapsed_s, in_flight):
+        """Decide what the next request gets: ('hang', seconds), ('error', status, latency_ms)
+        or ('ok', latency_ms, body_bytes). in_flight counts the other requests being served."""
+        index, phase = self.active_phase(elapsed_s)
+        if self.rng.random() < phase.get('hang_rate', self.hang_rate):
+            return ('hang', self.hang_s)
+
+        latency = self._phase_latencies[index] if index is not None and self._phase_latencies[index] else self.latency
+        latency_ms = latency.sample_ms() * phase.get('latency_multiplier', 1.0)
+        latency_ms += in_flight * phase.get('latency_per_inflight_ms', self.latency_per_inflight_ms)
+
+        if self.rng.random() < phase.get('error_rate', self.error_rate):
+            return ('error', self.error_status, latency_ms)
+        return ('ok', latency_ms, self.sample_body_bytes())
+
+    def sample_body_bytes(self):
+        if isinstance(self.body_bytes, dict):
+            size = self.rng.randint(self.body_bytes.get('min', 0), self.body_bytes['max'])
+        else:
+            size = self.body_bytes
+        return min(int(size), MAX_BODY_BYTES)
+
+def load_profile_specs(path=None):
+    """Profile specs by backend name: LEGACY_PROFILES, overridden by the JSON file at path
+    (or $BACKEND_PROFILES) and then by inline JSON in $BACKEND_PROFILE for $SERVER_ID."""
+    specs = dict(LEGACY_PROFILES)
+    path = path or os.environ.get('BACKEND_PROFILES')
+    if path:
+        with open(path) as profile_file:
+            specs.update(json.load(profile_file))
+    inline = os.environ.get('BACKEND_PROFILE')
+    if inline:
+        specs[os.environ.get('SERVER_ID', 'A')] = json.loads(inline)
+    return specs
+
+def profile_for(name, specs):
+    # Unknown names fall back to the 'default' entry if the file has one, else to A as before
+    spec = specs.get(name, specs.get('default', LEGACY_PROFILES['A']))
+    return BackendProfile(name, spec)
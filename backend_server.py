@@ -1,53 +1,121 @@
 import os
+import argparse
 import asyncio
-import itertools
+import string
+import time
 from aiohttp import web
 
+from backend_profiles import load_profile_specs, profile_for
+
 CONFIG_KEY = 'server_config'
+BODY_FILLER = b'x' * (1024 * 1024)
 
-LATENCY_CONFIG = {
-    'A': [
-        10, 15, 20,
-        400, 400, 400,
-        10, 15, 20,
-    ] * 5,
-    'B': [
-        200, 200, 200,
-        200, 200, 200,
-        200, 200, 200,
-    ] * 5,
-    'C': [
-        250, 250, 250,
-        250, 250, 250,
-        250, 250, 250,
-    ] * 5,
-}
+def build_body(greeting, body_bytes):
+    body = greeting.encode()
+    missing = body_bytes - len(body)
+    if missing <= 0:
+        return body
+    full_chunks, remainder = divmod(missing, len(BODY_FILLER))
+    return b''.join([body, *([BODY_FILLER] * full_chunks), BODY_FILLER[:remainder]])
 
 async def handle_request(request):
     config = request.app[CONFIG_KEY]
     server_id = config['server_id']
-    latency_ms = next(config['latency_cycle'])
-    await asyncio.sleep(latency_ms / 1000.0)
-    return web.Response(text=f"Hello from {server_id} – simulated {latency_ms}ms\n")
+    profile = config['profile']
+    capacity = config['capacity']
+    if capacity is not None:
+        await capacity.acquire() # Requests beyond the profile's capacity queue here
+    config['in_flight'] += 1
+    try:
+        elapsed_s = time.monotonic() - config['started_at']
+        plan = profile.plan_request(elapsed_s, config['in_flight'] - 1)
+        if plan[0] == 'hang':
+            await asyncio.sleep(plan[1])
+            return web.Response(text=f"Hello from {server_id} – hung for {plan[1]:.0f}s\n")
+        if plan[0] == 'error':
+            _, status, latency_ms = plan
+            await asyncio.sleep(latency_ms / 1000.0)
+            return web.Response(status=status, text=f"Simulated failure from {server_id}\n")
+        _, latency_ms, body_bytes = plan
+        await asyncio.sleep(latency_ms / 1000.0)
+        greeting = f"Hello from {server_id} – simulated {latency_ms:.0f}ms\n"
+        return web.Response(body=build_body(greeting, body_bytes), content_type='text/plain')
+    finally:
+        config['in_flight'] -= 1
+        if capacity is not None:
+            capacity.release()
 
-async def initialize_server_config(app):
-    server_id = os.environ.get('SERVER_ID', 'A')
-    port = int(os.environ.get('PORT', 8080))
-    latencies = LATENCY_CONFIG.get(server_id, LATENCY_CONFIG['A'])
-    app[CONFIG_KEY] = {
+async def handle_health_check(request):
+    return web.Response(text="OK\n")
+
+def create_server_config(server_id, port, profile_specs):
+    profile = profile_for(server_id, profile_specs)
+    return {
         'server_id': server_id,
         'port': port,
-        'latency_cycle': itertools.cycle(latencies)
+        'profile': profile,
+        'capacity': asyncio.Semaphore(profile.capacity) if profile.capacity else None,
+        'in_flight': 0,
+        'started_at': time.monotonic(),
     }
+
+async def initialize_server_config(app):
+    server_id = os.environ.get('SERVER_ID', 'A')
+    port = int(os.environ.get('PORT', 8080))
+    app[CONFIG_KEY] = create_server_config(server_id, port, load_profile_specs())
     print(f"● Server {server_id} starting on port {port}")
 
-def setup_app_routes():
+def setup_app_routes(server_config=None):
     app = web.Application()
-    app.on_startup.append(initialize_server_config)
+    if server_config is None:
+        app.on_startup.append(initialize_server_config)
+    else:
+        app[CONFIG_KEY] = server_config
     app.router.add_get('/', handle_request)
+    app.router.add_get('/health', handle_health_check)
     return app
 
+def backend_names(count, names=None):
+    names = list(names or [])
+    for index in range(len(names), count):
+        names.append(string.ascii_uppercase[index] if index < 26 else f"S{index + 1}")
+    return names[:count]
+
+async def run_simulated_backends(count, base_port, host, profiles_path=None, names=None):
+    """Serve count simulated backends from this one process on base_port, base_port + 1, ..."""
+    profile_specs = load_profile_specs(profiles_path)
+    runners = []
+    for index, server_id in enumerate(backend_names(count, names)):
+        port = base_port + index
+        server_config = create_server_config(server_id, port, profile_specs)
+        runner = web.AppRunner(setup_app_routes(server_config), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port, reuse_address=True).start()
+        runners.append(runner)
+        print(f"● Server {server_id} starting on port {port}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
 if __name__ == '__main__':
-    app_port = int(os.environ.get('PORT', 8080))
-    application = setup_app_routes()
-    web.run_app(application, host='0.0.0.0', port=app_port)
+    parser = argparse.ArgumentParser(description="Simulated backend server(s)")
+    parser.add_argument('--count', type=int, default=None,
+                        help="Start this many backends in one process instead of one from SERVER_ID/PORT")
+    parser.add_argument('--base-port', type=int, default=8081)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--profiles', default=None, help="JSON file of backend profiles (default: $BACKEND_PROFILES)")
+    parser.add_argument('--names', nargs='+', default=None, help="Backend names to look up in the profiles (default: A, B, C, ...)")
+    arguments = parser.parse_args()
+
+    if arguments.count is None:
+        app_port = int(os.environ.get('PORT', 8080))
+        application = setup_app_routes()
+        web.run_app(application, host=arguments.host, port=app_port)
+    else:
+        try:
+            asyncio.run(run_simulated_backends(arguments.count, arguments.base_port, arguments.host,
+                                               arguments.profiles, arguments.names))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import tempfile
+import time
+
+import numpy as np
+from aiohttp import ClientSession, TCPConnector
+
+from processes import PROXY_PORT, start_backends, start_proxy, stop_process
+
+PROXY_URL = f"http://127.0.0.1:{PROXY_PORT}/"
+
+async def first_requests(burst_size):
+    """Latency of the first burst_size requests sent to a freshly started proxy, all at once."""
+    async with ClientSession(connector=TCPConnector(limit=0)) as session:
+        async def timed_get():
+            sent_at = time.monotonic()
+            try:
+                async with session.get(PROXY_URL) as response:
+                    await response.read()
+                    succeeded = response.status == 200
+            except Exception:
+                succeeded = False
+            return (time.monotonic() - sent_at) * 1000, succeeded
+        results = await asyncio.gather(*(timed_get() for _ in range(burst_size)))
+    latencies_ms = [latency_ms for latency_ms, succeeded in results if succeeded]
+    return latencies_ms, len(results) - len(latencies_ms)
+
+def measure_cold_start(mode, prewarm, burst_size, runs, work_dir):
+    latencies_ms = []
+    errors = 0
+    for _ in range(runs):
+        proxy = start_proxy('persistent_proxy_server.py', mode, work_dir, ['--prewarm', str(prewarm)])
+        try:
+            run_latencies_ms, run_errors = asyncio.run(first_requests(burst_size))
+        finally:
+            stop_process(proxy)
+        latencies_ms.extend(run_latencies_ms)
+        errors += run_errors
+    return latencies_ms, errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare first-request latency of the persistent proxy with and without pre-warmed backend pools")
+    parser.add_argument('--mode', default='round-robin')
+    parser.add_argument('--prewarm', type=int, default=4, help="Connections pre-warmed per backend in the warm run")
+    parser.add_argument('--burst', type=int, default=12, help="Concurrent requests sent right after the proxy starts")
+    parser.add_argument('--runs', type=int, default=5, help="Proxy restarts per configuration")
+    parser.add_argument('--profiles', help="Backend profile file; use a low-latency profile to isolate the handshake cost")
+    arguments = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench_cold_start_') # Keeps the benchmark's proxy_log.csv out of the project
+    backends = start_backends(arguments.profiles)
+    try:
+        results = []
+        for label, prewarm in (('cold', 0), ('prewarmed', arguments.prewarm)):
+            latencies_ms, errors = measure_cold_start(arguments.mode, prewarm, arguments.burst, arguments.runs, work_dir)
+            results.append((label, prewarm, latencies_ms, errors))
+            print(f"{label} (--prewarm {prewarm}) done: {len(latencies_ms)} ok, {errors} errors", flush=True)
+    finally:
+        for backend in backends:
+            stop_process(backend)
+
+    print("\npool        p50 ms    p99 ms    max ms    errors")
+    for label, prewarm, latencies_ms, errors in results:
+        if not latencies_ms:
+            print(f"{label:<11} {'-':<9} {'-':<9} {'-':<9} {errors}")
+            continue
+        p50, p99 = np.percentile(latencies_ms, [50, 99])
+        print(f"{label:<11} {p50:<9.2f} {p99:<9.2f} {max(latencies_ms):<9.2f} {errors}")
+
+if __name__ == '__main__':
+    main()
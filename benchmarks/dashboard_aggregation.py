@@ -0,0 +1,79 @@
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from aggregation import rolling_backend_latencies
+from dashboard import prepare_sma_table_entries, table_page, SMA_WINDOW, EWMA_ALPHA
+
+def synthetic_log(rows, backends, seed=0):
+    rng = np.random.default_rng(seed)
+    ports = [str(8081 + i) for i in range(backends)]
+    latencies = rng.gamma(2.0, 60.0, rows).round()
+    latencies[rng.random(rows) < 0.01] = -1 # Failed requests are logged with -1
+    return pd.DataFrame({
+        'timestamp': pd.Timestamp('2026-01-01') + pd.to_timedelta(np.arange(rows) * 2, unit='ms'),
+        'backend_port': rng.choice(ports, rows),
+        'latency_ms': latencies,
+        'routing_mode': 'adaptive_ewma',
+    })
+
+def legacy_sma_table(df_all_entries):
+    """The iterrows-based table this benchmark replaced: latest SMA per hardcoded port on every row."""
+    df_valid_latency = df_all_entries[df_all_entries['latency_ms'] > 0]
+    latest_smas = {}
+    for port, group_data in df_valid_latency.groupby('backend_port')['latency_ms']:
+        latest_smas[port] = group_data.rolling(3, min_periods=1).mean().iloc[-1]
+    table_entries = []
+    for _, row in df_all_entries.iterrows():
+        table_entries.append({
+            'timestamp': row['timestamp'].strftime('%H:%M:%S.%f')[:-3],
+            'chosen': row['backend_port'],
+            'latency_ms': int(row['latency_ms']) if pd.notna(row['latency_ms']) else 'ERR',
+            'smaA': round(latest_smas.get('8081', float('nan')), 1) if pd.notna(latest_smas.get('8081')) else 'N/A',
+            'smaB': round(latest_smas.get('8082', float('nan')), 1) if pd.notna(latest_smas.get('8082')) else 'N/A',
+            'smaC': round(latest_smas.get('8083', float('nan')), 1) if pd.notna(latest_smas.get('8083')) else 'N/A',
+        })
+    return table_entries
+
+def vectorized_sma_table(df, page_size):
+    sma_before, ewma_before, state = rolling_backend_latencies(df, SMA_WINDOW, EWMA_ALPHA)
+    df_page, _ = table_page(df, 1, page_size)
+    # Only the requested page is turned into per-row dicts
+    df_page = df_page.assign(sma=sma_before.loc[df_page.index].to_dict('records'),
+                             ewma=ewma_before.loc[df_page.index].to_dict('records'))
+    return prepare_sma_table_entries(df_page, state.backends())
+
+def timed(label, function, *args):
+    start = time.perf_counter()
+    function(*args)
+    elapsed_s = time.perf_counter() - start
+    print(f"{label:<48} {elapsed_s:9.3f}s", flush=True)
+    return elapsed_s
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the iterrows SMA table with the vectorized aggregation")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--backends', type=int, default=3)
+    parser.add_argument('--page-size', type=int, default=200)
+    parser.add_argument('--skip-legacy', action='store_true', help="The iterrows baseline takes minutes at 1M rows")
+    arguments = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    df = synthetic_log(arguments.rows, arguments.backends)
+    print(f"{arguments.rows} rows, {arguments.backends} backends")
+    vectorized_s = timed("vectorized SMA+EWMA per row, one table page", vectorized_sma_table, df, arguments.page_size)
+    timed("  of which rolling_backend_latencies", rolling_backend_latencies, df, SMA_WINDOW, EWMA_ALPHA)
+    if not arguments.skip_legacy:
+        legacy_s = timed("legacy iterrows table (latest SMA only)", legacy_sma_table, df)
+        print(f"speedup: {legacy_s / vectorized_s:.1f}x")
+
+if __name__ == '__main__':
+    main()
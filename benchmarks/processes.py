@@ -0,0 +1,51 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKENDS = [('A', 8081), ('B', 8082), ('C', 8083)]
+PROXY_PORT = 9090
+PROXY_SCRIPTS = {
+    'persistent': 'persistent_proxy_server.py',
+    'non-persistent': 'proxy_server_non_persistent.py',
+}
+
+def wait_for_port(port, timeout_s=10.0):
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"Nothing listening on port {port} after {timeout_s}s")
+
+def start_backends(profiles_path=None):
+    # All backends are served by one simulator process on consecutive ports
+    names = [server_id for server_id, _ in BACKENDS]
+    command = [sys.executable, os.path.join(PROJECT_ROOT, 'backend_server.py'),
+               '--count', str(len(BACKENDS)), '--base-port', str(BACKENDS[0][1]), '--names', *names]
+    if profiles_path:
+        command += ['--profiles', profiles_path]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _, port in BACKENDS:
+        wait_for_port(port)
+    return [process]
+
+def start_proxy(proxy_script, mode, work_dir, extra_args=()):
+    # Run from work_dir so the proxy's CSV logs land there rather than in the project
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(PROJECT_ROOT, proxy_script), mode, *extra_args],
+        cwd=work_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    wait_for_port(PROXY_PORT)
+    return process
+
+def stop_process(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
@@ -0,0 +1,232 @@
+import argparse
+import asyncio
+import csv
+import datetime
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import numpy as np
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+from processes import PROXY_PORT, PROXY_SCRIPTS, start_backends, start_proxy, stop_process
+
+PROXY_URL = f"http://127.0.0.1:{PROXY_PORT}/"
+ROUTING_MODES = ['round-robin', 'adaptive_sma', 'adaptive_ewma']
+PERCENTILES = (50, 90, 99)
+REQUEST_TIMEOUT_S = 30.0
+
+async def fetch(session):
+    async with session.get(PROXY_URL) as response:
+        await response.read()
+        return response.status == 200
+
+async def closed_loop_load(concurrency, duration_s):
+    latencies_ms = []
+    errors = 0
+    deadline = time.monotonic() + duration_s
+    async with ClientSession(connector=TCPConnector(limit=0), timeout=ClientTimeout(total=REQUEST_TIMEOUT_S)) as session:
+        async def client_loop():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                sent_at = time.monotonic()
+                try:
+                    succeeded = await fetch(session)
+                except Exception:
+                    succeeded = False
+                if succeeded:
+                    latencies_ms.append((time.monotonic() - sent_at) * 1000)
+                else:
+                    errors += 1
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return latencies_ms, errors
+
+async def open_loop_load(rate, duration_s, phase_s):
+    """Send at a fixed arrival rate regardless of how fast responses come back.
+
+    Latency is measured from when each request was *scheduled*, not when it was actually
+    sent, so a stall that delays later sends still shows up in their latency
+    (no coordinated omission).
+    """
+    latencies_ms = []
+    errors = 0
+    interval_s = 1.0 / rate
+    start = time.monotonic() + phase_s
+    in_flight = set()
+    async with ClientSession(connector=TCPConnector(limit=0), timeout=ClientTimeout(total=REQUEST_TIMEOUT_S)) as session:
+        async def send(scheduled_at):
+            nonlocal errors
+            try:
+                succeeded = await fetch(session)
+            except Exception:
+                succeeded = False
+            if succeeded:
+                latencies_ms.append((time.monotonic() - scheduled_at) * 1000)
+            else:
+                errors += 1
+
+        for i in range(int(duration_s * rate)):
+            scheduled_at = start + i * interval_s
+            delay_s = scheduled_at - time.monotonic()
+            if delay_s > 0:
+                await asyncio.sleep(delay_s)
+            task = asyncio.create_task(send(scheduled_at))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if in_flight:
+            await asyncio.gather(*in_flight)
+    return latencies_ms, errors
+
+def run_load_process(args):
+    load, amount, duration_s, phase_s = args
+    if load == 'open':
+        return asyncio.run(open_loop_load(amount, duration_s, phase_s))
+    return asyncio.run(closed_loop_load(amount, duration_s))
+
+def generate_load(load, rate, concurrency, duration_s, client_processes):
+    if load == 'open':
+        # Each process sends rate / N requests/s, offset so the combined arrivals stay evenly spaced
+        jobs = [('open', rate / client_processes, duration_s, i / rate) for i in range(client_processes)]
+    else:
+        jobs = [('closed', max(1, concurrency // client_processes), duration_s, 0.0)] * client_processes
+    with multiprocessing.Pool(client_processes) as pool:
+        results = pool.map(run_load_process, jobs)
+    latencies_ms = list(itertools.chain.from_iterable(r[0] for r in results))
+    return latencies_ms, sum(r[1] for r in results)
+
+def latency_summary(latencies_ms):
+    if not latencies_ms:
+        return {f'p{p}': None for p in PERCENTILES} | {'mean': None, 'max': None}
+    values = np.asarray(latencies_ms)
+    summary = {f'p{p}': round(float(np.percentile(values, p)), 2) for p in PERCENTILES}
+    summary['mean'] = round(float(values.mean()), 2)
+    summary['max'] = round(float(values.max()), 2)
+    return summary
+
+def backend_distribution(log_path, since):
+    # Read the proxy's own log rather than inferring backends from response bodies
+    distribution = {}
+    if not os.path.exists(log_path):
+        return distribution
+    with open(log_path, newline='') as log_file:
+        for row in csv.DictReader(log_file):
+            if row.get('timestamp', '') >= since:
+                distribution[row['backend_url']] = distribution.get(row['backend_url'], 0) + 1
+    return dict(sorted(distribution.items()))
+
+def run_scenario(proxy, mode, load, arguments):
+    work_dir = tempfile.mkdtemp(prefix=f'bench_{proxy}_{mode}_{load}_')
+    process = start_proxy(PROXY_SCRIPTS[proxy], mode, work_dir)
+    try:
+        if arguments.warmup > 0:
+            generate_load('closed', arguments.rate, arguments.concurrency, arguments.warmup, arguments.client_processes)
+        measured_since = datetime.datetime.now().isoformat()
+        started_at = time.monotonic()
+        latencies_ms, errors = generate_load(load, arguments.rate, arguments.concurrency,
+                                             arguments.duration, arguments.client_processes)
+        elapsed_s = time.monotonic() - started_at
+    finally:
+        stop_process(process) # SIGTERM makes the proxy flush its log before exiting
+    return {
+        'proxy': proxy,
+        'mode': mode,
+        'load': load,
+        'rate': arguments.rate if load == 'open' else None,
+        'concurrency': arguments.concurrency if load == 'closed' else None,
+        'duration_s': round(elapsed_s, 2),
+        'requests': len(latencies_ms),
+        'errors': errors,
+        'throughput_rps': round(len(latencies_ms) / elapsed_s, 2),
+        'latency_ms': latency_summary(latencies_ms),
+        'backend_distribution': backend_distribution(os.path.join(work_dir, 'proxy_log.csv'), measured_since),
+    }
+
+def run_key(run):
+    return run['proxy'], run['mode'], run['load']
+
+def compare_with_baseline(report, baseline, threshold_pct):
+    """Return a list of human-readable regressions against a previous report."""
+    baseline_runs = {run_key(run): run for run in baseline.get('runs', [])}
+    regressions = []
+    for run in report['runs']:
+        previous = baseline_runs.get(run_key(run))
+        if previous is None:
+            continue
+        label = '/'.join(run_key(run))
+        if previous['throughput_rps'] and \
+                run['throughput_rps'] < previous['throughput_rps'] * (1 - threshold_pct / 100):
+            regressions.append(f"{label}: throughput {previous['throughput_rps']} -> {run['throughput_rps']} req/s")
+        for metric in ('p50', 'p99'):
+            old_value, new_value = previous['latency_ms'].get(metric), run['latency_ms'].get(metric)
+            if old_value and new_value and new_value > old_value * (1 + threshold_pct / 100):
+                regressions.append(f"{label}: {metric} latency {old_value} -> {new_value} ms")
+        if run['errors'] > previous['errors'] and run['errors'] > 0.01 * max(1, run['requests']):
+            regressions.append(f"{label}: errors {previous['errors']} -> {run['errors']}")
+    return regressions
+
+def print_summary(report):
+    print(f"\n{'proxy':<15} {'mode':<14} {'load':<7} {'req/s':>9} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8} {'errors':>7}  distribution")
+    for run in report['runs']:
+        latency = run['latency_ms']
+        cells = [f"{latency[k]:8.1f}" if latency[k] is not None else f"{'-':>8}" for k in ('p50', 'p90', 'p99', 'max')]
+        distribution = ' '.join(f"{url.rsplit(':', 1)[-1]}={count}" for url, count in run['backend_distribution'].items())
+        print(f"{run['proxy']:<15} {run['mode']:<14} {run['load']:<7} {run['throughput_rps']:9.1f} "
+              f"{' '.join(cells)} {run['errors']:7}  {distribution}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Start the backends and proxy locally and benchmark every mode")
+    parser.add_argument('--proxies', nargs='+', choices=list(PROXY_SCRIPTS), default=list(PROXY_SCRIPTS))
+    parser.add_argument('--modes', nargs='+', default=ROUTING_MODES)
+    parser.add_argument('--load', choices=['open', 'closed', 'both'], default='both')
+    parser.add_argument('--rate', type=float, default=100.0, help="Open loop: requests per second")
+    parser.add_argument('--concurrency', type=int, default=100, help="Closed loop: concurrent clients (like wrk -c)")
+    parser.add_argument('--duration', type=float, default=30.0, help="Measured seconds per scenario")
+    parser.add_argument('--warmup', type=float, default=3.0, help="Unmeasured seconds per scenario so EWMA/SMA settle")
+    parser.add_argument('--client-processes', type=int, default=2)
+    parser.add_argument('--profiles', default=None, help="Backend profiles JSON for the simulated backends")
+    parser.add_argument('--output', default=None, help="Write the JSON report here")
+    parser.add_argument('--baseline', default=None, help="Previous JSON report to compare against")
+    parser.add_argument('--regression-threshold', type=float, default=10.0,
+                        help="Percent change in throughput or p50/p99 counted as a regression")
+    arguments = parser.parse_args()
+
+    loads = ['open', 'closed'] if arguments.load == 'both' else [arguments.load]
+    report = {
+        'created_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'host': {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()},
+        'config': {key: value for key, value in vars(arguments).items() if key not in ('output', 'baseline')},
+        'runs': [],
+    }
+
+    backends = start_backends(arguments.profiles)
+    try:
+        for proxy, mode, load in itertools.product(arguments.proxies, arguments.modes, loads):
+            print(f"Running {proxy} / {mode} / {load} loop...", flush=True)
+            report['runs'].append(run_scenario(proxy, mode, load, arguments))
+    finally:
+        for backend in backends:
+            stop_process(backend)
+
+    print_summary(report)
+    if arguments.output:
+        with open(arguments.output, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"\nReport written to {arguments.output}")
+
+    if arguments.baseline:
+        with open(arguments.baseline) as baseline_file:
+            regressions = compare_with_baseline(report, json.load(baseline_file), arguments.regression_threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {arguments.baseline}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions against {arguments.baseline} (threshold {arguments.regression_threshold}%)")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from health import HealthTracker
+from score_index import ScoreIndex
+
+EWMA_ALPHA = 0.2
+
+def backend_pool(size):
+    urls = [f"http://10.0.{i // 250}.{i % 250}:8080" for i in range(size)]
+    # Active probing is never started here, so the tracker only does the per-pick routability checks
+    return urls, HealthTracker(urls, check_interval_s=0)
+
+def sampled_latency_ms(rng, url_index):
+    return rng.gammavariate(2.0, 20.0 + url_index % 7 * 5)
+
+def run_linear_scan(size, selections, seed):
+    """The pre-index adaptive_ewma path: filter every backend, build a score dict, take min()."""
+    rng = random.Random(seed)
+    urls, health_tracker = backend_pool(size)
+    ewma = {url: rng.uniform(20, 80) for url in urls}
+    url_index = {url: i for i, url in enumerate(urls)}
+    started_at = time.perf_counter()
+    for _ in range(selections):
+        candidates = health_tracker.routable_backends() or urls
+        ewma_values = {url: ewma[url] for url in candidates}
+        chosen = min(ewma_values, key=ewma_values.get)
+        ewma[chosen] = EWMA_ALPHA * sampled_latency_ms(rng, url_index[chosen]) + (1 - EWMA_ALPHA) * ewma[chosen]
+    return selections / (time.perf_counter() - started_at)
+
+def run_score_index(size, selections, seed):
+    """The indexed path: walk the heap in score order, then re-sift the chosen backend's new EWMA."""
+    rng = random.Random(seed)
+    urls, health_tracker = backend_pool(size)
+    ewma = {url: rng.uniform(20, 80) for url in urls}
+    url_index = {url: i for i, url in enumerate(urls)}
+    score_index = ScoreIndex(urls)
+    for url in urls:
+        score_index.update(url, ewma[url])
+    started_at = time.perf_counter()
+    for _ in range(selections):
+        now = time.monotonic()
+        chosen = next(url for url in score_index.ascending() if health_tracker.is_routable(url, now))
+        ewma[chosen] = EWMA_ALPHA * sampled_latency_ms(rng, url_index[chosen]) + (1 - EWMA_ALPHA) * ewma[chosen]
+        score_index.update(chosen, ewma[chosen])
+    return selections / (time.perf_counter() - started_at)
+
+def main():
+    parser = argparse.ArgumentParser(description="Selections per second of linear-scan vs score-indexed adaptive_ewma selection as the backend pool grows")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[3, 10, 100, 1000, 10000])
+    parser.add_argument('--selections', type=int, default=20000, help="Selections per run; the linear scan gets fewer for large pools")
+    parser.add_argument('--seed', type=int, default=0)
+    arguments = parser.parse_args()
+
+    print("backends    linear scan/s    score index/s    speedup")
+    for size in arguments.sizes:
+        # Keeps the O(n) baseline to a few seconds on large pools
+        scan_selections = max(200, min(arguments.selections, arguments.selections * 100 // size))
+        scan_rate = run_linear_scan(size, scan_selections, arguments.seed)
+        index_rate = run_score_index(size, arguments.selections, arguments.seed)
+        print(f"{size:<11} {scan_rate:<16,.0f} {index_rate:<16,.0f} {index_rate / scan_rate:.1f}x", flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import time
+
+from aiohttp import ClientSession, TCPConnector
+
+from processes import PROXY_PORT, start_backends, start_proxy, stop_process
+
+async def closed_loop_load(concurrency, duration_s):
+    completed = 0
+    errors = 0
+    deadline = time.monotonic() + duration_s
+    async with ClientSession(connector=TCPConnector(limit=0)) as session:
+        async def client_loop():
+            nonlocal completed, errors
+            while time.monotonic() < deadline:
+                try:
+                    async with session.get(f"http://127.0.0.1:{PROXY_PORT}/") as response:
+                        await response.read()
+                        if response.status == 200:
+                            completed += 1
+                        else:
+                            errors += 1
+                except Exception:
+                    errors += 1
+        await asyncio.gather(*(client_loop() for _ in range(concurrency)))
+    return completed, errors
+
+def run_load_process(args):
+    concurrency, duration_s = args
+    return asyncio.run(closed_loop_load(concurrency, duration_s))
+
+def measure_throughput(client_processes, concurrency, duration_s):
+    per_process = max(1, concurrency // client_processes)
+    with multiprocessing.Pool(client_processes) as pool:
+        results = pool.map(run_load_process, [(per_process, duration_s)] * client_processes)
+    completed = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    return completed / duration_s, errors
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure proxy throughput as --workers grows from 1 to N")
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--proxy', default='persistent_proxy_server.py')
+    parser.add_argument('--mode', default='adaptive_ewma')
+    parser.add_argument('--concurrency', type=int, default=1000,
+                        help="Open client connections; must be high enough that the proxy, not the backends, saturates")
+    parser.add_argument('--client-processes', type=int, default=4)
+    parser.add_argument('--duration', type=float, default=15.0)
+    arguments = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='bench_worker_scaling_') # Keeps the benchmark's proxy_log.csv out of the project
+    worker_counts = sorted({1, *[2 ** i for i in range(1, 8) if 2 ** i < arguments.max_workers], arguments.max_workers})
+
+    backends = start_backends()
+    results = []
+    try:
+        for workers in worker_counts:
+            proxy = start_proxy(arguments.proxy, arguments.mode, work_dir, ['--workers', str(workers)])
+            try:
+                throughput, errors = measure_throughput(arguments.client_processes, arguments.concurrency, arguments.duration)
+            finally:
+                stop_process(proxy)
+            results.append((workers, throughput, errors))
+            print(f"workers={workers:<3} {throughput:9.1f} req/s  errors={errors}", flush=True)
+    finally:
+        for backend in backends:
+            stop_process(backend)
+
+    baseline = results[0][1] or 1.0
+    print("\nworkers  req/s      speedup")
+    for workers, throughput, errors in results:
+        print(f"{workers:<8} {throughput:<10.1f} {throughput / baseline:.2f}x")
+
+if __name__ == '__main__':
+    main()
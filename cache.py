@@ -0,0 +1,170 @@
+import collections
+import time
+from multidict import CIMultiDict
+
+CACHEABLE_METHODS = frozenset(['GET', 'HEAD'])
+CACHEABLE_STATUS_CODES = frozenset([200, 203, 204, 300, 301, 404, 410])
+DEFAULT_VARY_HEADERS = ('Accept', 'Accept-Encoding')
+# Always part of the key, so a response fetched with one client's credentials is never served to another
+CREDENTIAL_HEADERS = ('Authorization', 'Cookie')
+# RFC 7234 §3.2: a shared cache may store a response to an authorized request only if one of these allows it
+AUTHORIZED_STORE_DIRECTIVES = frozenset(['public', 's-maxage', 'must-revalidate'])
+
+def parse_cache_control(value):
+    directives = {}
+    for part in (value or '').split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip().strip('"')
+    return directives
+
+def directive_seconds(directives, name):
+    try:
+        return max(0.0, float(directives[name]))
+    except (KeyError, ValueError):
+        return None
+
+class CachedResponse:
+    __slots__ = ('status', 'reason', 'headers', 'body', 'size', 'stored_at', 'fresh_until', 'stale_until')
+
+    def __init__(self, status, reason, headers, body, size, stored_at, fresh_until, stale_until):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+        self.size = size
+        self.stored_at = stored_at
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.uncacheable = 0
+        self.revalidations = 0
+
+    def summary(self):
+        return (f"hits={self.hits} stale_hits={self.stale_hits} misses={self.misses} stores={self.stores} "
+                f"evictions={self.evictions} uncacheable={self.uncacheable} revalidations={self.revalidations}")
+
+class ResponseCache:
+    """LRU response cache bounded by total bytes, with max-age freshness and stale-while-revalidate.
+
+    Keys are (method, path and query, values of vary_headers and of Authorization and Cookie).
+    Responses that carry no-store, no-cache, private, Set-Cookie, or a Vary on any other header
+    are not stored, nor are responses to requests with Authorization unless they are marked
+    public, s-maxage or must-revalidate. Responses without max-age/s-maxage are only stored
+    when default_ttl_s is set, since heuristic freshness would share dynamic answers between
+    clients that did not ask for caching.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, default_ttl_s=0.0, default_stale_s=0.0,
+                 vary_headers=DEFAULT_VARY_HEADERS):
+        self.max_bytes = max_bytes
+        self.default_ttl_s = default_ttl_s
+        self.default_stale_s = default_stale_s
+        self.vary_headers = tuple(vary_headers)
+        self._vary_names = frozenset(name.lower() for name in self.vary_headers)
+        self._entries = collections.OrderedDict()
+        self._revalidating = set()
+        self.total_bytes = 0
+        self.stats = CacheStats()
+
+    def key_for(self, method, path_qs, request_headers):
+        if method not in CACHEABLE_METHODS:
+            return None
+        request_directives = parse_cache_control(request_headers.get('Cache-Control'))
+        if 'no-store' in request_directives or 'no-cache' in request_directives:
+            return None
+        return (method, path_qs) + tuple(request_headers.get(name, '') for name in self.vary_headers + CREDENTIAL_HEADERS)
+
+    def lookup(self, key, now=None):
+        """Return (entry, needs_revalidation); entry is None on a miss.
+
+        needs_revalidation is True for exactly one caller per stale entry, which is then
+        expected to refresh it and call finish_revalidation(key).
+        """
+        now = time.monotonic() if now is None else now
+        entry = self._entries.get(key)
+        if entry is None or now >= entry.stale_until:
+            if entry is not None:
+                self._remove(key)
+            self.stats.misses += 1
+            return None, False
+        self._entries.move_to_end(key)
+        if now < entry.fresh_until:
+            self.stats.hits += 1
+            return entry, False
+        self.stats.stale_hits += 1
+        if key in self._revalidating:
+            return entry, False
+        self._revalidating.add(key)
+        self.stats.revalidations += 1
+        return entry, True
+
+    def finish_revalidation(self, key):
+        self._revalidating.discard(key)
+
+    def store(self, key, status, reason, headers, body, now=None, authorized=False):
+        """Store a response; authorized says whether the request carried an Authorization header."""
+        now = time.monotonic() if now is None else now
+        ttl_s, stale_s = self._freshness(status, headers, authorized)
+        if ttl_s is None:
+            self.stats.uncacheable += 1
+            if status < 500:
+                self._remove(key) # A fresh no-store answer must not leave the old copy behind
+            return False
+        stored_headers = CIMultiDict(headers)
+        body = body or b''
+        size = len(body) + sum(len(name) + len(value) for name, value in stored_headers.items())
+        if size > self.max_bytes:
+            self.stats.uncacheable += 1
+            self._remove(key)
+            return False
+        self._remove(key)
+        self._entries[key] = CachedResponse(status, reason, stored_headers, body, size, now,
+                                            now + ttl_s, now + ttl_s + stale_s)
+        self.total_bytes += size
+        self.stats.stores += 1
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+            self.stats.evictions += 1
+        return True
+
+    def _freshness(self, status, headers, authorized=False):
+        if status not in CACHEABLE_STATUS_CODES or 'Set-Cookie' in headers:
+            return None, None
+        varied_on = {name.strip().lower() for name in headers.get('Vary', '').split(',') if name.strip()}
+        if not varied_on <= self._vary_names:
+            return None, None # Includes Vary: *
+        directives = parse_cache_control(headers.get('Cache-Control'))
+        if 'no-store' in directives or 'no-cache' in directives or 'private' in directives:
+            return None, None
+        if authorized and not AUTHORIZED_STORE_DIRECTIVES & directives.keys():
+            return None, None
+        ttl_s = directive_seconds(directives, 's-maxage')
+        if ttl_s is None:
+            ttl_s = directive_seconds(directives, 'max-age')
+        if ttl_s is None:
+            if self.default_ttl_s <= 0:
+                return None, None # No freshness lifetime, and heuristic caching is off
+            ttl_s = self.default_ttl_s
+        stale_s = directive_seconds(directives, 'stale-while-revalidate')
+        if stale_s is None:
+            stale_s = self.default_stale_s
+        if ttl_s + stale_s <= 0:
+            return None, None
+        return ttl_s, stale_s
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,92 @@
+import asyncio
+from cache import CREDENTIAL_HEADERS, DEFAULT_VARY_HEADERS, parse_cache_control
+
+COALESCABLE_METHODS = frozenset(['GET', 'HEAD'])
+# Credentials are part of the key, so only requests that would get the same answer share one
+DEFAULT_KEY_HEADERS = DEFAULT_VARY_HEADERS + CREDENTIAL_HEADERS
+
+class CoalescingStats:
+    def __init__(self):
+        self.flights = 0
+        self.coalesced = 0
+        self.wait_timeouts = 0
+        self.waiter_limit = 0
+        self.leader_failures = 0
+
+    def summary(self):
+        return (f"flights={self.flights} coalesced={self.coalesced} wait_timeouts={self.wait_timeouts} "
+                f"waiter_limit={self.waiter_limit} leader_failures={self.leader_failures}")
+
+class _Flight:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+class RequestCoalescer:
+    """Single-flight for identical idempotent requests.
+
+    The first request for a key (the leader) starts the backend fetch as its own task.
+    Requests with the same key that arrive while it is running wait for that task instead of
+    reaching a backend, up to max_waiters per flight and max_wait_s each; past either limit,
+    or if the leader's fetch fails, they fetch for themselves. The fetch is shielded, so a
+    leader whose client disconnects does not cancel it for the others.
+    """
+
+    def __init__(self, max_wait_s=5.0, max_waiters=1000, key_headers=DEFAULT_KEY_HEADERS):
+        self.max_wait_s = max_wait_s
+        self.max_waiters = max_waiters
+        self.key_headers = tuple(key_headers)
+        self._flights = {}
+        self.stats = CoalescingStats()
+
+    def key_for(self, method, path_qs, request_headers, has_body=False):
+        if method not in COALESCABLE_METHODS or has_body:
+            return None
+        request_directives = parse_cache_control(request_headers.get('Cache-Control'))
+        if 'no-store' in request_directives or 'no-cache' in request_directives:
+            return None # The client asked for an answer fetched for it alone
+        return (method, path_qs) + tuple(request_headers.get(name, '') for name in self.key_headers)
+
+    async def run(self, key, fetch):
+        """Return (result, shared): fetch()'s result, and whether it was another request's flight."""
+        flight = self._flights.get(key)
+        if flight is None:
+            return await self._lead(key, fetch), False
+        if flight.waiters >= self.max_waiters:
+            self.stats.waiter_limit += 1
+            return await fetch(), False
+        flight.waiters += 1
+        try:
+            result = await asyncio.wait_for(asyncio.shield(flight.task), self.max_wait_s)
+        except asyncio.TimeoutError:
+            self.stats.wait_timeouts += 1
+        except asyncio.CancelledError:
+            if flight.task.cancelled():
+                self.stats.leader_failures += 1
+            else:
+                raise # This request's own client went away
+        except Exception:
+            self.stats.leader_failures += 1
+        else:
+            self.stats.coalesced += 1
+            return result, True
+        return await fetch(), False
+
+    async def _lead(self, key, fetch):
+        task = asyncio.ensure_future(fetch())
+        flight = _Flight(task)
+        self._flights[key] = flight
+        self.stats.flights += 1
+        task.add_done_callback(lambda done: self._land(key, flight))
+        return await asyncio.shield(task)
+
+    def _land(self, key, flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            flight.task.exception() # Retrieved here so a failure nobody awaited is not reported as lost
+
+    def in_flight(self):
+        return len(self._flights)
@@ -0,0 +1,166 @@
+import asyncio
+import inspect
+import aiohttp
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+
+# BackendConnector hooks TCPConnector internals (connect, _release, _conns, _acquired), which aiohttp
+# may change in any minor release. The README pins this range and tests/test_connection_pools.py covers it.
+TESTED_AIOHTTP_VERSIONS = '>=3.14,<3.15'
+
+class PoolSettings:
+    """Connection pool limits for one backend. 0 means unlimited for the counts."""
+
+    def __init__(self, max_connections=100, keepalive_timeout_s=30.0, max_requests_per_connection=0,
+                 prewarm_connections=0, dns_cache_ttl_s=10):
+        self.max_connections = max_connections
+        self.keepalive_timeout_s = keepalive_timeout_s
+        self.max_requests_per_connection = max_requests_per_connection
+        self.prewarm_connections = prewarm_connections
+        self.dns_cache_ttl_s = dns_cache_ttl_s
+
+    def with_overrides(self, overrides):
+        settings = PoolSettings(**vars(self))
+        for name, value in overrides.items():
+            if not hasattr(settings, name):
+                raise ValueError(f"Unknown pool setting: {name}")
+            setattr(settings, name, value)
+        return settings
+
+class BackendConnector(TCPConnector):
+    """TCPConnector that counts new vs reused connections and retires a connection after
+    max_requests_per_connection requests, so long-lived sockets get rebalanced."""
+
+    def __init__(self, max_requests_per_connection=0, **kwargs):
+        super().__init__(**kwargs)
+        self._check_internals()
+        self.max_requests_per_connection = max_requests_per_connection
+        self.requests_per_connection = {}
+        self.created = 0
+        self.reused = 0
+        self.retired = 0
+
+    def _check_internals(self):
+        # Fail at startup instead of pooling wrongly if this aiohttp no longer has what is overridden here
+        missing = [name for name in ('_conns', '_acquired') if not hasattr(self, name)]
+        if 'should_close' not in inspect.signature(TCPConnector._release).parameters:
+            missing.append('_release(should_close=)')
+        if missing:
+            raise RuntimeError(f"aiohttp {aiohttp.__version__} has no TCPConnector {', '.join(missing)}; "
+                               f"connection pools are tested with aiohttp{TESTED_AIOHTTP_VERSIONS}")
+
+    async def connect(self, req, traces, timeout):
+        connection = await super().connect(req, traces, timeout)
+        protocol = connection.protocol
+        if protocol in self.requests_per_connection:
+            self.reused += 1
+        else:
+            self.created += 1
+            self._forget_closed_connections()
+        self.requests_per_connection[protocol] = self.requests_per_connection.get(protocol, 0) + 1
+        return connection
+
+    def _release(self, key, protocol, *, should_close=False):
+        # aiohttp hands every finished connection back through _release, pooled or not
+        served = self.requests_per_connection.get(protocol, 0)
+        if not should_close and self.max_requests_per_connection and served >= self.max_requests_per_connection:
+            should_close = True
+            self.retired += 1
+        super()._release(key, protocol, should_close=should_close)
+        if should_close or protocol.should_close or not protocol.is_connected():
+            self.requests_per_connection.pop(protocol, None)
+
+    def _forget_closed_connections(self):
+        # Idle connections dropped by the keepalive cleanup never pass through _release again
+        for protocol in [p for p in self.requests_per_connection if not p.is_connected()]:
+            del self.requests_per_connection[protocol]
+
+    def idle_connections(self):
+        # Connections parked in the pool; ones closed by the peer are only noticed on reuse
+        return sum(1 for connections in self._conns.values()
+                   for protocol, _ in connections if protocol.is_connected())
+
+    def active_connections(self):
+        return len(self._acquired)
+
+class BackendConnectionPools:
+    """One ClientSession per backend, each with its own connector and limits, so a slow
+    backend can exhaust only its own pool."""
+
+    def __init__(self, backend_urls, default_settings, overrides=None, trace_configs=()):
+        self.default_settings = default_settings
+        self.trace_configs = list(trace_configs)
+        self.settings = {
+            url: default_settings.with_overrides((overrides or {}).get(url, {})) for url in backend_urls
+        }
+        self.sessions = {}
+
+    def open(self):
+        # Sessions must be created inside the running event loop
+        for url, settings in self.settings.items():
+            self.add_backend(url, settings)
+
+    def add_backend(self, url, settings):
+        self.settings[url] = settings
+        connector = BackendConnector(
+            max_requests_per_connection=settings.max_requests_per_connection,
+            limit=settings.max_connections,
+            limit_per_host=settings.max_connections,
+            keepalive_timeout=settings.keepalive_timeout_s,
+            ttl_dns_cache=settings.dns_cache_ttl_s,
+        )
+        self.sessions[url] = ClientSession(
+            connector=connector,
+            auto_decompress=False, # Relay bodies exactly as encoded so Content-Encoding stays valid
+            trace_configs=self.trace_configs or None
+        )
+
+    async def remove_backend(self, url):
+        self.settings.pop(url, None)
+        session = self.sessions.pop(url, None)
+        if session is not None:
+            await session.close()
+
+    def session_for(self, url):
+        return self.sessions[url]
+
+    async def prewarm(self, path='/health', timeout_s=2.0):
+        """Open prewarm_connections connections per backend with concurrent requests to path,
+        so the first real requests skip the TCP handshake. Returns connections created per backend."""
+        created = {}
+        for url in list(self.sessions):
+            count = await self.prewarm_backend(url, path, timeout_s)
+            if count:
+                created[url] = count
+        return created
+
+    async def prewarm_backend(self, url, path='/health', timeout_s=2.0):
+        session = self.sessions[url]
+        count = self.settings[url].prewarm_connections
+        if count <= 0:
+            return 0
+        before = session.connector.created
+        await asyncio.gather(*(self._warm_request(session, url, path, timeout_s) for _ in range(count)))
+        return session.connector.created - before
+
+    async def _warm_request(self, session, url, path, timeout_s):
+        try:
+            async with session.get(f"{url}{path}", timeout=ClientTimeout(total=timeout_s)) as response:
+                await response.read()
+        except Exception:
+            pass # An unreachable backend just starts cold; health checks deal with it
+
+    def stats(self):
+        return {
+            url: {
+                'idle': session.connector.idle_connections(),
+                'active': session.connector.active_connections(),
+                'created': session.connector.created,
+                'reused': session.connector.reused,
+                'retired': session.connector.retired,
+            }
+            for url, session in self.sessions.items()
+        }
+
+    async def close(self):
+        for session in self.sessions.values():
+            await session.close()
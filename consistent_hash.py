@@ -0,0 +1,79 @@
+import bisect
+import hashlib
+import math
+
+def stable_hash(value):
+    # hash() is salted per process, which would give each --workers process a different ring
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+def key_extractor(spec):
+    """Turn 'header:<name>', 'cookie:<name>' or 'path:<segments>' into a function returning a
+    request's routing key, or None when the request does not carry one."""
+    source, _, name = spec.partition(':')
+    if source == 'header' and name:
+        return lambda request: request.headers.get(name)
+    if source == 'cookie' and name:
+        return lambda request: request.cookies.get(name)
+    if source == 'path' and name.isdigit() and int(name) > 0:
+        segments = int(name)
+        return lambda request: '/'.join(request.path.split('/')[1:segments + 1]) or None
+    raise ValueError(f"Hash key must be header:<name>, cookie:<name> or path:<segments>, got {spec!r}")
+
+class ConsistentHashRing:
+    """Hash ring with virtual nodes per backend.
+
+    A key belongs to the first virtual node clockwise from its hash, so adding or removing a
+    backend only moves the keys on that backend's arcs. Lookups are a binary search over
+    len(backends) * vnodes points.
+    """
+
+    def __init__(self, backend_urls=(), vnodes=100):
+        self.vnodes = vnodes
+        self._points = []
+        self._owners = []
+        for url in backend_urls:
+            self.add(url)
+
+    def __contains__(self, url):
+        return url in self._owners
+
+    def add(self, url):
+        if url in self:
+            return
+        for i in range(self.vnodes):
+            point = stable_hash(f"{url}#{i}")
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, url)
+
+    def remove(self, url):
+        kept = [(point, owner) for point, owner in zip(self._points, self._owners) if owner != url]
+        self._points = [point for point, _ in kept]
+        self._owners = [owner for _, owner in kept]
+
+    def walk(self, key):
+        """Yield each backend once, clockwise from the key's position."""
+        if not self._points:
+            return
+        start = bisect.bisect(self._points, stable_hash(key))
+        seen = set()
+        for i in range(len(self._points)):
+            owner = self._owners[(start + i) % len(self._points)]
+            if owner not in seen:
+                seen.add(owner)
+                yield owner
+
+    def choose(self, key, candidates, load_of, load_factor=1.25):
+        """Return (chosen, owner): owner is the key's first routable backend, chosen the first one
+        clockwise from it whose load is under load_factor times the average (bounded-load spillover)."""
+        routable = set(candidates)
+        capacity = math.ceil(load_factor * (sum(load_of(url) for url in routable) + 1) / len(routable))
+        owner = None
+        for url in self.walk(key):
+            if url not in routable:
+                continue
+            if owner is None:
+                owner = url
+            if load_of(url) < capacity:
+                return url, owner
+        return (owner, owner) if owner is not None else (candidates[0], None)
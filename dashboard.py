@@ -1,110 +1,246 @@
 import pandas as pd
+import numpy as np
 import json
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context
 import os
 import datetime
 import logging
+import collections
+import itertools
+import math
+import threading
+import time
+from log_tail import LogTail
+from log_segments import LogSegments
+from aggregation import rolling_backend_latencies, RollingLatencyState
+from downsampling import downsample, DOWNSAMPLING_METHODS
 
 logging.basicConfig(level=logging.INFO)
 app = Flask(__name__)
 
 LOG_FILE = 'proxy_log.csv'
+HEALTH_EVENTS_FILE = 'proxy_health_events.csv'
+LOG_SEGMENT_DIR = 'proxy_log_segments' # Same as LOG_SEGMENT_DIR in the proxy scripts
+DEFAULT_HISTORY_ROWS = 1000 # Rows /history returns unless given ?limit=; its summary covers the whole range
+MAX_HISTORY_ROWS = 20000
+HISTORY_COLUMNS = ['timestamp', 'backend_url', 'latency_ms', 'status_code', 'routing_mode']
 RECENT_ENTRIES_STATS_WINDOW = 200
+RECENT_HEALTH_EVENTS = 20
+DASHBOARD_WINDOW_ROWS = 5000 # Rows kept in memory for the latency plot; older ones only count towards totals
+DASHBOARD_TABLE_ROWS = 200 # Default page size of the SMA/EWMA table
+MAX_TABLE_PAGE_SIZE = 1000
+DASHBOARD_PUSH_INTERVAL_S = 1.0
+SSE_KEEPALIVE_S = 15.0
+SMA_WINDOW = 3 # Same as LATENCY_WINDOW_SIZE and EWMA_ALPHA in the proxy scripts
+EWMA_ALPHA = 0.2
+DEFAULT_TARGET_POINTS = 1000 # Per backend series, unless /data or /events is given ?points=
+MAX_TARGET_POINTS = 20000
+DEFAULT_DOWNSAMPLING = 'lttb'
+HEALTH_EVENT_STATES = {'ejected': 'Ejected', 'half_open': 'Half-open', 'recovered': 'Healthy (slow start)',
+                       'added': 'Healthy (added)', 'draining': 'Draining', 'undrained': 'Healthy', 'removed': 'Removed'}
 
-def read_and_validate_log_df():
-    if not os.path.exists(LOG_FILE):
-        logging.warning(f"Log file not found: {LOG_FILE}")
-        return None, f"Log file not found: {LOG_FILE}"
+def validate_log_rows(df):
+    required_cols = ['timestamp', 'backend_url', 'latency_ms', 'status_code', 'routing_mode']
+    if not all(col in df.columns for col in required_cols):
+        logging.error(f"Log file missing required columns. Found: {list(df.columns)}")
+        return None, "Log file format unexpected (missing columns)."
 
-    try:
-        with open(LOG_FILE, 'r') as f:
-            first_line = f.readline()
-        has_header = 'timestamp' in first_line.lower()
-
-        if os.path.getsize(LOG_FILE) == 0 or \
-           (has_header and len(pd.read_csv(LOG_FILE, nrows=0).columns) == 0):
-            logging.info("Log file is empty.")
-            return None, "Log file is empty."
-
-        df = pd.read_csv(LOG_FILE, header=0 if has_header else None)
-        if not has_header:
-            expected_cols = ['timestamp', 'backend_url', 'latency_ms', 'status_code', 'routing_mode']
-            df.columns = expected_cols + [f'extra_{i}' for i in range(len(df.columns) - len(expected_cols))]
-
-        required_cols = ['timestamp', 'backend_url', 'latency_ms', 'status_code', 'routing_mode']
-        if not all(col in df.columns for col in required_cols):
-            logging.error(f"Log file missing required columns. Found: {list(df.columns)}")
-            return None, "Log file format unexpected (missing columns)."
-
-        df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
-        df.dropna(subset=['timestamp'], inplace=True)
-        df['latency_ms'] = pd.to_numeric(df['latency_ms'], errors='coerce')
-
-        if df.empty:
-            logging.info("Log file contains no valid timestamped entries.")
-            return None, "No valid data in log file."
-        
-        df['backend_port'] = df['backend_url'].str.extract(r':(\d+)$').fillna('Unknown')
-        return df, None
+    df = df[required_cols].copy()
+    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    df.dropna(subset=['timestamp'], inplace=True)
+    df['latency_ms'] = pd.to_numeric(df['latency_ms'], errors='coerce')
+    df['backend_port'] = df['backend_url'].astype(str).str.extract(r':(\d+)$')[0].fillna('Unknown')
+    return df, None
 
-    except pd.errors.EmptyDataError:
-        logging.warning(f"Attempted to read empty log file: {LOG_FILE}")
-        return None, "Log file is currently empty."
-    except Exception as e:
-        logging.error(f"Error reading or initially processing log file: {e}", exc_info=True)
-        return None, f"Error reading log file: {e}"
+class DashboardState:
+    """Log rows seen so far, kept as a bounded window plus aggregates updated per appended row.
+
+    Every row gets an increasing sequence number so each SSE client can ask for just the
+    rows it has not seen; a client that fell out of the window gets a fresh snapshot.
+    """
+
+    def __init__(self, log_path, window_rows):
+        self.tail = LogTail(log_path)
+        self.lock = threading.Lock()
+        self.window = collections.deque(maxlen=window_rows)
+        self.next_seq = 0
+        self.generation = 0
+        self.requests_per_port = collections.Counter()
+        self.rolling_latencies = RollingLatencyState()
+        self.error_message = None
+        self._health_signature = None
+        self._health_payload = ([], [])
+
+    def _clear(self):
+        self.window.clear()
+        self.requests_per_port.clear()
+        self.rolling_latencies = RollingLatencyState()
+        self.generation = self.tail.reset_count
+
+    def refresh(self):
+        with self.lock:
+            df_new = self.tail.read_new_rows()
+            if self.tail.reset_count != self.generation:
+                logging.info(f"{LOG_FILE} was replaced or truncated; starting over.")
+                self._clear()
+            if df_new is None:
+                self.error_message = f"Log file not found: {LOG_FILE}"
+                return
+            self.error_message = None
+            if df_new.empty:
+                return
+            df_new, error_message = validate_log_rows(df_new)
+            if df_new is None:
+                self.error_message = error_message
+                return
+            sma_before, ewma_before, self.rolling_latencies = rolling_backend_latencies(
+                df_new, SMA_WINDOW, EWMA_ALPHA, self.rolling_latencies)
+            self.requests_per_port.update(df_new['backend_port'].value_counts().to_dict())
+            df_new = df_new.assign(sma=sma_before.to_dict('records'), ewma=ewma_before.to_dict('records'))
+            for record in df_new.to_dict('records'):
+                record['seq'] = self.next_seq
+                self.next_seq += 1
+                self.window.append(record)
+            logging.info(f"Read {len(df_new)} new log rows (offset {self.tail.offset}).")
+
+    def backends(self):
+        return sorted(set(self.requests_per_port) | set(self.rolling_latencies.backends()))
+
+    def rows_since(self, last_seq):
+        new_rows = []
+        for record in reversed(self.window):
+            if record['seq'] <= last_seq:
+                break
+            new_rows.append(record)
+        new_rows.reverse()
+        return new_rows
+
+    def recent_rows(self, count):
+        return list(itertools.islice(reversed(self.window), count))[::-1]
+
+    def is_behind(self, generation, last_seq):
+        # True if the client saw an older file or rows that have since left the window
+        if generation != self.generation:
+            return True
+        return bool(self.window) and last_seq < self.window[0]['seq'] - 1
+
+    def health(self):
+        try:
+            stat = os.stat(HEALTH_EVENTS_FILE)
+            signature = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            signature = None
+        if signature != self._health_signature:
+            df_health_events = read_health_events_df()
+            self._health_payload = (prepare_backend_health(df_health_events),
+                                    prepare_health_event_entries(df_health_events))
+            self._health_signature = signature
+        return self._health_payload
+
+dashboard_state = DashboardState(LOG_FILE, DASHBOARD_WINDOW_ROWS)
+log_segments = LogSegments(LOG_FILE, LOG_SEGMENT_DIR)
 
-def prepare_plotly_latency_traces(df_valid_latency):
+def read_log_history(start_time, end_time, backend_url=None):
+    """Rows logged between start_time and end_time (either may be None), reading only the
+    segments whose index entry overlaps the range and mentions backend_url, plus the live log."""
+    start_text = start_time.isoformat() if start_time is not None else None
+    end_text = end_time.isoformat() if end_time is not None else None
+    paths = log_segments.segments_between(start_text, end_text, backend_url) + [LOG_FILE]
+    frames = []
+    segments_read = 0
+    for path in paths:
+        try:
+            df = pd.read_csv(path) # Segments are gzip-compressed; pandas infers that from .gz
+        except (FileNotFoundError, pd.errors.EmptyDataError):
+            continue # Removed by retention since the index was read, or a live log that was just rotated
+        segments_read += path != LOG_FILE
+        df, _ = validate_log_rows(df)
+        if df is None:
+            continue
+        if start_time is not None:
+            df = df[df['timestamp'] >= start_time]
+        if end_time is not None:
+            df = df[df['timestamp'] <= end_time]
+        if backend_url is not None:
+            df = df[df['backend_url'] == backend_url]
+        frames.append(df)
+    df_history = pd.concat(frames, ignore_index=True).sort_values('timestamp', kind='stable') if frames \
+        else pd.DataFrame(columns=HISTORY_COLUMNS)
+    return df_history, segments_read
+
+def summarize_history(df_history):
+    summary = {}
+    for backend_url, df_backend in df_history.groupby('backend_url'):
+        latencies = df_backend.loc[df_backend['latency_ms'] > 0, 'latency_ms']
+        status_codes = pd.to_numeric(df_backend['status_code'], errors='coerce')
+        summary[backend_url] = {
+            'requests': int(len(df_backend)),
+            'errors': int(((status_codes >= 500) | (df_backend['latency_ms'] <= 0)).sum()),
+            **{f"p{p}_ms": float(latencies.quantile(p / 100)) if not latencies.empty else None for p in (50, 95, 99)},
+        }
+    return summary
+
+def prepare_plotly_latency_traces(df_valid_latency, target_points=None, method=DEFAULT_DOWNSAMPLING):
     plotly_traces = []
     if not df_valid_latency.empty:
         for port in sorted(df_valid_latency['backend_port'].unique()):
             port_data = df_valid_latency[df_valid_latency['backend_port'] == port]
+            # Epoch milliseconds; Plotly date axes take them directly and they are far smaller than strings
+            epoch_ms = port_data['timestamp'].to_numpy(dtype='datetime64[ms]').astype('int64')
+            latencies = port_data['latency_ms'].to_numpy(dtype=float)
+            if target_points:
+                epoch_ms, latencies = downsample(epoch_ms, latencies, target_points, method)
             plotly_traces.append({
-                'x': port_data['timestamp'].dt.strftime('%Y-%m-%d %H:%M:%S.%f').tolist(),
-                'y': port_data['latency_ms'].tolist(),
+                'x': np.asarray(epoch_ms, dtype='int64').tolist(),
+                'y': latencies.tolist(),
                 'mode': 'lines+markers',
                 'type': 'scatter',
                 'name': f'Backend {port} (ms)',
                 'marker': {'size': 4}
             })
-        logging.info(f"Prepared Plotly latency data with {len(plotly_traces)} traces.")
+        logging.info(f"Prepared Plotly latency data with {len(plotly_traces)} traces ({sum(len(t['x']) for t in plotly_traces)} points).")
     else:
         logging.info("No valid positive latency data for Plotly chart.")
     return plotly_traces
 
-def prepare_request_distribution_data(df_all_entries):
+def prepare_request_distribution_data(requests_per_port):
     distribution = {"labels": [], "data": []}
-    if not df_all_entries.empty:
-        dist_counts = df_all_entries['backend_port'].value_counts().sort_index()
-        distribution['labels'] = dist_counts.index.tolist()
-        distribution['data'] = dist_counts.values.tolist()
+    if requests_per_port:
+        distribution['labels'] = sorted(requests_per_port)
+        distribution['data'] = [requests_per_port[port] for port in distribution['labels']]
         logging.info(f"Prepared request distribution for ports: {distribution['labels']}")
     else:
         logging.info("No recent entries for distribution chart.")
     return distribution
 
-def prepare_sma_table_entries(df_all_entries, df_valid_latency):
-    table_entries = []
-    latest_smas = {}
-    if not df_valid_latency.empty:
-        grouped_by_port = df_valid_latency.groupby('backend_port')['latency_ms']
-        for port, group_data in grouped_by_port:
-            rolling_sma = group_data.rolling(3, min_periods=1).mean()
-            if not rolling_sma.empty:
-                latest_smas[port] = rolling_sma.iloc[-1]
-
-    for _, row in df_all_entries.iterrows():
-        table_entries.append({
-            'timestamp': row['timestamp'].strftime('%H:%M:%S.%f')[:-3],
-            'chosen': row['backend_port'],
-            'latency_ms': int(row['latency_ms']) if pd.notna(row['latency_ms']) else 'ERR',
-            'smaA': round(latest_smas.get('8081', float('nan')), 1) if pd.notna(latest_smas.get('8081')) else 'N/A',
-            'smaB': round(latest_smas.get('8082', float('nan')), 1) if pd.notna(latest_smas.get('8082')) else 'N/A',
-            'smaC': round(latest_smas.get('8083', float('nan')), 1) if pd.notna(latest_smas.get('8083')) else 'N/A',
-        })
+def format_backend_values(values, backends):
+    return {port: round(values[port], 1) if pd.notna(values.get(port)) else 'N/A' for port in backends}
+
+def prepare_sma_table_entries(df_entries, backends):
+    # Each row carries the SMA/EWMA of every backend from just before it was logged (see aggregation.py)
+    if df_entries.empty:
+        return []
+    timestamps = df_entries['timestamp'].dt.strftime('%H:%M:%S.%f').str[:-3]
+    latencies = df_entries['latency_ms'].astype(object).where(df_entries['latency_ms'].notna(), 'ERR')
+    table_entries = [{
+        'timestamp': timestamp,
+        'chosen': port,
+        'latency_ms': int(latency) if latency != 'ERR' else latency,
+        'sma': format_backend_values(sma, backends),
+        'ewma': format_backend_values(ewma, backends)
+    } for timestamp, port, latency, sma, ewma in zip(
+        timestamps, df_entries['backend_port'], latencies, df_entries['sma'], df_entries['ewma'])]
     logging.info(f"Prepared SMA table with {len(table_entries)} rows.")
     return table_entries
 
+def table_page(df_window, page, page_size):
+    """Rows for page 1 (newest) .. N (oldest), each page in log order."""
+    total_pages = max(1, math.ceil(len(df_window) / page_size))
+    page = min(max(page, 1), total_pages)
+    end = len(df_window) - (page - 1) * page_size
+    return df_window.iloc[max(0, end - page_size):end], {
+        'page': page, 'page_size': page_size, 'total_pages': total_pages, 'total_rows': len(df_window)}
+
 def generate_explanation_text(df_all_entries):
     if not df_all_entries.empty:
         last_row = df_all_entries.iloc[-1]
@@ -125,6 +261,47 @@ def calculate_overall_stats(df_all_entries):
         stats["avg_recent_latency"] = round(avg_latency, 1) if pd.notna(avg_latency) else 'N/A'
     return stats
 
+def read_health_events_df():
+    if not os.path.exists(HEALTH_EVENTS_FILE) or os.path.getsize(HEALTH_EVENTS_FILE) == 0:
+        return None
+    try:
+        df = pd.read_csv(HEALTH_EVENTS_FILE)
+    except pd.errors.EmptyDataError:
+        return None
+    except Exception as e:
+        logging.error(f"Error reading health events file: {e}", exc_info=True)
+        return None
+    if df.empty or not {'timestamp', 'backend_url', 'event', 'detail'}.issubset(df.columns):
+        return None
+    df['timestamp'] = pd.to_datetime(df['timestamp'], errors='coerce')
+    df.dropna(subset=['timestamp'], inplace=True)
+    df['backend_port'] = df['backend_url'].str.extract(r':(\d+)$').fillna('Unknown')
+    return df
+
+def prepare_backend_health(df_events):
+    backend_health = []
+    if df_events is None:
+        return backend_health
+    for port, group_data in df_events.sort_values('timestamp').groupby('backend_port'):
+        last_event = group_data.iloc[-1]
+        backend_health.append({
+            'backend': port,
+            'state': HEALTH_EVENT_STATES.get(last_event['event'], last_event['event']),
+            'since': last_event['timestamp'].strftime('%H:%M:%S'),
+            'ejections': int((group_data['event'] == 'ejected').sum())
+        })
+    return backend_health
+
+def prepare_health_event_entries(df_events):
+    if df_events is None:
+        return []
+    return [{
+        'timestamp': row.timestamp.strftime('%H:%M:%S.%f')[:-3],
+        'backend': row.backend_port,
+        'event': row.event,
+        'detail': row.detail
+    } for row in df_events.tail(RECENT_HEALTH_EVENTS).iloc[::-1].itertuples()]
+
 @app.route('/')
 def serve_dashboard_page():
     template_path = os.path.join(app.template_folder, 'dashboard.html')
@@ -133,49 +310,187 @@ def serve_dashboard_page():
         return "Error: Dashboard template not found.", 500
     return render_template('dashboard.html')
 
-@app.route('/data')
-def provide_dashboard_data():
-    logging.info("Received request for /data")
-    
+def parse_time_bound(value):
+    """Epoch ms or a date string as a naive local timestamp, the clock the proxies log in (datetime.now()).
+    Raises ValueError for anything else, so the routes can answer 400."""
+    if value is None or value == '':
+        return None
+    try:
+        epoch_s = float(value) / 1000
+    except ValueError:
+        bound = pd.to_datetime(value) # Plotly reports zoomed ranges as date strings
+    else:
+        try:
+            return pd.Timestamp(datetime.datetime.fromtimestamp(epoch_s))
+        except (OverflowError, OSError) as e:
+            raise ValueError(f"{value} is not a usable epoch ms bound") from e
+    if bound is pd.NaT:
+        raise ValueError(f"{value} is not a date")
+    if bound.tzinfo is not None:
+        # A UTC or offset date string names an instant; compare it in local time like the log
+        bound = pd.Timestamp(bound.to_pydatetime().astimezone().replace(tzinfo=None))
+    return bound
+
+def parse_plot_options(args):
+    """Read ?points=, ?downsample=, ?start=, ?end= (epoch ms or date strings), ?page= and ?page_size=."""
+    try:
+        target_points = int(args.get('points', DEFAULT_TARGET_POINTS))
+        page = int(args.get('page', 1))
+        page_size = int(args.get('page_size', DASHBOARD_TABLE_ROWS))
+        start_time = parse_time_bound(args.get('start'))
+        end_time = parse_time_bound(args.get('end'))
+    except (ValueError, TypeError) as e:
+        return None, f"Invalid plot options: {e}"
+    method = args.get('downsample', DEFAULT_DOWNSAMPLING)
+    if method not in DOWNSAMPLING_METHODS:
+        return None, f"Unknown downsampling method '{method}' (expected one of {', '.join(DOWNSAMPLING_METHODS)})"
+    return {
+        'target_points': min(max(target_points, 2), MAX_TARGET_POINTS),
+        'method': method,
+        'start_time': start_time,
+        'end_time': end_time,
+        'page': page,
+        'page_size': min(max(page_size, 1), MAX_TABLE_PAGE_SIZE)
+    }, None
+
+def build_snapshot_payload(plot_options):
     output_payload = {
         "plotly_latency_data": [],
         "request_distribution": {"labels": [], "data": []},
         "sma_table": [],
         "explanation": "Waiting for data...",
         "current_mode": "Unknown",
-        "avg_recent_latency": "N/A"
+        "avg_recent_latency": "N/A",
+        "max_plot_points": dashboard_state.window.maxlen,
+        "max_table_rows": plot_options['page_size']
     }
+    output_payload["backend_health"], output_payload["health_events"] = dashboard_state.health()
 
-    df_all_logs, error_message = read_and_validate_log_df()
+    if dashboard_state.error_message:
+        if "Log file not found" in dashboard_state.error_message:
+            output_payload["error"] = dashboard_state.error_message
+            return 404, output_payload
+        output_payload["message"] = dashboard_state.error_message
+        return 200, output_payload
+    if not dashboard_state.window:
+        output_payload["message"] = "No valid data in log file."
+        return 200, output_payload
 
-    if error_message and not df_all_logs: # Covers file not found, empty, format error before df creation
-        if "Log file not found" in error_message:
-             output_payload["error"] = error_message
-             return jsonify(output_payload), 404
-        output_payload["message"] = error_message # For empty or no valid data
-        return jsonify(output_payload)
-    
-    if df_all_logs is None : # Should be caught by above, but as a safeguard
-        output_payload["error"] = "Failed to process log data due to an unexpected issue."
-        return jsonify(output_payload), 500
+    df_window = pd.DataFrame(list(dashboard_state.window))
+    df_valid_latency_logs = df_window[df_window['latency_ms'] > 0]
+    if plot_options['start_time'] is not None:
+        df_valid_latency_logs = df_valid_latency_logs[df_valid_latency_logs['timestamp'] >= plot_options['start_time']]
+    if plot_options['end_time'] is not None:
+        df_valid_latency_logs = df_valid_latency_logs[df_valid_latency_logs['timestamp'] <= plot_options['end_time']]
 
-    df_valid_latency_logs = df_all_logs[df_all_logs['latency_ms'] > 0].copy()
+    output_payload["plotly_latency_data"] = prepare_plotly_latency_traces(
+        df_valid_latency_logs, plot_options['target_points'], plot_options['method'])
+    output_payload["request_distribution"] = prepare_request_distribution_data(dashboard_state.requests_per_port)
+    df_page, output_payload["sma_table_page"] = table_page(df_window, plot_options['page'], plot_options['page_size'])
+    output_payload["table_backends"] = dashboard_state.backends()
+    output_payload["sma_table"] = prepare_sma_table_entries(df_page, output_payload["table_backends"])
+    output_payload["explanation"] = generate_explanation_text(df_window)
 
-    output_payload["plotly_latency_data"] = prepare_plotly_latency_traces(df_valid_latency_logs)
-    output_payload["request_distribution"] = prepare_request_distribution_data(df_all_logs)
-    output_payload["sma_table"] = prepare_sma_table_entries(df_all_logs, df_valid_latency_logs)
-    output_payload["explanation"] = generate_explanation_text(df_all_logs)
-    
-    overall_stats = calculate_overall_stats(df_all_logs)
+    overall_stats = calculate_overall_stats(df_window)
     output_payload["current_mode"] = overall_stats["current_mode"]
     output_payload["avg_recent_latency"] = overall_stats["avg_recent_latency"]
+    return 200, output_payload
+
+def build_update_payload(new_rows):
+    # Only the appended rows are formatted; everything else comes from the running aggregates
+    output_payload = {}
+    output_payload["backend_health"], output_payload["health_events"] = dashboard_state.health()
+    if not new_rows:
+        return output_payload
 
+    df_new = pd.DataFrame(new_rows)
+    df_recent = pd.DataFrame(dashboard_state.recent_rows(RECENT_ENTRIES_STATS_WINDOW))
+    output_payload["new_latency_points"] = prepare_plotly_latency_traces(df_new[df_new['latency_ms'] > 0])
+    output_payload["table_backends"] = dashboard_state.backends()
+    output_payload["new_sma_rows"] = prepare_sma_table_entries(df_new.tail(DASHBOARD_TABLE_ROWS), output_payload["table_backends"])
+    output_payload["request_distribution"] = prepare_request_distribution_data(dashboard_state.requests_per_port)
+    output_payload["explanation"] = generate_explanation_text(df_new)
+
+    overall_stats = calculate_overall_stats(df_recent)
+    output_payload["current_mode"] = overall_stats["current_mode"]
+    output_payload["avg_recent_latency"] = overall_stats["avg_recent_latency"]
+    return output_payload
+
+def format_server_sent_event(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+def stream_dashboard_events(plot_options):
+    generation, last_seq, last_health = None, -1, None
+    idle_s = 0.0
+    while True:
+        dashboard_state.refresh()
+        with dashboard_state.lock:
+            if generation is None or dashboard_state.is_behind(generation, last_seq):
+                event, (_, payload) = 'snapshot', build_snapshot_payload(plot_options)
+            else:
+                new_rows = dashboard_state.rows_since(last_seq)
+                health = dashboard_state.health()
+                event = 'update'
+                payload = build_update_payload(new_rows) if new_rows or health is not last_health else None
+            generation, last_seq = dashboard_state.generation, dashboard_state.next_seq - 1
+            last_health = dashboard_state.health()
+        if payload is not None:
+            idle_s = 0.0
+            yield format_server_sent_event(event, payload)
+        elif idle_s >= SSE_KEEPALIVE_S:
+            idle_s = 0.0
+            yield ": keep-alive\n\n" # Lets the server notice a closed tab
+        time.sleep(DASHBOARD_PUSH_INTERVAL_S)
+        idle_s += DASHBOARD_PUSH_INTERVAL_S
+
+@app.route('/data')
+def provide_dashboard_data():
+    logging.info("Received request for /data")
+    plot_options, error_message = parse_plot_options(request.args)
+    if plot_options is None:
+        return jsonify({"error": error_message}), 400
+    dashboard_state.refresh()
+    with dashboard_state.lock:
+        status_code, output_payload = build_snapshot_payload(plot_options)
     logging.info(f"Sending data: Mode={output_payload['current_mode']}, AvgLat={output_payload['avg_recent_latency']}")
-    return jsonify(output_payload)
+    return jsonify(output_payload), status_code
+
+@app.route('/events')
+def stream_dashboard_data():
+    logging.info("Dashboard client subscribed to /events")
+    plot_options, error_message = parse_plot_options(request.args)
+    if plot_options is None:
+        return jsonify({"error": error_message}), 400
+    return Response(stream_with_context(stream_dashboard_events(plot_options)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/history')
+def provide_log_history():
+    """Logged requests in ?start=..&end= (epoch ms or date strings), optionally for ?backend=<url>,
+    with per-backend totals and percentiles. Old data is read from the rotated log segments."""
+    try:
+        start_time = parse_time_bound(request.args.get('start'))
+        end_time = parse_time_bound(request.args.get('end'))
+        limit = min(max(int(request.args.get('limit', DEFAULT_HISTORY_ROWS)), 0), MAX_HISTORY_ROWS)
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": f"Invalid history query: {e}"}), 400
+    backend_url = request.args.get('backend') or None
+    df_history, segments_read = read_log_history(start_time, end_time, backend_url)
+    df_rows = df_history[HISTORY_COLUMNS].head(limit).assign(timestamp=lambda df: df['timestamp'].map(pd.Timestamp.isoformat))
+    return jsonify({
+        "start": start_time.isoformat() if start_time is not None else None,
+        "end": end_time.isoformat() if end_time is not None else None,
+        "backend": backend_url,
+        "segments_read": segments_read,
+        "total_rows": int(len(df_history)),
+        "truncated": len(df_history) > limit,
+        "summary": summarize_history(df_history),
+        "rows": df_rows.astype(object).where(df_rows.notna(), None).to_dict('records'),
+    })
 
 if __name__ == '__main__':
     dashboard_port = int(os.environ.get('DASHBOARD_PORT', 5002))
     print(f"Starting Flask dashboard server on http://0.0.0.0:{dashboard_port}")
     print(f"Reading live data from: {os.path.abspath(LOG_FILE)}")
     print("Ensure the proxy server is running and generating logs.")
-    app.run(debug=True, host='0.0.0.0', port=dashboard_port)
+    app.run(debug=True, host='0.0.0.0', port=dashboard_port, threaded=True) # One thread per /events subscriber
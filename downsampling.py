@@ -0,0 +1,59 @@
+import numpy as np
+
+DOWNSAMPLING_METHODS = ('lttb', 'minmax')
+
+def lttb(x, y, target_points):
+    """Largest-Triangle-Three-Buckets: keeps first and last points plus, from each bucket,
+    the point forming the largest triangle with the previous pick and the next bucket's mean."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    length = len(x)
+    if target_points >= length or target_points < 3:
+        return x, y
+    bucket_edges = np.linspace(1, length - 1, target_points - 1).astype(int)
+    selected = np.empty(target_points, dtype=int)
+    selected[0] = 0
+    selected[-1] = length - 1
+    previous = 0
+    for i in range(target_points - 2):
+        start, end = bucket_edges[i], bucket_edges[i + 1]
+        next_end = bucket_edges[i + 2] if i + 2 < len(bucket_edges) else length
+        next_start = end
+        if next_start >= next_end:
+            next_x, next_y = x[-1], y[-1]
+        else:
+            next_x, next_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        if start >= end:
+            selected[i + 1] = min(start, length - 1)
+            previous = selected[i + 1]
+            continue
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[i + 1] = previous
+    selected = np.unique(selected)
+    return x[selected], y[selected]
+
+def min_max_buckets(x, y, target_points):
+    """Keeps the minimum and maximum of each of target_points / 2 equal-count buckets, in time order,
+    so single-request latency spikes are never averaged away."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    length = len(x)
+    if target_points >= length or target_points < 2:
+        return x, y
+    bucket_edges = np.linspace(0, length, target_points // 2 + 1).astype(int)
+    selected = []
+    for start, end in zip(bucket_edges[:-1], bucket_edges[1:]):
+        if start >= end:
+            continue
+        low = start + int(np.argmin(y[start:end]))
+        high = start + int(np.argmax(y[start:end]))
+        selected.extend((low, high) if low <= high else (high, low))
+    selected = np.unique(selected)
+    return x[selected], y[selected]
+
+def downsample(x, y, target_points, method='lttb'):
+    if method == 'minmax':
+        return min_max_buckets(x, y, target_points)
+    return lttb(x, y, target_points)
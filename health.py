@@ -0,0 +1,209 @@
+import asyncio
+import random
+import time
+from aiohttp import ClientSession, ClientTimeout
+
+HEALTHY = 'healthy'
+EJECTED = 'ejected'
+HALF_OPEN = 'half_open'
+DRAINING = 'draining'
+
+SLOW_START_MIN_WEIGHT = 0.1
+
+class BackendHealth:
+    def __init__(self):
+        self.state = HEALTHY
+        self.consecutive_failures = 0
+        self.probe_successes = 0
+        self.probe_failures = 0
+        self.ejection_count = 0
+        self.ejected_until = 0.0
+        self.recovered_at = None
+        self.trial_requests = 0
+
+class HealthTracker:
+    """Circuit breaker per backend, fed by passive request outcomes and active health probes.
+
+    healthy -> ejected after consecutive failures (passive) or failed probes (active);
+    ejected -> half_open once the exponential backoff expires or probes pass again;
+    half_open -> healthy on a successful trial request, back to ejected on a failed one, or healthy
+    when probes keep passing while every trial slot stays taken (e.g. by a request that never reported).
+    A recovered backend then ramps up from SLOW_START_MIN_WEIGHT over slow_start_s.
+    A draining backend gets no new traffic and ignores outcomes until it is removed or undrained.
+    """
+
+    def __init__(self, backend_urls, check_path='/health', check_interval_s=2.0, check_timeout_s=1.0,
+                 healthy_threshold=2, unhealthy_threshold=3, failures_to_eject=5,
+                 base_ejection_s=5.0, max_ejection_s=60.0, half_open_max_requests=1,
+                 slow_start_s=10.0, on_event=None):
+        self.backends = {url: BackendHealth() for url in backend_urls}
+        self.check_path = check_path
+        self.check_interval_s = check_interval_s
+        self.check_timeout_s = check_timeout_s
+        self.healthy_threshold = healthy_threshold
+        self.unhealthy_threshold = unhealthy_threshold
+        self.failures_to_eject = failures_to_eject
+        self.base_ejection_s = base_ejection_s
+        self.max_ejection_s = max_ejection_s
+        self.half_open_max_requests = half_open_max_requests
+        self.slow_start_s = slow_start_s
+        self.on_event = on_event
+        self._check_task = None
+
+    def _emit(self, url, event, detail):
+        if self.on_event is not None:
+            self.on_event(url, event, detail)
+
+    def _eject(self, url, reason, now):
+        health = self.backends[url]
+        health.ejection_count += 1
+        backoff_s = min(self.max_ejection_s, self.base_ejection_s * 2 ** (health.ejection_count - 1))
+        health.state = EJECTED
+        health.ejected_until = now + backoff_s
+        health.consecutive_failures = 0
+        health.probe_successes = 0
+        health.trial_requests = 0
+        health.recovered_at = None
+        self._emit(url, 'ejected', f"{reason}; backoff {backoff_s:.0f}s")
+
+    def _half_open(self, url, reason):
+        health = self.backends[url]
+        health.state = HALF_OPEN
+        health.trial_requests = 0
+        health.probe_successes = 0 # Recovering on probes alone takes healthy_threshold more passes
+        self._emit(url, 'half_open', reason)
+
+    def _recover(self, url, now):
+        health = self.backends[url]
+        health.state = HEALTHY
+        health.consecutive_failures = 0
+        health.trial_requests = 0
+        health.recovered_at = now
+        self._emit(url, 'recovered', f"slow start over {self.slow_start_s:.0f}s")
+
+    def add_backend(self, url):
+        if url not in self.backends:
+            self.backends[url] = BackendHealth()
+            self._emit(url, 'added', "joined the pool")
+
+    def drain(self, url):
+        health = self.backends[url]
+        if health.state != DRAINING:
+            health.state = DRAINING
+            self._emit(url, 'draining', "no new requests")
+
+    def undrain(self, url):
+        health = self.backends[url]
+        if health.state == DRAINING:
+            self.backends[url] = BackendHealth()
+            self._emit(url, 'undrained', "accepting requests again")
+
+    def remove_backend(self, url):
+        if self.backends.pop(url, None) is not None:
+            self._emit(url, 'removed', "left the pool")
+
+    def slow_start_weight(self, url, now=None):
+        health = self.backends[url]
+        if health.recovered_at is None or self.slow_start_s <= 0:
+            return 1.0
+        elapsed_s = (time.monotonic() if now is None else now) - health.recovered_at
+        return max(SLOW_START_MIN_WEIGHT, min(1.0, elapsed_s / self.slow_start_s))
+
+    def is_routable(self, url, now=None):
+        """Whether url may take the next request; checking one backend at a time lets score-ordered
+        selection stop at the first routable backend instead of filtering the whole pool."""
+        health = self.backends.get(url)
+        if health is None:
+            return False
+        now = time.monotonic() if now is None else now
+        if health.state == EJECTED and now >= health.ejected_until:
+            self._half_open(url, "backoff expired")
+        if health.state == HEALTHY:
+            # Slow start admits a recovering backend into this pick with probability equal to its weight
+            weight = self.slow_start_weight(url, now)
+            return weight >= 1.0 or random.random() < weight
+        return health.state == HALF_OPEN and health.trial_requests < self.half_open_max_requests
+
+    def routable_backends(self):
+        now = time.monotonic()
+        return [url for url in self.backends if self.is_routable(url, now)]
+
+    def on_selected(self, url):
+        health = self.backends[url]
+        if health.state == HALF_OPEN:
+            health.trial_requests += 1
+
+    def record_result(self, url, success):
+        # success=None means the request ended without a verdict on the backend (e.g. the client went away)
+        health = self.backends[url]
+        now = time.monotonic()
+        if health.state == HALF_OPEN:
+            health.trial_requests = max(0, health.trial_requests - 1)
+            if success is None:
+                return
+            if success:
+                self._recover(url, now)
+            else:
+                self._eject(url, "trial request failed", now)
+            return
+        if health.state in (EJECTED, DRAINING) or success is None:
+            return # Late result from a request sent before the ejection or drain
+        if success:
+            health.consecutive_failures = 0
+            if health.recovered_at is not None and self.slow_start_weight(url, now) >= 1.0:
+                health.recovered_at = None
+                health.ejection_count = 0 # Stayed healthy through slow start, so the next backoff starts small again
+            return
+        health.consecutive_failures += 1
+        if health.consecutive_failures >= self.failures_to_eject:
+            self._eject(url, f"{health.consecutive_failures} consecutive failures", now)
+
+    def record_probe(self, url, healthy):
+        health = self.backends.get(url)
+        if health is None or health.state == DRAINING:
+            return # Removed or draining while the probe was in flight
+        if healthy:
+            health.probe_failures = 0
+            health.probe_successes += 1
+            if health.state == EJECTED and health.probe_successes >= self.healthy_threshold:
+                self._half_open(url, f"{health.probe_successes} health checks passed")
+            elif (health.state == HALF_OPEN and health.trial_requests >= self.half_open_max_requests
+                  and health.probe_successes >= self.healthy_threshold):
+                self._recover(url, time.monotonic())
+        else:
+            health.probe_successes = 0
+            health.probe_failures += 1
+            if health.state != EJECTED and health.probe_failures >= self.unhealthy_threshold:
+                self._eject(url, f"{health.probe_failures} failed health checks", time.monotonic())
+
+    async def probe(self, session, url):
+        try:
+            async with session.get(f"{url}{self.check_path}") as response:
+                return response.status < 500
+        except Exception:
+            return False
+
+    async def run_active_checks(self):
+        async with ClientSession(timeout=ClientTimeout(total=self.check_timeout_s)) as session:
+            while True:
+                urls = list(self.backends)
+                results = await asyncio.gather(*(self.probe(session, url) for url in urls))
+                for url, healthy in zip(urls, results):
+                    self.record_probe(url, healthy)
+                await asyncio.sleep(self.check_interval_s)
+
+    def start(self):
+        if self.check_interval_s > 0:
+            self._check_task = asyncio.create_task(self.run_active_checks())
+
+    async def stop(self):
+        if self._check_task is not None:
+            self._check_task.cancel()
+            try:
+                await self._check_task
+            except asyncio.CancelledError:
+                pass
+            self._check_task = None
+
+    def snapshot(self):
+        return {url: health.state for url, health in self.backends.items()}
@@ -0,0 +1,134 @@
+import asyncio
+import collections
+import time
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+BackendReply = collections.namedtuple('BackendReply', ['status', 'reason', 'headers', 'body', 'ttfb_ms', 'latency_ms', 'queue_ms'],
+                                      defaults=(0,))
+
+class RetryBudget:
+    """Token bucket that caps hedges and retries at a percentage of primary traffic.
+
+    Every primary request deposits percent/100 of a token (up to max_tokens); every
+    hedge or retry withdraws a whole token. min_per_s keeps a trickle available when
+    traffic is too low to earn tokens.
+    """
+
+    def __init__(self, percent=10.0, max_tokens=10.0, min_per_s=1.0):
+        self.deposit_per_request = percent / 100.0
+        self.max_tokens = max_tokens
+        self.min_per_s = min_per_s
+        self.tokens = max_tokens
+        self._last_refill = time.monotonic()
+
+    def deposit(self):
+        now = time.monotonic()
+        refill = (now - self._last_refill) * self.min_per_s
+        self._last_refill = now
+        self.tokens = min(self.max_tokens, self.tokens + self.deposit_per_request + refill)
+
+    def try_withdraw(self):
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+class HedgeDelay:
+    """Fixed hedge delay, or a percentile of recently observed latencies."""
+
+    def __init__(self, fixed_ms=None, percentile=95, window_size=1000, min_ms=10.0, fallback_ms=100.0,
+                 recompute_every=50):
+        self.fixed_ms = fixed_ms
+        self.percentile = percentile
+        self.min_ms = min_ms
+        self.recompute_every = recompute_every
+        self._recent_latencies = collections.deque(maxlen=window_size)
+        self._observations_since_recompute = 0
+        self._current_ms = fixed_ms if fixed_ms is not None else fallback_ms
+
+    def observe(self, latency_ms):
+        if self.fixed_ms is not None or latency_ms <= 0:
+            return
+        self._recent_latencies.append(latency_ms)
+        self._observations_since_recompute += 1
+        # Sorting on every request would put O(window log window) on the hot path; refresh periodically instead
+        if self._observations_since_recompute >= self.recompute_every:
+            self._observations_since_recompute = 0
+            ordered = sorted(self._recent_latencies)
+            index = min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))
+            self._current_ms = max(self.min_ms, ordered[index])
+
+    def delay_s(self):
+        return self._current_ms / 1000.0
+
+class HedgeStats:
+    def __init__(self):
+        self.hedges_sent = 0
+        self.retries_sent = 0
+        self.hedge_wins = 0
+        self.primary_wins_after_hedge = 0
+        self.budget_denied = 0
+        self.losses_by_backend = collections.Counter()
+
+    def summary(self):
+        return (f"hedges={self.hedges_sent} retries={self.retries_sent} hedge_wins={self.hedge_wins} "
+                f"primary_wins_after_hedge={self.primary_wins_after_hedge} budget_denied={self.budget_denied} "
+                f"losses={dict(self.losses_by_backend)}")
+
+async def race_with_hedge(send_attempt, primary_url, pick_alternate_backend, hedge_delay_s, budget, stats,
+                          is_success):
+    """Run send_attempt(primary_url); hedge to another backend if it is slow, or retry once if it fails.
+
+    Returns (outcome, role, url) for the first successful attempt, where role is 'primary', 'hedge'
+    or 'retry'. If every attempt fails, returns the last failure, with outcome being the raised
+    exception. Attempts still running when a winner is found are cancelled.
+    """
+    budget.deposit()
+    start_time = time.monotonic()
+    attempts = {asyncio.create_task(send_attempt(primary_url)): ('primary', primary_url)}
+    second_attempt_used = False
+    last_failure = None
+
+    def launch_second_attempt(role):
+        if not budget.try_withdraw():
+            stats.budget_denied += 1
+            return
+        alternate_url = pick_alternate_backend(primary_url)
+        if alternate_url is None:
+            return
+        if role == 'hedge':
+            stats.hedges_sent += 1
+        else:
+            stats.retries_sent += 1
+        attempts[asyncio.create_task(send_attempt(alternate_url))] = (role, alternate_url)
+
+    try:
+        while attempts:
+            timeout = None if second_attempt_used else max(0.0, start_time + hedge_delay_s - time.monotonic())
+            done, _ = await asyncio.wait(attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                second_attempt_used = True
+                launch_second_attempt('hedge')
+                continue
+            for task in done:
+                role, url = attempts.pop(task)
+                outcome = task.exception() or task.result()
+                if not isinstance(outcome, BaseException) and is_success(outcome):
+                    if role == 'hedge':
+                        stats.hedge_wins += 1
+                    elif second_attempt_used and attempts:
+                        stats.primary_wins_after_hedge += 1
+                    for loser_role, loser_url in attempts.values():
+                        stats.losses_by_backend[loser_url] += 1
+                    return outcome, role, url
+                last_failure = (outcome, role, url)
+            if not attempts and not second_attempt_used:
+                second_attempt_used = True
+                launch_second_attempt('retry')
+        return last_failure
+    finally:
+        for task in attempts:
+            task.cancel()
+        if attempts:
+            await asyncio.gather(*attempts, return_exceptions=True)
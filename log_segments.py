@@ -0,0 +1,177 @@
+import collections
+import contextlib
+import csv
+import datetime
+import fcntl
+import gzip
+import json
+import os
+import shutil
+import time
+
+SEGMENT_INDEX_FILE = 'index.json'
+SEGMENT_LOCK_FILE = '.lock'
+SEGMENT_GRACE_S = 2.0 # Other --workers processes may still append to a just-rotated file for a moment
+
+def parse_log_time(value):
+    """Epoch seconds of a log timestamp (naive ISO local time, as the proxies write it), or None."""
+    try:
+        return datetime.datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+class LogSegments:
+    """Size- and time-based rotation of a CSV log into gzip-compressed segments.
+
+    Closed segments live in segment_dir next to index.json, which records each segment's
+    first and last timestamp, row count and rows per backend, so a reader can open only the
+    segments that overlap a query. Rotation, the index and retention are guarded by a lock
+    file, so several processes appending to the same log can share one segment directory.
+    0 disables a limit.
+    """
+
+    def __init__(self, log_path, segment_dir=None, rotate_bytes=0, rotate_interval_s=0,
+                 retention_s=0, retention_bytes=0):
+        self.log_path = log_path
+        root, _ = os.path.splitext(log_path)
+        self.segment_dir = segment_dir or f"{root}_segments"
+        self.rotate_bytes = rotate_bytes
+        self.rotate_interval_s = rotate_interval_s
+        self.retention_s = retention_s
+        self.retention_bytes = retention_bytes
+        self.index_path = os.path.join(self.segment_dir, SEGMENT_INDEX_FILE)
+
+    @contextlib.contextmanager
+    def locked(self):
+        os.makedirs(self.segment_dir, exist_ok=True)
+        with open(os.path.join(self.segment_dir, SEGMENT_LOCK_FILE), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def live_file_started_at(self):
+        """When the live log's first row was written; now if it has none yet."""
+        try:
+            with open(self.log_path, newline='') as f:
+                first_row = next(csv.DictReader(f), None)
+        except FileNotFoundError:
+            first_row = None
+        started_at = parse_log_time(first_row.get('timestamp')) if first_row else None
+        return started_at if started_at is not None else time.time()
+
+    def rotation_due(self, size, started_at, now=None):
+        if self.rotate_bytes and size >= self.rotate_bytes:
+            return True
+        now = time.time() if now is None else now
+        return bool(self.rotate_interval_s) and size > 0 and now - started_at >= self.rotate_interval_s
+
+    def close_live_file(self):
+        """Move the live log into segment_dir; the caller holds the lock and recreates the live file."""
+        stem = os.path.splitext(os.path.basename(self.log_path))[0]
+        closed_at = datetime.datetime.now().strftime('%Y%m%dT%H%M%S%f')
+        segment_path = os.path.join(self.segment_dir, f"{stem}.{closed_at}.{os.getpid()}.csv")
+        os.replace(self.log_path, segment_path)
+        return segment_path
+
+    def pending_segments(self, min_age_s=SEGMENT_GRACE_S):
+        """Closed but uncompressed segments, e.g. left behind by a process that died mid-rotation."""
+        if not os.path.isdir(self.segment_dir):
+            return []
+        now = time.time()
+        pending = []
+        for name in sorted(os.listdir(self.segment_dir)):
+            path = os.path.join(self.segment_dir, name)
+            if name.endswith('.csv') and now - os.path.getmtime(path) >= min_age_s:
+                pending.append(path)
+        return pending
+
+    def finish_segment(self, segment_path):
+        """Compress a closed segment, add it to the index and apply retention. Returns the index
+        entry, or None if another process already took the segment."""
+        working_path = f"{segment_path}.compressing"
+        try:
+            os.rename(segment_path, working_path) # Claims the segment; only one process wins
+        except FileNotFoundError:
+            return None
+        compressed_path = f"{segment_path}.gz"
+        first_at = last_at = None
+        rows = 0
+        rows_per_backend = collections.Counter()
+        with open(working_path, 'rb') as source, gzip.open(compressed_path, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        with open(working_path, newline='') as source:
+            for row in csv.DictReader(source):
+                timestamp = row.get('timestamp')
+                if not timestamp:
+                    continue
+                # ISO timestamps from the same clock sort as strings
+                first_at = timestamp if first_at is None or timestamp < first_at else first_at
+                last_at = timestamp if last_at is None or timestamp > last_at else last_at
+                rows += 1
+                rows_per_backend[row.get('backend_url', '')] += 1
+        os.remove(working_path)
+        if rows == 0:
+            os.remove(compressed_path)
+            return None
+        entry = {
+            'file': os.path.basename(compressed_path),
+            'first_timestamp': first_at,
+            'last_timestamp': last_at,
+            'rows': rows,
+            'bytes': os.path.getsize(compressed_path),
+            'backends': dict(rows_per_backend),
+        }
+        with self.locked():
+            entries = self.read_index()
+            entries.append(entry)
+            self._write_index(self._apply_retention(entries))
+        return entry
+
+    def _apply_retention(self, entries):
+        entries.sort(key=lambda entry: entry['last_timestamp'] or '')
+        now = time.time()
+        total_bytes = sum(entry['bytes'] for entry in entries)
+        kept = []
+        for position, entry in enumerate(entries):
+            last_at = parse_log_time(entry['last_timestamp'])
+            expired = self.retention_s and (last_at is None or now - last_at > self.retention_s)
+            # Newest segments are kept first, so only the oldest go to stay under retention_bytes
+            over_budget = self.retention_bytes and total_bytes > self.retention_bytes and position < len(entries) - 1
+            if expired or over_budget:
+                total_bytes -= entry['bytes']
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(os.path.join(self.segment_dir, entry['file']))
+            else:
+                kept.append(entry)
+        return kept
+
+    def read_index(self):
+        try:
+            with open(self.index_path) as index_file:
+                return json.load(index_file)
+        except FileNotFoundError:
+            return []
+
+    def _write_index(self, entries):
+        temporary_path = f"{self.index_path}.tmp"
+        with open(temporary_path, 'w') as index_file:
+            json.dump(entries, index_file, indent=1)
+        os.replace(temporary_path, self.index_path) # Readers never see a half-written index
+
+    def segments_between(self, start=None, end=None, backend_url=None):
+        """Paths of segments whose rows may fall in [start, end] (ISO strings, None for open-ended)
+        and that contain backend_url, oldest first."""
+        paths = []
+        for entry in sorted(self.read_index(), key=lambda entry: entry['first_timestamp'] or ''):
+            if entry['first_timestamp'] is None:
+                continue
+            if end is not None and entry['first_timestamp'] > end:
+                continue
+            if start is not None and entry['last_timestamp'] < start:
+                continue
+            if backend_url is not None and backend_url not in entry['backends']:
+                continue
+            paths.append(os.path.join(self.segment_dir, entry['file']))
+        return paths
@@ -0,0 +1,96 @@
+import io
+import os
+import pandas as pd
+
+DEFAULT_LOG_COLUMNS = ['timestamp', 'backend_url', 'latency_ms', 'status_code', 'routing_mode']
+MAX_READ_BYTES = 4 * 1024 * 1024 # A large backlog is consumed over several reads instead of all at once
+
+class LogTail:
+    """Follows an append-only CSV log, parsing only the complete lines added since the last read.
+
+    The file is kept open, so when access_log.py rotates it into a segment the rows appended
+    to the old file after the last read are still returned before moving on to the new one
+    (rotation_count is bumped). If the file is truncated, disappears, or is replaced by one with
+    different columns (access_log.py sets a log aside when its header changes), it is re-read
+    from the start and reset_count is bumped.
+    """
+
+    def __init__(self, path, max_read_bytes=MAX_READ_BYTES):
+        self.path = path
+        self.max_read_bytes = max_read_bytes
+        self.columns = None
+        self.offset = 0
+        self.reset_count = 0
+        self.rotation_count = 0
+        self._file = None
+        self._header_pending = False
+
+    def _reset(self):
+        self.columns = None
+        self.reset_count += 1
+
+    def _open(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(self.path, 'rb')
+        self.offset = 0
+        self._header_pending = True
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read_complete_lines(self, max_bytes=None):
+        self._file.seek(self.offset)
+        chunk = self._file.read(max_bytes if max_bytes is not None else -1)
+        complete_length = chunk.rfind(b'\n') + 1 # A half-written last line is left for the next read
+        self.offset += complete_length
+        return chunk[:complete_length]
+
+    def _take_header(self, chunk):
+        first_line, _, rest = chunk.partition(b'\n')
+        if b'timestamp' in first_line.lower():
+            return first_line.decode('utf-8').strip().split(','), rest
+        return DEFAULT_LOG_COLUMNS, chunk
+
+    def read_new_rows(self):
+        """Return a DataFrame of rows appended since the last call (empty if none), or None if the file is missing."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._file is not None:
+                self._close()
+                self._reset()
+            return None
+
+        rotated_rows = b''
+        if self._file is None:
+            self._open()
+            self._reset()
+        elif stat.st_ino != os.fstat(self._file.fileno()).st_ino:
+            rotated_rows = self._read_complete_lines() # The old file's last rows, written before it was rotated away
+            if self._header_pending and rotated_rows:
+                columns, rotated_rows = self._take_header(rotated_rows)
+                self.columns = self.columns or columns
+            self._open()
+        elif stat.st_size < self.offset:
+            self._open()
+            self._reset()
+
+        chunk = self._read_complete_lines(self.max_read_bytes)
+        if self._header_pending and chunk:
+            self._header_pending = False
+            columns, chunk = self._take_header(chunk)
+            if self.columns is None:
+                self.columns = columns
+            elif columns == self.columns:
+                self.rotation_count += 1
+            else:
+                self._reset()
+                self.columns = columns
+                rotated_rows = b'' # Rows with the old columns belong to the previous generation
+        chunk = rotated_rows + chunk
+        if not chunk.strip():
+            return pd.DataFrame(columns=self.columns or DEFAULT_LOG_COLUMNS)
+        return pd.read_csv(io.BytesIO(chunk), header=None, names=self.columns, index_col=False)
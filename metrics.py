@@ -0,0 +1,160 @@
+import bisect
+import math
+
+# Upper bucket bounds in milliseconds; rendered in seconds, as Prometheus expects
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# Proxy-side phases mostly take microseconds, far below the first latency bucket
+PHASE_BUCKETS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 100, 1000)
+STATUS_CLASSES = ('1xx', '2xx', '3xx', '4xx', '5xx')
+QUANTILES = (0.5, 0.95, 0.99)
+
+def format_labels(labels):
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels.items()) + '}' if labels else ''
+
+def format_value(value):
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return 'NaN'
+    if isinstance(value, float) and math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+class LatencyHistogram:
+    """Fixed-bucket histogram; observe() only bumps preallocated counters."""
+
+    __slots__ = ('bounds', 'counts', 'count', 'total')
+
+    def __init__(self, bounds=LATENCY_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1) # Last slot is the +Inf overflow bucket
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value_ms):
+        self.counts[bisect.bisect_left(self.bounds, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+
+    def quantile(self, q):
+        """Estimate the q-quantile in ms by interpolating inside the bucket that holds it."""
+        if self.count == 0:
+            return math.nan
+        rank = q * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= rank:
+                if i == len(self.bounds):
+                    return float(self.bounds[-1]) # Beyond the last bound there is nothing to interpolate against
+                lower = self.bounds[i - 1] if i > 0 else 0.0
+                return lower + (self.bounds[i] - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return float(self.bounds[-1])
+
+class ProxyMetrics:
+    """Request counters and latency histograms per backend, rendered in Prometheus text format."""
+
+    def __init__(self, backend_urls, bounds=LATENCY_BUCKETS_MS):
+        self.backend_urls = list(backend_urls)
+        self.bounds = tuple(bounds)
+        self.latency = {url: LatencyHistogram(self.bounds) for url in self.backend_urls}
+        self.ttfb = {url: LatencyHistogram(self.bounds) for url in self.backend_urls}
+        self.queue_delay = {} # Filled only when admission control records waits
+        self.phases = {} # Per phase, filled as forwarded requests record their PhaseTimer
+        self.overhead = {} # Per routing mode
+        self.responses_by_mode = {}
+
+    def _responses_for(self, mode):
+        responses = self.responses_by_mode.get(mode)
+        if responses is None:
+            responses = {url: [0] * len(STATUS_CLASSES) for url in self.backend_urls}
+            self.responses_by_mode[mode] = responses
+        return responses
+
+    def add_backend(self, url):
+        # Removed backends keep their series, so counters stay monotonic if one is added back
+        if url in self.latency:
+            return
+        self.backend_urls.append(url)
+        self.latency[url] = LatencyHistogram(self.bounds)
+        self.ttfb[url] = LatencyHistogram(self.bounds)
+        for responses in self.responses_by_mode.values():
+            responses[url] = [0] * len(STATUS_CLASSES)
+
+    def record_request(self, backend_url, mode, status_code, latency_ms, ttfb_ms):
+        status_index = min(max(status_code // 100 - 1, 0), len(STATUS_CLASSES) - 1)
+        self._responses_for(mode)[backend_url][status_index] += 1
+        if latency_ms >= 0:
+            self.latency[backend_url].observe(latency_ms)
+        if ttfb_ms >= 0:
+            self.ttfb[backend_url].observe(ttfb_ms)
+
+    def record_queue_delay(self, backend_url, queue_ms):
+        histogram = self.queue_delay.get(backend_url)
+        if histogram is None:
+            histogram = self.queue_delay[backend_url] = LatencyHistogram(self.bounds)
+        histogram.observe(queue_ms)
+
+    def record_phases(self, mode, phase_timer):
+        for phase, duration_ns in phase_timer.durations_ns.items():
+            histogram = self.phases.get(phase)
+            if histogram is None:
+                histogram = self.phases[phase] = LatencyHistogram(PHASE_BUCKETS_MS)
+            histogram.observe(duration_ns / 1e6)
+        histogram = self.overhead.get(mode)
+        if histogram is None:
+            histogram = self.overhead[mode] = LatencyHistogram(PHASE_BUCKETS_MS)
+        histogram.observe(phase_timer.overhead_ns() / 1e6)
+
+    def overhead_summary(self):
+        return ' '.join(f"{mode}: n={histogram.count} p50={histogram.quantile(0.5) * 1000:.0f}us "
+                        f"p99={histogram.quantile(0.99) * 1000:.0f}us" for mode, histogram in self.overhead.items())
+
+    def render(self, gauges=()):
+        """Return the exposition text; gauges is a list of (name, help, type, [(labels, value), ...])."""
+        lines = [
+            '# HELP proxy_requests_total Proxied requests by backend, routing mode and status class.',
+            '# TYPE proxy_requests_total counter',
+        ]
+        for mode, responses in self.responses_by_mode.items():
+            for url, counts in responses.items():
+                for status_class, count in zip(STATUS_CLASSES, counts):
+                    if count:
+                        labels = format_labels({'backend': url, 'mode': mode, 'code': status_class})
+                        lines.append(f'proxy_requests_total{labels} {count}')
+        self._render_histograms(lines, 'proxy_backend_latency_seconds',
+                                'Total time spent on a backend request.', self.latency)
+        self._render_histograms(lines, 'proxy_backend_ttfb_seconds',
+                                'Time until the backend response headers arrived.', self.ttfb)
+        if self.queue_delay:
+            self._render_histograms(lines, 'proxy_admission_queue_seconds',
+                                    'Time spent waiting for an admission slot, excluded from backend latency.', self.queue_delay)
+        if self.phases:
+            self._render_histograms(lines, 'proxy_request_phase_seconds',
+                                    'Time forwarded requests spent in each phase, from reading the request to logging it.',
+                                    self.phases, 'phase')
+            self._render_histograms(lines, 'proxy_overhead_seconds',
+                                    'Time forwarded requests spent in the proxy itself: all phases except admission queueing and waiting on the backend.',
+                                    self.overhead, 'mode')
+        for name, help_text, metric_type, samples in gauges:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in samples:
+                lines.append(f'{name}{format_labels(labels)} {format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def _render_histograms(self, lines, name, help_text, histograms, label='backend'):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} histogram')
+        for label_value, histogram in histograms.items():
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.bounds, histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{format_labels({label: label_value, "le": format_value(bound / 1000)})} {cumulative}')
+            lines.append(f'{name}_bucket{format_labels({label: label_value, "le": "+Inf"})} {histogram.count}')
+            lines.append(f'{name}_sum{format_labels({label: label_value})} {format_value(histogram.total / 1000)}')
+            lines.append(f'{name}_count{format_labels({label: label_value})} {histogram.count}')
+        lines.append(f'# HELP {name}_quantile Quantile estimated from the {name} buckets.')
+        lines.append(f'# TYPE {name}_quantile gauge')
+        for label_value, histogram in histograms.items():
+            for q in QUANTILES:
+                lines.append(f'{name}_quantile{format_labels({label: label_value, "quantile": q})} '
+                             f'{format_value(histogram.quantile(q) / 1000)}')
@@ -1,14 +1,35 @@
 import asyncio
 import itertools
 import time
-import csv
 import datetime
 import os
 import collections
-import statistics
-import sys
 import math
-from aiohttp import web, ClientSession, TCPConnector
+import random
+import argparse
+import signal
+import contextlib
+from aiohttp import web, ClientSession
+from access_log import AccessLogWriter
+from log_segments import LogSegments
+from streaming import STREAM_CHUNK_SIZE, strip_hop_by_hop_headers
+from shared_metrics import SharedBackendMetrics
+from workers import run_worker_processes
+from health import HealthTracker
+from cache import ResponseCache
+from coalescing import RequestCoalescer
+from metrics import ProxyMetrics
+from phase_timing import PhaseTimer, phase_trace_config
+from profiler import SamplingProfiler
+from admin import ADMIN_TOKEN_ENV, admin_auth_middleware, read_json_object
+from connection_pools import PoolSettings, BackendConnectionPools
+from proxy_logging import (LOG_FORMATS, LOG_LEVELS, logger, configure_logging, stop_logging, dropped_log_records,
+                           begin_request_sampling, request_debug_enabled, debug_event)
+from consistent_hash import ConsistentHashRing, key_extractor
+from score_index import UNMEASURED, ScoreIndex
+from quantile_sketch import SlidingQuantileSketch
+from admission import AdmissionController, BackendOverloaded
+from hedging import IDEMPOTENT_METHODS, BackendReply, RetryBudget, HedgeDelay, HedgeStats, race_with_hedge
 
 BACKEND_SERVERS = [
     "http://localhost:8081",
@@ -17,169 +38,1154 @@ BACKEND_SERVERS = [
 ]
 LATENCY_WINDOW_SIZE = 3
 EWMA_ALPHA = 0.2
+PEAK_EWMA_DECAY_S = 10.0
+TAIL_LATENCY_PERCENTILE = 95.0 # tail_latency routes on this percentile of each backend's recent latencies; --tail-percentile
+TAIL_LATENCY_WINDOW_S = 60.0 # Latencies older than this no longer count
+TAIL_LATENCY_WINDOW_SLICES = 6 # The window expires in steps of TAIL_LATENCY_WINDOW_S / TAIL_LATENCY_WINDOW_SLICES
+TAIL_LATENCY_ACCURACY = 0.01 # Relative error of the per-backend quantile sketches
+TAIL_LATENCY_REPROBE_S = 10.0 # A backend with no latency this recent gets one probe request per interval
+HASH_KEY_SOURCE = 'header:X-Session-Id' # consistent_hash key: 'header:<name>', 'cookie:<name>' or 'path:<segments>'
+HASH_VIRTUAL_NODES = 100 # Ring points per backend; more points spread keys more evenly
+HASH_LOAD_FACTOR = 1.25 # A backend above this multiple of the average in-flight load spills keys to the next one
+SCORE_RESYNC_INTERVAL_S = 0.25 # --workers: how often latencies recorded by other processes reach this one's score index
+ROUTING_MODES = ('round-robin', 'adaptive_sma', 'adaptive_ewma', 'least_outstanding', 'p2c_ewma', 'peak_ewma',
+                 'tail_latency', 'consistent_hash')
+
+def new_backend_performance_entry():
+    return {'ewma': None, 'raw_latencies': collections.deque(maxlen=LATENCY_WINDOW_SIZE), 'inflight': 0,
+            'peak_ewma': None, 'peak_updated_at': 0.0}
+
+def new_latency_sketch():
+    return SlidingQuantileSketch(TAIL_LATENCY_WINDOW_S, TAIL_LATENCY_WINDOW_SLICES, TAIL_LATENCY_ACCURACY)
 
 backend_server_cycler = itertools.cycle(BACKEND_SERVERS)
-backend_performance_metrics = {
-    url: {'ewma': None, 'raw_latencies': collections.deque(maxlen=LATENCY_WINDOW_SIZE)}
-    for url in BACKEND_SERVERS
-}
+latency_sketches = {url: new_latency_sketch() for url in BACKEND_SERVERS} # Per process, also with --workers
+tail_probes_sent_at = {}
+hash_ring = ConsistentHashRing(BACKEND_SERVERS, vnodes=HASH_VIRTUAL_NODES)
+routing_key_of = key_extractor(HASH_KEY_SOURCE)
+backend_performance_metrics = {url: new_backend_performance_entry() for url in BACKEND_SERVERS}
+backend_metrics_lock = contextlib.nullcontext() # Replaced by a cross-process lock in --workers mode
+backend_metrics_shared = False
+score_indexes = {mode: ScoreIndex(BACKEND_SERVERS) for mode in ('adaptive_sma', 'adaptive_ewma')}
+scores_resynced_at = 0.0
 current_routing_mode = "round-robin"
+streaming_enabled = False
+hedging_enabled = False
+caching_enabled = False
+coalescing_enabled = False
 
 LOG_FILE_PATH = 'proxy_log.csv'
-LOG_HEADERS = ['timestamp', 'backend_url', 'latency_ms', 'status_code', 'routing_mode']
+LOG_HEADERS = ['timestamp', 'backend_url', 'latency_ms', 'status_code', 'routing_mode', 'ttfb_ms', 'attempt', 'queue_ms']
+LOG_QUEUE_MAX_SIZE = 10000
+LOG_BATCH_SIZE = 500
+LOG_FLUSH_INTERVAL_S = 0.5
+LOG_OVERFLOW_POLICY = 'drop' # 'drop' counts and discards entries when the queue is full, 'block' applies backpressure
+LOG_SEGMENT_DIR = 'proxy_log_segments' # Closed, gzip-compressed access log segments and their time index
+LOG_ROTATE_BYTES = 64 * 1024 * 1024 # Close the live access log into a segment at this size (0: no size limit)
+LOG_ROTATE_INTERVAL_S = 3600 # ...or once its first row is this old (0: no age limit)
+LOG_RETENTION_S = 7 * 24 * 3600 # Delete segments whose last row is older than this (0: keep)
+LOG_RETENTION_BYTES = 1024 * 1024 * 1024 # Delete the oldest segments beyond this much compressed data (0: no limit)
+
+CONSOLE_LOG_LEVEL = 'info' # 'debug' adds per-request records (request, selection, response, perf_update)
+CONSOLE_LOG_SAMPLE_RATE = 1.0 # Share of requests that write debug records when CONSOLE_LOG_LEVEL is 'debug'
+CONSOLE_LOG_FORMAT = 'text' # 'json' writes one object per line
+CONSOLE_LOG_QUEUE_MAX_SIZE = 10000 # Records beyond this are dropped rather than blocking the event loop
+
+access_log_writer = AccessLogWriter(
+    LOG_FILE_PATH, LOG_HEADERS,
+    max_queue_size=LOG_QUEUE_MAX_SIZE,
+    batch_size=LOG_BATCH_SIZE,
+    flush_interval_s=LOG_FLUSH_INTERVAL_S,
+    overflow_policy=LOG_OVERFLOW_POLICY,
+    segments=LogSegments(
+        LOG_FILE_PATH, LOG_SEGMENT_DIR,
+        rotate_bytes=LOG_ROTATE_BYTES,
+        rotate_interval_s=LOG_ROTATE_INTERVAL_S,
+        retention_s=LOG_RETENTION_S,
+        retention_bytes=LOG_RETENTION_BYTES
+    )
+)
+
+HEALTH_EVENTS_FILE_PATH = 'proxy_health_events.csv'
+HEALTH_EVENTS_HEADERS = ['timestamp', 'backend_url', 'event', 'detail']
+HEALTH_CHECK_PATH = '/health'
+HEALTH_CHECK_INTERVAL_S = 2.0 # 0 disables active probing; passive outlier detection stays on
+HEALTH_CHECK_TIMEOUT_S = 1.0
+HEALTHY_THRESHOLD = 2 # Passing probes needed before an ejected backend gets trial traffic
+UNHEALTHY_THRESHOLD = 3 # Failed probes in a row that eject a backend
+CONSECUTIVE_FAILURES_TO_EJECT = 5 # 5xx responses, timeouts or connection errors in a row
+BASE_EJECTION_S = 5.0 # Doubles with every repeated ejection, up to MAX_EJECTION_S
+MAX_EJECTION_S = 60.0
+HALF_OPEN_MAX_REQUESTS = 1
+SLOW_START_S = 10.0
+
+health_events_writer = AccessLogWriter(HEALTH_EVENTS_FILE_PATH, HEALTH_EVENTS_HEADERS, batch_size=1)
+
+def reset_backend_performance(url):
+    with backend_metrics_lock:
+        metrics = backend_performance_metrics[url]
+        metrics['raw_latencies'].clear()
+        metrics['ewma'] = None
+        metrics['peak_ewma'] = None
+    latency_sketches[url].clear()
+    refresh_backend_scores(url)
+
+def log_health_event(url, event, detail):
+    (logger.warning if event == 'ejected' else logger.info)("[Health] %s %s: %s", url, event, detail)
+    if event == 'ejected':
+        reset_backend_performance(url) # A returning backend is re-measured instead of trusted on stale scores
+    health_events_writer.submit_nowait({
+        'timestamp': datetime.datetime.now().isoformat(),
+        'backend_url': url,
+        'event': event,
+        'detail': detail
+    })
+
+health_tracker = HealthTracker(
+    BACKEND_SERVERS,
+    check_path=HEALTH_CHECK_PATH,
+    check_interval_s=HEALTH_CHECK_INTERVAL_S,
+    check_timeout_s=HEALTH_CHECK_TIMEOUT_S,
+    healthy_threshold=HEALTHY_THRESHOLD,
+    unhealthy_threshold=UNHEALTHY_THRESHOLD,
+    failures_to_eject=CONSECUTIVE_FAILURES_TO_EJECT,
+    base_ejection_s=BASE_EJECTION_S,
+    max_ejection_s=MAX_EJECTION_S,
+    half_open_max_requests=HALF_OPEN_MAX_REQUESTS,
+    slow_start_s=SLOW_START_S,
+    on_event=log_health_event
+)
+
+HEDGE_DELAY_PERCENTILE = 95 # Used unless --hedge-delay-ms fixes the delay
+HEDGE_BUDGET_PERCENT = 10.0 # Hedges plus retries may add at most this share of traffic
+HEDGE_BUDGET_MAX_TOKENS = 10.0
+
+hedge_delay = HedgeDelay(percentile=HEDGE_DELAY_PERCENTILE)
+retry_budget = RetryBudget(percent=HEDGE_BUDGET_PERCENT, max_tokens=HEDGE_BUDGET_MAX_TOKENS)
+hedge_stats = HedgeStats()
+
+ADMISSION_MAX_CONCURRENCY = 64 # Requests running at once per backend (per process with --workers); --max-concurrency
+ADMISSION_MAX_QUEUE = 256 # Requests beyond this many waiting for a backend are shed at once
+ADMISSION_QUEUE_INTERVAL_MS = 100 # Longest wait while a backend's queue keeps draining
+ADMISSION_QUEUE_TARGET_MS = 10 # Longest wait once the queue has not drained for ADMISSION_QUEUE_INTERVAL_MS
+ADMISSION_RETRY_AFTER_S = 1
+
+admission_controller = AdmissionController(
+    max_concurrency=ADMISSION_MAX_CONCURRENCY,
+    max_queue=ADMISSION_MAX_QUEUE,
+    target_s=ADMISSION_QUEUE_TARGET_MS / 1000,
+    interval_s=ADMISSION_QUEUE_INTERVAL_MS / 1000,
+    retry_after_s=ADMISSION_RETRY_AFTER_S
+)
+admission_enabled = False
+
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+CACHE_DEFAULT_TTL_S = 0.0 # Heuristic freshness for responses without max-age/s-maxage; 0 stores only those that set one
+CACHE_DEFAULT_STALE_S = 2.0 # stale-while-revalidate window when the backend sends none
+CACHE_VARY_HEADERS = ('Accept', 'Accept-Encoding')
+
+response_cache = ResponseCache(
+    max_bytes=CACHE_MAX_BYTES,
+    default_ttl_s=CACHE_DEFAULT_TTL_S,
+    default_stale_s=CACHE_DEFAULT_STALE_S,
+    vary_headers=CACHE_VARY_HEADERS
+)
+revalidation_tasks = set()
 
-def initialize_log_file():
-    if not os.path.exists(LOG_FILE_PATH) or os.path.getsize(LOG_FILE_PATH) == 0:
-        with open(LOG_FILE_PATH, 'w', newline='') as f:
-            csv.DictWriter(f, fieldnames=LOG_HEADERS).writeheader()
+COALESCE_MAX_WAIT_MS = 5000 # A request waiting this long on another's identical backend request sends its own
+COALESCE_MAX_WAITERS = 1000 # Requests sharing one backend response; later duplicates go to a backend themselves
 
-initialize_log_file()
+request_coalescer = RequestCoalescer(
+    max_wait_s=COALESCE_MAX_WAIT_MS / 1000,
+    max_waiters=COALESCE_MAX_WAITERS
+)
+
+METRICS_PORT = 9091 # Admin port serving /metrics and /admin/; with --workers, worker i listens on METRICS_PORT + i
+ADMIN_TOKEN = os.environ.get(ADMIN_TOKEN_ENV) # Unset leaves the /admin/ API disabled
+proxy_metrics = ProxyMetrics(BACKEND_SERVERS)
+
+PROFILE_DEFAULT_DURATION_S = 10
+PROFILE_MAX_DURATION_S = 300
+PROFILE_DEFAULT_INTERVAL_MS = 5 # A sample holds the GIL for ~15us at typical stack depths, so about 0.3% of the loop
+
+active_profile = None # (SamplingProfiler, asyncio.Event that ends it early) while POST /admin/profile runs
+
+POOL_MAX_CONNECTIONS_PER_BACKEND = 100 # 0 = unlimited; beyond it requests wait for a free connection
+POOL_KEEPALIVE_TIMEOUT_S = 30.0 # Idle connections are closed after this long
+POOL_MAX_REQUESTS_PER_CONNECTION = 0 # 0 = unlimited; otherwise a connection is closed after this many requests
+POOL_PREWARM_CONNECTIONS = 4 # Connections opened to each backend at startup
+POOL_DNS_CACHE_TTL_S = 10
+BACKEND_POOL_OVERRIDES = {} # Per-backend settings, e.g. {"http://localhost:8083": {"max_connections": 20}}
+
+backend_pools = None # Sessions need a running event loop, so launch_proxy_server creates them
+
+def default_pool_settings():
+    return PoolSettings(
+        max_connections=POOL_MAX_CONNECTIONS_PER_BACKEND,
+        keepalive_timeout_s=POOL_KEEPALIVE_TIMEOUT_S,
+        max_requests_per_connection=POOL_MAX_REQUESTS_PER_CONNECTION,
+        prewarm_connections=POOL_PREWARM_CONNECTIONS,
+        dns_cache_ttl_s=POOL_DNS_CACHE_TTL_S
+    )
 
 def calculate_sma_latency(url):
     metrics = backend_performance_metrics[url]
     if not metrics['raw_latencies']:
         return float('inf')
     valid_latencies = [x for x in metrics['raw_latencies'] if x > 0]
-    return statistics.mean(valid_latencies) if valid_latencies else float('inf')
+    # statistics.mean sums exactly through Fractions, several times slower on this per-request path
+    return sum(valid_latencies) / len(valid_latencies) if valid_latencies else float('inf')
 
 def retrieve_ewma_latency(url):
     metrics = backend_performance_metrics[url]
     return metrics['ewma'] if metrics['ewma'] is not None else float('inf')
 
+def refresh_backend_scores(url):
+    # Unmeasured backends sort first in both indexes so every backend gets probed
+    sma_latency, ewma_latency = calculate_sma_latency(url), retrieve_ewma_latency(url)
+    score_indexes['adaptive_sma'].update(url, UNMEASURED if math.isinf(sma_latency) else sma_latency)
+    score_indexes['adaptive_ewma'].update(url, UNMEASURED if math.isinf(ewma_latency) else ewma_latency)
+
+def resync_backend_scores():
+    global scores_resynced_at
+    scores_resynced_at = time.monotonic()
+    for url in backend_performance_metrics:
+        refresh_backend_scores(url)
+
+def share_backend_metrics_across_workers():
+    global backend_metrics_lock, backend_metrics_shared
+    shared_metrics = SharedBackendMetrics(BACKEND_SERVERS, LATENCY_WINDOW_SIZE)
+    backend_performance_metrics.update(shared_metrics.slots)
+    backend_metrics_lock = shared_metrics.lock
+    backend_metrics_shared = True
+
+def begin_backend_request(url):
+    with backend_metrics_lock:
+        backend_performance_metrics[url]['inflight'] += 1
+
+def end_backend_request(url):
+    with backend_metrics_lock:
+        backend_performance_metrics[url]['inflight'] -= 1
+
+async def admit_backend_request(url):
+    """Count a request against url, first waiting for an admission slot when admission control is on.
+    Returns the queueing delay in ms; raises BackendOverloaded, with nothing counted, if it is shed.
+    A shed or cancelled request also hands back the half-open trial slot selection may have taken."""
+    begin_backend_request(url) # Queued requests count as in flight, so the load-aware modes see the backlog
+    if not admission_enabled:
+        return 0
+    try:
+        return await admission_controller.acquire(url)
+    except BaseException:
+        end_backend_request(url)
+        health_tracker.record_result(url, None)
+        raise
+
+def release_backend_request(url):
+    end_backend_request(url)
+    if admission_enabled:
+        admission_controller.release(url)
+
+def overloaded_response(overload):
+    if request_debug_enabled():
+        debug_event("shed", backend=overload.backend_url, reason=overload.reason)
+    return web.HTTPServiceUnavailable(text="Backend overloaded", headers={'Retry-After': str(overload.retry_after_s)})
+
 def record_backend_performance(url, latency_ms):
-    data = backend_performance_metrics[url]
+    data = backend_performance_metrics.get(url)
+    if data is None:
+        # Removed while this request finished: a hedged race releases its winner, then yields while the losers cancel
+        return
     if latency_ms > 0:
-        data['raw_latencies'].append(latency_ms)
-        previous_ewma = data['ewma']
-        data['ewma'] = float(latency_ms) if previous_ewma is None \
-            else (EWMA_ALPHA * latency_ms + (1 - EWMA_ALPHA) * previous_ewma)
-        print(f"[Perf Update] {url} → {latency_ms}ms | EWMA={data['ewma']:.1f}ms", flush=True)
-    else:
-        print(f"[Perf Update] {url} → invalid latency {latency_ms}ms (skipped)", flush=True)
+        with backend_metrics_lock:
+            data['raw_latencies'].append(latency_ms)
+            previous_ewma = data['ewma']
+            data['ewma'] = float(latency_ms) if previous_ewma is None \
+                else (EWMA_ALPHA * latency_ms + (1 - EWMA_ALPHA) * previous_ewma)
+            # Peak EWMA jumps straight up to a slower sample and decays back by elapsed time
+            now = time.monotonic()
+            decayed_peak = calculate_peak_ewma_latency(url, now)
+            if math.isinf(decayed_peak) or latency_ms > decayed_peak:
+                data['peak_ewma'] = float(latency_ms)
+            else:
+                weight = math.exp(-(now - data['peak_updated_at']) / PEAK_EWMA_DECAY_S)
+                data['peak_ewma'] = data['peak_ewma'] * weight + latency_ms * (1 - weight)
+            data['peak_updated_at'] = now
+        refresh_backend_scores(url)
+        latency_sketches[url].add(latency_ms, now)
+        if request_debug_enabled():
+            debug_event("perf_update", backend=url, latency_ms=latency_ms, ewma_ms=data['ewma'])
+    elif request_debug_enabled():
+        debug_event("perf_update_skipped", backend=url, latency_ms=latency_ms)
 
-def select_backend_round_robin():
-    return next(backend_server_cycler)
+def select_backend_round_robin(candidates):
+    for _ in range(len(BACKEND_SERVERS)):
+        url = next(backend_server_cycler)
+        if url in candidates:
+            return url
+    return candidates[0]
+
+def select_backend_by_score(mode, exclude=None):
+    """Lowest-scoring routable backend for adaptive_sma/adaptive_ewma. Walks the score index in
+    order and checks health one backend at a time, so a pick costs O(log n) rather than a scan."""
+    if backend_metrics_shared and time.monotonic() - scores_resynced_at >= SCORE_RESYNC_INTERVAL_S:
+        resync_backend_scores()
+    score_index = score_indexes[mode]
+    now = time.monotonic()
+    for url in score_index.ascending():
+        if url != exclude and health_tracker.is_routable(url, now):
+            if request_debug_enabled():
+                score = score_index.score(url)
+                if score == UNMEASURED:
+                    debug_event("select", mode=mode, chosen=url, reason="unmeasured")
+                else:
+                    debug_event("select", mode=mode, chosen=url, score_ms=score)
+            return url
+    if exclude is not None and health_tracker.is_routable(exclude, now):
+        return None # Only the excluded backend is routable
+    # Nothing routable: fail open like the other modes
+    return next((url for url in score_index.ascending() if url != exclude and url in BACKEND_SERVERS), None)
+
+def select_backend_least_outstanding(candidates):
+    inflight_counts = {u: backend_performance_metrics[u]['inflight'] for u in candidates}
+    fewest = min(inflight_counts.values())
+    # Random tie-break so idle periods don't funnel every request to the first backend in the list
+    chosen_backend = random.choice([u for u, n in inflight_counts.items() if n == fewest])
+    if request_debug_enabled():
+        debug_event("select", mode="least_outstanding", chosen=chosen_backend, inflight=inflight_counts)
+    return chosen_backend
+
+def calculate_peak_ewma_latency(url, now=None):
+    metrics = backend_performance_metrics[url]
+    if metrics['peak_ewma'] is None:
+        return float('inf')
+    # Decays towards zero while a backend goes unobserved, so an idle backend is eventually retried
+    elapsed_s = max(0.0, (time.monotonic() if now is None else now) - metrics['peak_updated_at'])
+    return metrics['peak_ewma'] * math.exp(-elapsed_s / PEAK_EWMA_DECAY_S)
 
-def select_backend_adaptive_sma():
-    for url, metrics in backend_performance_metrics.items():
-        if not metrics['raw_latencies']:
-            print(f"[SMA] Probing unmeasured: {url}", flush=True)
+def select_backend_power_of_two(candidates, mode, latency_of):
+    sampled = random.sample(candidates, 2) if len(candidates) > 1 else list(candidates)
+    scores = {}
+    for url in sampled:
+        latency = latency_of(url)
+        if math.isinf(latency):
+            if request_debug_enabled():
+                debug_event("select", mode=mode, chosen=url, reason="unmeasured")
             return url
-    sma_values = {u: calculate_sma_latency(u) for u in BACKEND_SERVERS}
-    chosen_backend = min(sma_values, key=sma_values.get)
-    print("[SMA] SMAs: " + ", ".join(f"{u.split(':')[-1]}={sma_values[u]:.1f}ms" for u in sma_values), flush=True)
-    print(f"[SMA] Chosen: {chosen_backend}", flush=True)
+        scores[url] = latency * (backend_performance_metrics[url]['inflight'] + 1)
+    chosen_backend = min(scores, key=scores.get)
+    if request_debug_enabled():
+        debug_event("select", mode=mode, chosen=chosen_backend, scores=scores)
     return chosen_backend
 
-def select_backend_adaptive_ewma():
-    ewma_values = {u: retrieve_ewma_latency(u) for u in BACKEND_SERVERS}
-    unmeasured_servers = [u for u, v in ewma_values.items() if math.isinf(v)]
-
-    if unmeasured_servers:
-        probe_cycler = itertools.cycle(sorted(list(unmeasured_servers))) 
-        for server_url in BACKEND_SERVERS: 
-            if server_url in unmeasured_servers:
-                print(f"[EWMA] Probing unmeasured: {server_url}", flush=True)
-                return server_url
-        return next(backend_server_cycler)
-    print("[EWMA] EWMAs: " + ", ".join(f"{u.split(':')[-1]}={ewma_values[u]:.1f}ms" for u in ewma_values), flush=True)
-    chosen_backend = min(ewma_values, key=ewma_values.get)
-    print(f"[EWMA] Chosen: {chosen_backend}", flush=True)
+def select_backend_p2c_ewma(candidates):
+    return select_backend_power_of_two(candidates, "p2c_ewma", retrieve_ewma_latency)
+
+def select_backend_peak_ewma(candidates):
+    now = time.monotonic()
+    return select_backend_power_of_two(candidates, "peak_ewma", lambda url: calculate_peak_ewma_latency(url, now))
+
+def calculate_tail_latency(url, now=None):
+    return latency_sketches[url].quantile(TAIL_LATENCY_PERCENTILE / 100, now)
+
+def tail_latency_reprobe_due(url, now):
+    # Stale backends are neither trusted on old data nor flooded: one probe per TAIL_LATENCY_REPROBE_S
+    return (latency_sketches[url].age_s(now) >= TAIL_LATENCY_REPROBE_S
+            and now - tail_probes_sent_at.get(url, -math.inf) >= TAIL_LATENCY_REPROBE_S)
+
+def select_backend_tail_latency(candidates):
+    now = time.monotonic()
+    chosen_backend = select_backend_power_of_two(
+        candidates, "tail_latency",
+        lambda url: math.inf if tail_latency_reprobe_due(url, now) else calculate_tail_latency(url, now))
+    if tail_latency_reprobe_due(chosen_backend, now):
+        tail_probes_sent_at[chosen_backend] = now
+        if request_debug_enabled():
+            debug_event("reprobe", backend=chosen_backend, age_s=latency_sketches[chosen_backend].age_s(now))
     return chosen_backend
 
-def select_next_backend():
-    if current_routing_mode == "round-robin":
-        return select_backend_round_robin()
-    if current_routing_mode == "adaptive_sma":
-        return select_backend_adaptive_sma()
-    if current_routing_mode == "adaptive_ewma":
-        return select_backend_adaptive_ewma()
-    return select_backend_round_robin() # Default fallback
+def routing_key_for(request):
+    return routing_key_of(request) if current_routing_mode == "consistent_hash" else None
+
+def select_backend_consistent_hash(candidates, request_key):
+    if request_key is None:
+        return select_backend_round_robin(candidates) # Without a key there is no affinity to keep
+    chosen_backend, owner = hash_ring.choose(request_key, candidates,
+                                             lambda url: backend_performance_metrics[url]['inflight'], HASH_LOAD_FACTOR)
+    if request_debug_enabled():
+        debug_event("select", mode="consistent_hash", chosen=chosen_backend, key=request_key, owner=owner)
+    return chosen_backend
+
+def select_next_backend(exclude=None, request_key=None):
+    if current_routing_mode in score_indexes:
+        chosen_backend = select_backend_by_score(current_routing_mode, exclude)
+        if chosen_backend is not None:
+            health_tracker.on_selected(chosen_backend)
+        return chosen_backend
+    # Ejected and half-open-at-capacity backends are skipped in every mode; if none are left, fail open
+    candidates = health_tracker.routable_backends() or BACKEND_SERVERS
+    if exclude is not None:
+        candidates = [u for u in candidates if u != exclude]
+        if not candidates:
+            return None
+    if current_routing_mode == "least_outstanding":
+        chosen_backend = select_backend_least_outstanding(candidates)
+    elif current_routing_mode == "p2c_ewma":
+        chosen_backend = select_backend_p2c_ewma(candidates)
+    elif current_routing_mode == "peak_ewma":
+        chosen_backend = select_backend_peak_ewma(candidates)
+    elif current_routing_mode == "tail_latency":
+        chosen_backend = select_backend_tail_latency(candidates)
+    elif current_routing_mode == "consistent_hash":
+        chosen_backend = select_backend_consistent_hash(candidates, request_key)
+    else:
+        chosen_backend = select_backend_round_robin(candidates) # Default fallback
+    health_tracker.on_selected(chosen_backend)
+    return chosen_backend
 
-def log_request_details(backend_url, latency_ms, status_code):
+async def log_request_details(backend_url, latency_ms, status_code, ttfb_ms=-1, attempt='primary', queue_ms=0):
     log_entry = {
         'timestamp': datetime.datetime.now().isoformat(),
         'backend_url': backend_url,
         'latency_ms': latency_ms,
         'status_code': status_code,
-        'routing_mode': current_routing_mode
+        'routing_mode': current_routing_mode,
+        'ttfb_ms': ttfb_ms,
+        'attempt': attempt,
+        'queue_ms': queue_ms
     }
-    try:
-        with open(LOG_FILE_PATH, 'a', newline='') as f:
-            csv.DictWriter(f, fieldnames=LOG_HEADERS).writerow(log_entry)
-    except Exception as log_err:
-        print(f"Log write failed: {log_err}", flush=True)
+    await access_log_writer.submit(log_entry)
 
 async def process_proxy_request(request):
-    request_time = datetime.datetime.now().isoformat(timespec='milliseconds')
-    peer_address = request.transport.get_extra_info('peername')
-    print(f"\n[{request_time}] {peer_address} → {request.method} {request.path_qs}", flush=True)
+    if begin_request_sampling():
+        peer_address = request.transport.get_extra_info('peername')
+        debug_event("request", peer=peer_address, method=request.method, path=request.path_qs)
+
+    cache_key = None
+    if caching_enabled and not streaming_enabled:
+        cache_key = response_cache.key_for(request.method, request.path_qs, request.headers)
+    if cache_key is not None:
+        cached_entry, needs_revalidation = response_cache.lookup(cache_key)
+        if cached_entry is not None:
+            # Served without touching a backend, so nothing is selected, scored or logged
+            if needs_revalidation:
+                revalidation_task = asyncio.create_task(revalidate_cached_response(request, cache_key))
+                revalidation_tasks.add(revalidation_task)
+                revalidation_task.add_done_callback(revalidation_tasks.discard)
+            return build_cached_response(cached_entry, 'STALE' if time.monotonic() >= cached_entry.fresh_until else 'HIT')
+
+    coalesce_key = None
+    if coalescing_enabled and not streaming_enabled:
+        coalesce_key = request_coalescer.key_for(request.method, request.path_qs, request.headers, request.body_exists)
+    if coalesce_key is None:
+        return await fetch_proxy_response(request, cache_key)
+    # Only the request that started the flight reaches a backend, so it alone is scored and logged
+    proxy_response, shared = await request_coalescer.run(coalesce_key, lambda: fetch_proxy_response(request, cache_key))
+    if shared and request_debug_enabled():
+        debug_event("coalesced", method=request.method, path=request.path_qs, status=proxy_response.status)
+    return build_coalesced_response(proxy_response, shared)
 
-    chosen_backend_url = select_next_backend()
+async def fetch_proxy_response(request, cache_key):
+    proxy_response = await forward_proxy_request(request)
+    if caching_enabled and not streaming_enabled and not proxy_response.prepared:
+        stored = cache_key is not None and response_cache.store(
+            cache_key, proxy_response.status, proxy_response.reason, proxy_response.headers, proxy_response.body,
+            authorized='Authorization' in request.headers)
+        # MISS only for answers a later request can be served from; the rest were never eligible
+        proxy_response.headers['X-Cache'] = 'MISS' if stored else 'BYPASS'
+    return proxy_response
+
+async def forward_proxy_request(request):
+    phase_timer = PhaseTimer()
+    # The body is read before choosing a backend, so nothing awaits between selection and
+    # admit_backend_request counting the request, and a backend drained in between is never picked
+    if streaming_enabled:
+        request_body = request.content.iter_chunked(STREAM_CHUNK_SIZE) if request.body_exists else None
+    else:
+        request_body = await request.read() or None
+    phase_timer.mark('request_read')
+    request_key = routing_key_for(request)
+    chosen_backend_url = select_next_backend(request_key=request_key)
+    phase_timer.mark('select')
+    if hedging_enabled and not streaming_enabled and request.method in IDEMPOTENT_METHODS:
+        return await process_hedged_request(request, chosen_backend_url, request_key, request_body, phase_timer)
     target_url_path = f"{chosen_backend_url}{request.path_qs}"
-    request_body = await request.read()
 
     measured_latency_ms = -1
+    ttfb_ms = -1
     response_status_code = None
-    client_session: ClientSession = request.app['client_session']
+    proxy_response = None
+    backend_succeeded = None
+    client_session: ClientSession = request.app['backend_pools'].session_for(chosen_backend_url)
     
+    try:
+        queue_ms = await admit_backend_request(chosen_backend_url)
+    except BackendOverloaded as overload:
+        return overloaded_response(overload)
+    phase_timer.mark('admission')
     request_start_time = time.monotonic()
     try:
         async with client_session.request(
             request.method,
             target_url_path,
-            headers=request.headers,
-            data=request_body if request_body else None,
+            headers=strip_hop_by_hop_headers(request.headers),
+            data=request_body,
             allow_redirects=False,
-            timeout=10
+            timeout=10,
+            trace_request_ctx=phase_timer # Marks 'connect' and 'send' through phase_trace_config()
         ) as backend_response:
-            response_content = await backend_response.read()
-            measured_latency_ms = round((time.monotonic() - request_start_time) * 1000)
+            phase_timer.mark('ttfb')
+            ttfb_ms = round((time.monotonic() - request_start_time) * 1000)
             response_status_code = backend_response.status
-            
-            proxy_response = web.Response(
-                status=backend_response.status,
-                reason=backend_response.reason,
-                headers=backend_response.headers,
-                body=response_content
-            )
-            print(f"→ {chosen_backend_url} responded {response_status_code} in {measured_latency_ms}ms", flush=True)
+            backend_succeeded = response_status_code < 500
+            response_headers = strip_hop_by_hop_headers(backend_response.headers)
+
+            if streaming_enabled:
+                # Without a Content-Length from the backend, aiohttp falls back to chunked encoding
+                proxy_response = web.StreamResponse(
+                    status=backend_response.status,
+                    reason=backend_response.reason,
+                    headers=response_headers
+                )
+                await proxy_response.prepare(request)
+                async for chunk in backend_response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                    await proxy_response.write(chunk)
+                await proxy_response.write_eof()
+                phase_timer.mark('stream')
+            else:
+                response_content = await backend_response.read()
+                phase_timer.mark('body_read')
+                proxy_response = web.Response(
+                    status=backend_response.status,
+                    reason=backend_response.reason,
+                    headers=response_headers,
+                    body=response_content
+                )
+            measured_latency_ms = round((time.monotonic() - request_start_time) * 1000)
+            if request_debug_enabled():
+                debug_event("response", backend=chosen_backend_url, status=response_status_code, latency_ms=measured_latency_ms, ttfb_ms=ttfb_ms)
     except asyncio.TimeoutError:
         measured_latency_ms = round((time.monotonic() - request_start_time) * 1000)
         response_status_code = 504
+        logger.warning("Timeout @ %s (%sms)", chosen_backend_url, measured_latency_ms)
+        if proxy_response is not None and proxy_response.prepared:
+            await finish_proxy_request(chosen_backend_url, ttfb_ms, ttfb_ms, measured_latency_ms, response_status_code,
+                                       queue_ms=queue_ms)
+            raise # Headers already went out; dropping the connection signals the truncated body
+        backend_succeeded = False
+        phase_timer = None # Phases describe requests the backend answered; a timeout would swamp them
         proxy_response = web.HTTPGatewayTimeout(text="Backend timeout")
-        print(f"→ Timeout @ {chosen_backend_url} ({measured_latency_ms}ms)", flush=True)
     except Exception as e:
         measured_latency_ms = round((time.monotonic() - request_start_time) * 1000)
         response_status_code = 502
+        logger.warning("Error @ %s: %s (%sms)", chosen_backend_url, e, measured_latency_ms)
+        if proxy_response is not None and proxy_response.prepared:
+            await finish_proxy_request(chosen_backend_url, ttfb_ms, ttfb_ms, measured_latency_ms, response_status_code,
+                                       queue_ms=queue_ms)
+            raise
+        backend_succeeded = False
+        phase_timer = None
         proxy_response = web.HTTPBadGateway(text="Backend error")
-        print(f"→ Error @ {chosen_backend_url}: {e} ({measured_latency_ms}ms)", flush=True)
+    finally:
+        release_backend_request(chosen_backend_url)
+        health_tracker.record_result(chosen_backend_url, backend_succeeded)
 
-    record_backend_performance(chosen_backend_url, measured_latency_ms)
-    log_request_details(chosen_backend_url, measured_latency_ms, response_status_code)
+    if response_status_code == 502 and ttfb_ms < 0:
+        scored_latency_ms = -1 # Refused connections fail fast and would otherwise look like the quickest backend
+    elif streaming_enabled and ttfb_ms > 0:
+        scored_latency_ms = ttfb_ms # Streamed bodies are paced by the client, so routing scores on TTFB
+    else:
+        scored_latency_ms = measured_latency_ms
+    if phase_timer is not None:
+        phase_timer.mark('respond')
+    await finish_proxy_request(chosen_backend_url, scored_latency_ms, ttfb_ms, measured_latency_ms, response_status_code,
+                               queue_ms=queue_ms, phase_timer=phase_timer)
     
     return proxy_response
 
-async def cleanup_client_session(app):
-    await app['client_session'].close()
+async def finish_proxy_request(backend_url, scored_latency_ms, ttfb_ms, total_latency_ms, status_code, attempt='primary',
+                               queue_ms=0, phase_timer=None):
+    record_backend_performance(backend_url, scored_latency_ms)
+    if phase_timer is not None:
+        phase_timer.mark('score')
+    proxy_metrics.record_request(backend_url, current_routing_mode, status_code, total_latency_ms, ttfb_ms)
+    if admission_enabled:
+        proxy_metrics.record_queue_delay(backend_url, queue_ms)
+    await log_request_details(backend_url, total_latency_ms, status_code, ttfb_ms, attempt, queue_ms)
+    if phase_timer is not None:
+        phase_timer.mark('log')
+        proxy_metrics.record_phases(current_routing_mode, phase_timer)
+        if request_debug_enabled():
+            debug_event("phases", backend=backend_url, overhead_us=phase_timer.overhead_ns() // 1000, **phase_timer.as_us())
+
+async def send_backend_attempt(backend_pools, request, backend_url, request_body):
+    queue_ms = await admit_backend_request(backend_url) # Shed attempts raise before anything is counted
+    client_session: ClientSession = backend_pools.session_for(backend_url)
+    backend_succeeded = None
+    request_start_time = time.monotonic()
+    try:
+        async with client_session.request(
+            request.method,
+            f"{backend_url}{request.path_qs}",
+            headers=strip_hop_by_hop_headers(request.headers),
+            data=request_body,
+            allow_redirects=False,
+            timeout=10
+        ) as backend_response:
+            ttfb_ms = round((time.monotonic() - request_start_time) * 1000)
+            response_content = await backend_response.read()
+            backend_succeeded = backend_response.status < 500
+            return BackendReply(
+                backend_response.status,
+                backend_response.reason,
+                strip_hop_by_hop_headers(backend_response.headers),
+                response_content,
+                ttfb_ms,
+                round((time.monotonic() - request_start_time) * 1000),
+                queue_ms
+            )
+    except Exception:
+        backend_succeeded = False
+        raise
+    finally:
+        release_backend_request(backend_url)
+        health_tracker.record_result(backend_url, backend_succeeded) # Cancelled hedge losers leave this as None
+
+async def process_hedged_request(request, primary_backend_url, request_key, request_body, phase_timer=None):
+    backend_pools = request.app['backend_pools']
+    request_start_time = time.monotonic()
+    outcome, attempt_role, backend_url = await race_with_hedge(
+        lambda url: send_backend_attempt(backend_pools, request, url, request_body),
+        primary_backend_url,
+        lambda url: select_next_backend(exclude=url, request_key=request_key),
+        hedge_delay.delay_s(),
+        retry_budget,
+        hedge_stats,
+        is_success=lambda reply: reply.status < 500
+    )
+    measured_latency_ms = round((time.monotonic() - request_start_time) * 1000)
+    ttfb_ms = -1
+    if phase_timer is not None:
+        phase_timer.mark('backend_race') # Admission, connecting and hedge delays included; attempts overlap
+
+    if isinstance(outcome, BackendOverloaded):
+        return overloaded_response(outcome) # No backend was reached, so there is nothing to score or log
+    if isinstance(outcome, BaseException):
+        phase_timer = None
+    if isinstance(outcome, asyncio.TimeoutError):
+        response_status_code = 504
+        scored_latency_ms = measured_latency_ms
+        proxy_response = web.HTTPGatewayTimeout(text="Backend timeout")
+        logger.warning("Timeout @ %s (%s, %sms)", backend_url, attempt_role, measured_latency_ms)
+    elif isinstance(outcome, BaseException):
+        response_status_code = 502
+        scored_latency_ms = -1
+        proxy_response = web.HTTPBadGateway(text="Backend error")
+        logger.warning("Error @ %s (%s): %s (%sms)", backend_url, attempt_role, outcome, measured_latency_ms)
+    else:
+        response_status_code = outcome.status
+        ttfb_ms = outcome.ttfb_ms
+        # Score the winning attempt's own duration; the client's total wait includes the hedge delay
+        scored_latency_ms = outcome.latency_ms
+        hedge_delay.observe(outcome.latency_ms)
+        proxy_response = web.Response(
+            status=outcome.status,
+            reason=outcome.reason,
+            headers=outcome.headers,
+            body=outcome.body
+        )
+        if request_debug_enabled():
+            debug_event("response", backend=backend_url, attempt=attempt_role, status=response_status_code, latency_ms=measured_latency_ms)
+        if phase_timer is not None:
+            phase_timer.mark('respond')
+
+    await finish_proxy_request(backend_url, scored_latency_ms, ttfb_ms, measured_latency_ms, response_status_code, attempt_role,
+                               outcome.queue_ms if isinstance(outcome, BackendReply) else 0, phase_timer)
+    return proxy_response
+
+
+def build_cached_response(cached_entry, cache_status):
+    cached_response = web.Response(
+        status=cached_entry.status,
+        reason=cached_entry.reason,
+        headers=cached_entry.headers,
+        body=cached_entry.body
+    )
+    cached_response.headers['Age'] = str(int(time.monotonic() - cached_entry.stored_at))
+    cached_response.headers['X-Cache'] = cache_status
+    return cached_response
+
+def build_coalesced_response(proxy_response, shared):
+    # Every request in a flight gets its own copy, since an aiohttp response can only be sent once
+    coalesced_response = web.Response(
+        status=proxy_response.status,
+        reason=proxy_response.reason,
+        headers=proxy_response.headers,
+        body=proxy_response.body
+    )
+    if shared:
+        coalesced_response.headers['X-Coalesced'] = 'HIT'
+    return coalesced_response
+
+async def revalidate_cached_response(request, cache_key):
+    backend_url = select_next_backend(request_key=routing_key_for(request))
+    try:
+        reply = await send_backend_attempt(request.app['backend_pools'], request, backend_url, None)
+    except Exception as e:
+        logger.warning("Revalidation of %s @ %s failed: %s", request.path_qs, backend_url, e)
+    else:
+        response_cache.store(cache_key, reply.status, reply.reason, reply.headers, reply.body,
+                             authorized='Authorization' in request.headers)
+        await finish_proxy_request(backend_url, reply.latency_ms, reply.ttfb_ms, reply.latency_ms, reply.status, 'revalidate',
+                                   reply.queue_ms)
+    finally:
+        response_cache.finish_revalidation(cache_key)
+
+async def prewarm_backend_pools(app):
+    created = await app['backend_pools'].prewarm(HEALTH_CHECK_PATH)
+    if created:
+        logger.info("Pre-warmed connections: %s", created)
+
+async def close_backend_pools(app):
+    for removal_task in list(backend_removal_tasks.values()):
+        removal_task.cancel()
+    logger.info("Connection pools: %s", app['backend_pools'].stats())
+    await app['backend_pools'].close()
+
+def latency_seconds(latency_ms):
+    return math.nan if latency_ms is None or math.isinf(latency_ms) else latency_ms / 1000
+
+def collect_metric_gauges():
+    gauges = [
+        ('proxy_backend_inflight_requests', 'Requests currently in flight to the backend.', 'gauge',
+         [({'backend': url}, backend_performance_metrics[url]['inflight']) for url in backend_performance_metrics]),
+        ('proxy_backend_ewma_latency_seconds', 'EWMA latency used by adaptive_ewma and p2c_ewma.', 'gauge',
+         [({'backend': url}, latency_seconds(backend_performance_metrics[url]['ewma'])) for url in backend_performance_metrics]),
+        ('proxy_backend_sma_latency_seconds', f'SMA over the last {LATENCY_WINDOW_SIZE} latencies.', 'gauge',
+         [({'backend': url}, latency_seconds(calculate_sma_latency(url))) for url in backend_performance_metrics]),
+        ('proxy_backend_peak_ewma_latency_seconds', 'Decayed Peak EWMA latency used by peak_ewma.', 'gauge',
+         [({'backend': url}, latency_seconds(calculate_peak_ewma_latency(url))) for url in backend_performance_metrics]),
+        ('proxy_backend_tail_latency_seconds', f'p{TAIL_LATENCY_PERCENTILE:g} latency over the last {TAIL_LATENCY_WINDOW_S:g}s, used by tail_latency.',
+         'gauge', [({'backend': url}, latency_seconds(calculate_tail_latency(url))) for url in backend_performance_metrics]),
+        ('proxy_backend_health_state', 'Circuit breaker state (1 for the current state).', 'gauge',
+         [({'backend': url, 'state': state}, 1) for url, state in health_tracker.snapshot().items()]),
+        ('proxy_access_log_dropped_total', 'Access log entries dropped because the queue was full.', 'counter',
+         [({}, access_log_writer.dropped_entries)]),
+        ('proxy_console_log_dropped_total', 'Console log records dropped because the queue was full.', 'counter',
+         [({}, dropped_log_records())]),
+    ]
+    if backend_pools is not None:
+        pool_stats = backend_pools.stats()
+        gauges.append(('proxy_backend_pool_connections', 'Pooled backend connections by state.', 'gauge',
+                       [({'backend': url, 'state': state}, stats[state])
+                        for url, stats in pool_stats.items() for state in ('idle', 'active')]))
+        gauges.append(('proxy_backend_pool_connection_events_total', 'Backend connections created, reused and retired.', 'counter',
+                       [({'backend': url, 'event': event}, stats[event])
+                        for url, stats in pool_stats.items() for event in ('created', 'reused', 'retired')]))
+    if admission_enabled:
+        admission_stats = admission_controller.snapshot()
+        gauges.append(('proxy_admission_queued_requests', 'Requests waiting for an admission slot.', 'gauge',
+                       [({'backend': url}, stats['queued_now']) for url, stats in admission_stats.items()]))
+        gauges.append(('proxy_admission_shed_total', 'Requests rejected with 503 by admission control.', 'counter',
+                       [({'backend': url, 'reason': reason}, stats['shed'].get(reason, 0))
+                        for url, stats in admission_stats.items() for reason in ('queue_full', 'queue_timeout')]))
+    if caching_enabled:
+        cache_stats = response_cache.stats
+        gauges.append(('proxy_cache_events_total', 'Response cache lookups and stores.', 'counter',
+                       [({'event': event}, getattr(cache_stats, event)) for event in
+                        ('hits', 'stale_hits', 'misses', 'stores', 'evictions', 'uncacheable', 'revalidations')]))
+        gauges.append(('proxy_cache_bytes', 'Bytes held by the response cache.', 'gauge',
+                       [({}, response_cache.total_bytes)]))
+    if coalescing_enabled:
+        coalescing_stats = request_coalescer.stats
+        gauges.append(('proxy_coalescing_events_total', 'Backend requests started for coalesced keys, and requests that shared or skipped them.', 'counter',
+                       [({'event': event}, getattr(coalescing_stats, event)) for event in
+                        ('flights', 'coalesced', 'wait_timeouts', 'waiter_limit', 'leader_failures')]))
+        gauges.append(('proxy_coalescing_in_flight', 'Backend requests other identical requests can currently join.', 'gauge',
+                       [({}, request_coalescer.in_flight())]))
+    if hedging_enabled:
+        gauges.append(('proxy_hedge_events_total', 'Hedged requests, retries and their outcomes.', 'counter',
+                       [({'event': event}, getattr(hedge_stats, event)) for event in
+                        ('hedges_sent', 'retries_sent', 'hedge_wins', 'primary_wins_after_hedge', 'budget_denied')]))
+    return gauges
+
+async def serve_metrics(request):
+    return web.Response(
+        body=proxy_metrics.render(collect_metric_gauges()).encode('utf-8'),
+        headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+    )
+
+DRAIN_POLL_INTERVAL_S = 0.1
+backend_removal_tasks = {}
 
-async def launch_proxy_server(host_address, server_port, mode_of_operation):
+def rebuild_backend_cycler():
+    global backend_server_cycler
+    backend_server_cycler = itertools.cycle(BACKEND_SERVERS)
+
+def resize_latency_windows(window_size):
+    global LATENCY_WINDOW_SIZE
+    with backend_metrics_lock:
+        LATENCY_WINDOW_SIZE = window_size
+        for metrics in backend_performance_metrics.values():
+            # Keeps the most recent samples, so SMA routing carries on without re-learning
+            metrics['raw_latencies'] = collections.deque(metrics['raw_latencies'], maxlen=window_size)
+    resync_backend_scores() # Shorter windows change the SMAs
+
+def stop_routing_to(url):
+    if url in BACKEND_SERVERS:
+        BACKEND_SERVERS.remove(url)
+        rebuild_backend_cycler()
+    health_tracker.drain(url)
+
+async def finish_backend_removal(url):
+    while backend_performance_metrics[url]['inflight'] > 0:
+        await asyncio.sleep(DRAIN_POLL_INTERVAL_S)
+    del backend_removal_tasks[url]
+    with backend_metrics_lock:
+        del backend_performance_metrics[url]
+    health_tracker.remove_backend(url)
+    for score_index in score_indexes.values():
+        score_index.remove(url)
+    del latency_sketches[url]
+    tail_probes_sent_at.pop(url, None)
+    hash_ring.remove(url) # Only the keys on its arcs move; draining left the ring alone so they could finish
+    await backend_pools.remove_backend(url)
+
+def admin_config():
+    health_states = health_tracker.snapshot()
+    return {
+        'routing_mode': current_routing_mode,
+        'ewma_alpha': EWMA_ALPHA,
+        'latency_window_size': LATENCY_WINDOW_SIZE,
+        'tail_percentile': TAIL_LATENCY_PERCENTILE,
+        'backends': [
+            {'url': url, 'state': health_states.get(url), 'removing': url in backend_removal_tasks,
+             'inflight': metrics['inflight'], 'ewma_ms': metrics['ewma']}
+            for url, metrics in backend_performance_metrics.items()
+        ],
+        'pools': backend_pools.stats() if backend_pools is not None else {},
+    }
+
+def admin_backend_url(url):
+    if not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+        raise web.HTTPBadRequest(text="url must be an http:// or https:// backend URL")
+    return url.rstrip('/')
+
+def known_backend_url(url):
+    url = admin_backend_url(url)
+    if url not in backend_performance_metrics:
+        raise web.HTTPNotFound(text=f"Unknown backend {url}")
+    if BACKEND_SERVERS == [url]:
+        raise web.HTTPConflict(text=f"{url} is the last active backend")
+    return url
+
+async def admin_get_config(request):
+    return web.json_response(admin_config())
+
+async def admin_set_routing_mode(request):
     global current_routing_mode
+    mode = (await read_json_object(request)).get('mode')
+    if mode not in ROUTING_MODES:
+        raise web.HTTPBadRequest(text=f"mode must be one of: {', '.join(ROUTING_MODES)}")
+    logger.info("[Admin] Routing mode %s → %s", current_routing_mode, mode)
+    current_routing_mode = mode # Latency history and connection pools carry over to the new mode
+    return web.json_response(admin_config())
+
+async def admin_set_tuning(request):
+    global EWMA_ALPHA, TAIL_LATENCY_PERCENTILE
+    body = await read_json_object(request)
+    ewma_alpha = body.get('ewma_alpha', EWMA_ALPHA)
+    window_size = body.get('latency_window_size', LATENCY_WINDOW_SIZE)
+    tail_percentile = body.get('tail_percentile', TAIL_LATENCY_PERCENTILE)
+    if isinstance(ewma_alpha, bool) or not isinstance(ewma_alpha, (int, float)) or not 0 < ewma_alpha <= 1:
+        raise web.HTTPBadRequest(text="ewma_alpha must be a number in (0, 1]")
+    if isinstance(window_size, bool) or not isinstance(window_size, int) or window_size < 1:
+        raise web.HTTPBadRequest(text="latency_window_size must be a positive integer")
+    if isinstance(tail_percentile, bool) or not isinstance(tail_percentile, (int, float)) or not 0 < tail_percentile < 100:
+        raise web.HTTPBadRequest(text="tail_percentile must be a number in (0, 100)")
+    if window_size != LATENCY_WINDOW_SIZE:
+        if backend_metrics_shared:
+            raise web.HTTPConflict(text="latency_window_size is fixed at startup in --workers mode")
+        resize_latency_windows(window_size)
+    EWMA_ALPHA = float(ewma_alpha)
+    TAIL_LATENCY_PERCENTILE = float(tail_percentile) # The sketches keep every quantile, so this applies at once
+    logger.info("[Admin] EWMA_ALPHA=%s LATENCY_WINDOW_SIZE=%d TAIL_LATENCY_PERCENTILE=%s",
+                EWMA_ALPHA, LATENCY_WINDOW_SIZE, TAIL_LATENCY_PERCENTILE)
+    return web.json_response(admin_config())
+
+async def admin_add_backend(request):
+    body = await read_json_object(request)
+    url = admin_backend_url(body.get('url'))
+    if url in BACKEND_SERVERS:
+        raise web.HTTPConflict(text=f"{url} is already active")
+    if url in backend_performance_metrics:
+        # Draining or waiting for removal: take it back with its metrics and pool intact
+        removal_task = backend_removal_tasks.pop(url, None)
+        if removal_task is not None:
+            removal_task.cancel()
+        health_tracker.undrain(url)
+        BACKEND_SERVERS.append(url)
+        rebuild_backend_cycler()
+        return web.json_response(admin_config())
+    pool_overrides = body.get('pool', {})
+    if not isinstance(pool_overrides, dict):
+        raise web.HTTPBadRequest(text="pool must be a JSON object of pool settings")
+    try:
+        pool_settings = backend_pools.default_settings.with_overrides({**BACKEND_POOL_OVERRIDES.get(url, {}), **pool_overrides})
+    except ValueError as e:
+        raise web.HTTPBadRequest(text=str(e))
+    with backend_metrics_lock:
+        backend_performance_metrics[url] = new_backend_performance_entry() # Not shared with other --workers processes
+    proxy_metrics.add_backend(url)
+    backend_pools.add_backend(url, pool_settings)
+    health_tracker.add_backend(url)
+    hash_ring.add(url)
+    latency_sketches[url] = new_latency_sketch()
+    for score_index in score_indexes.values():
+        score_index.add(url)
+    BACKEND_SERVERS.append(url)
+    rebuild_backend_cycler()
+    await backend_pools.prewarm_backend(url, HEALTH_CHECK_PATH)
+    return web.json_response(admin_config(), status=201)
+
+async def admin_drain_backend(request):
+    url = known_backend_url((await read_json_object(request)).get('url'))
+    stop_routing_to(url)
+    return web.json_response(admin_config())
+
+async def admin_remove_backend(request):
+    url = known_backend_url(request.query.get('url'))
+    stop_routing_to(url)
+    if url not in backend_removal_tasks:
+        backend_removal_tasks[url] = asyncio.create_task(finish_backend_removal(url))
+    return web.json_response(admin_config(), status=202) # Removed once its in-flight requests finish
+
+async def admin_run_profile(request):
+    """Sample the event loop's stacks for duration_s (or until DELETE /admin/profile) and return
+    them as folded stacks for flamegraph.pl or speedscope."""
+    global active_profile
+    body = await read_json_object(request) if request.body_exists else {}
+    duration_s = body.get('duration_s', PROFILE_DEFAULT_DURATION_S)
+    interval_ms = body.get('interval_ms', PROFILE_DEFAULT_INTERVAL_MS)
+    if isinstance(duration_s, bool) or not isinstance(duration_s, (int, float)) or not 0 < duration_s <= PROFILE_MAX_DURATION_S:
+        raise web.HTTPBadRequest(text=f"duration_s must be a number in (0, {PROFILE_MAX_DURATION_S}]")
+    if isinstance(interval_ms, bool) or not isinstance(interval_ms, (int, float)) or not 1 <= interval_ms <= 1000:
+        raise web.HTTPBadRequest(text="interval_ms must be a number in [1, 1000]")
+    if active_profile is not None:
+        raise web.HTTPConflict(text="A profile is already running")
+    profiler = SamplingProfiler(interval_s=interval_ms / 1000) # Created on the event loop's thread, so it samples that
+    stop_requested = asyncio.Event()
+    active_profile = (profiler, stop_requested)
+    logger.info("[Admin] Profiling for up to %ss every %sms", duration_s, interval_ms)
+    profiler.start()
+    try:
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(stop_requested.wait(), duration_s)
+    finally:
+        profiler.stop()
+        active_profile = None
+    logger.info("[Admin] Profile finished with %d samples", profiler.samples)
+    return web.Response(text=profiler.folded(), headers={'X-Profile-Samples': str(profiler.samples)})
+
+async def admin_stop_profile(request):
+    if active_profile is None:
+        raise web.HTTPNotFound(text="No profile is running")
+    profiler, stop_requested = active_profile
+    stop_requested.set() # The POST that started it returns the profile
+    return web.json_response({'stopped': True, 'samples': profiler.samples})
+
+async def start_admin_server(host_address, admin_port):
+    admin_app = web.Application(middlewares=[admin_auth_middleware(ADMIN_TOKEN)])
+    admin_app.router.add_get('/metrics', serve_metrics)
+    admin_app.router.add_get('/admin/config', admin_get_config)
+    admin_app.router.add_put('/admin/routing-mode', admin_set_routing_mode)
+    admin_app.router.add_put('/admin/tuning', admin_set_tuning)
+    admin_app.router.add_post('/admin/backends', admin_add_backend)
+    admin_app.router.add_post('/admin/backends/drain', admin_drain_backend)
+    admin_app.router.add_delete('/admin/backends', admin_remove_backend)
+    admin_app.router.add_post('/admin/profile', admin_run_profile)
+    admin_app.router.add_delete('/admin/profile', admin_stop_profile)
+    admin_runner = web.AppRunner(admin_app)
+    await admin_runner.setup()
+    await web.TCPSite(admin_runner, host=host_address, port=admin_port).start()
+    logger.info("Metrics on http://%s:%s/metrics, admin API %s", host_address, admin_port, 'enabled' if ADMIN_TOKEN else 'disabled')
+    return admin_runner
+
+async def start_access_log(app):
+    await access_log_writer.start()
+    await health_events_writer.start()
+
+async def flush_access_log(app):
+    await access_log_writer.close()
+    await health_events_writer.close()
+
+async def report_hedge_stats(app):
+    if hedging_enabled:
+        logger.info("Hedging: %s", hedge_stats.summary())
+
+async def report_admission_stats(app):
+    if admission_enabled:
+        logger.info("Admission: %s", admission_controller.summary())
+
+async def report_cache_stats(app):
+    for revalidation_task in list(revalidation_tasks):
+        revalidation_task.cancel()
+    if caching_enabled:
+        logger.info("Cache: %s entries=%d bytes=%d", response_cache.stats.summary(), len(response_cache), response_cache.total_bytes)
+
+async def report_coalescing_stats(app):
+    if coalescing_enabled:
+        logger.info("Coalescing: %s", request_coalescer.stats.summary())
+
+async def report_proxy_overhead(app):
+    if proxy_metrics.overhead:
+        logger.info("Proxy overhead: %s", proxy_metrics.overhead_summary())
+
+async def start_health_checks(app):
+    health_tracker.start()
+
+async def stop_health_checks(app):
+    await health_tracker.stop()
+
+async def launch_proxy_server(host_address, server_port, mode_of_operation, stream_bodies=False, reuse_port=False,
+                              hedge_requests=False, hedge_delay_ms=None, cache_responses=False,
+                              cache_default_ttl_s=CACHE_DEFAULT_TTL_S, coalesce_requests=False,
+                              admission_control=False, max_concurrency=ADMISSION_MAX_CONCURRENCY,
+                              hash_key=HASH_KEY_SOURCE, tail_percentile=TAIL_LATENCY_PERCENTILE,
+                              metrics_port=METRICS_PORT, log_level=CONSOLE_LOG_LEVEL,
+                              log_sample_rate=CONSOLE_LOG_SAMPLE_RATE, log_format=CONSOLE_LOG_FORMAT, pool_settings=None):
+    global current_routing_mode, streaming_enabled, hedging_enabled, hedge_delay, caching_enabled, coalescing_enabled, \
+        admission_enabled, routing_key_of, TAIL_LATENCY_PERCENTILE, backend_pools
     current_routing_mode = mode_of_operation
+    routing_key_of = key_extractor(hash_key)
+    if not 0 < tail_percentile < 100:
+        raise ValueError(f"tail_percentile must be in (0, 100), got {tail_percentile}")
+    TAIL_LATENCY_PERCENTILE = tail_percentile
+    streaming_enabled = stream_bodies
+    hedging_enabled = hedge_requests
+    caching_enabled = cache_responses
+    response_cache.default_ttl_s = cache_default_ttl_s
+    coalescing_enabled = coalesce_requests
+    admission_enabled = admission_control
+    admission_controller.max_concurrency = max_concurrency
+    hedge_delay = HedgeDelay(fixed_ms=hedge_delay_ms, percentile=HEDGE_DELAY_PERCENTILE)
+    configure_logging(log_level, log_sample_rate, log_format, CONSOLE_LOG_QUEUE_MAX_SIZE) # Per process, so after forking workers
 
     app = web.Application()
-    app['client_session'] = ClientSession(connector=TCPConnector(limit=0)) # limit=0 means no limit on connections
+    backend_pools = BackendConnectionPools(BACKEND_SERVERS, pool_settings or default_pool_settings(), BACKEND_POOL_OVERRIDES,
+                                           trace_configs=[phase_trace_config()])
+    backend_pools.open()
+    app['backend_pools'] = backend_pools
     app.router.add_route('*', '/{path:.*}', process_proxy_request)
-    app.on_cleanup.append(cleanup_client_session)
+    app.on_startup.append(start_access_log)
+    app.on_startup.append(start_health_checks)
+    app.on_startup.append(prewarm_backend_pools)
+    app.on_cleanup.append(stop_health_checks)
+    app.on_cleanup.append(report_hedge_stats)
+    app.on_cleanup.append(report_admission_stats)
+    app.on_cleanup.append(report_cache_stats)
+    app.on_cleanup.append(report_coalescing_stats)
+    app.on_cleanup.append(report_proxy_overhead)
+    app.on_cleanup.append(close_backend_pools)
+    app.on_cleanup.append(flush_access_log)
 
     app_runner = web.AppRunner(app)
     await app_runner.setup()
-    site_runner = web.TCPSite(app_runner, host=host_address, port=server_port, backlog=1000)
+    site_runner = web.TCPSite(app_runner, host=host_address, port=server_port, backlog=1000, reuse_port=reuse_port)
     await site_runner.start()
 
-    print(f"Persistent proxy listening on http://{host_address}:{server_port} (mode={current_routing_mode})", flush=True)
-    await asyncio.Event().wait() # Keep server running indefinitely
+    logger.info("Persistent proxy listening on http://%s:%s (mode=%s, streaming=%s, pid=%d)",
+                host_address, server_port, current_routing_mode, streaming_enabled, os.getpid())
+    metrics_runner = await start_admin_server(host_address, metrics_port) if metrics_port else None
+    shutdown_requested = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, shutdown_requested.set)
+    try:
+        await shutdown_requested.wait() # Keep server running until SIGTERM or Ctrl+C
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await app_runner.cleanup() # Runs on_cleanup hooks so queued log entries are flushed
+        if dropped_log_records():
+            logger.warning("Console log: %d records dropped", dropped_log_records())
+        stop_logging()
+
+def parse_command_line():
+    parser = argparse.ArgumentParser(description="Reverse proxy with persistent backend connections")
+    parser.add_argument('mode', nargs='?', default="round-robin",
+                        help="Routing mode: round-robin, adaptive_sma, adaptive_ewma, least_outstanding, p2c_ewma, peak_ewma, tail_latency or consistent_hash")
+    parser.add_argument('--hash-key', default=HASH_KEY_SOURCE,
+                        help="Request attribute consistent_hash routes on: header:<name>, cookie:<name> or path:<segments>")
+    parser.add_argument('--tail-percentile', type=float, default=TAIL_LATENCY_PERCENTILE,
+                        help="Latency percentile tail_latency routes on (default: %(default)s)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Relay request and response bodies chunk by chunk instead of buffering them")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of processes sharing port 9090 via SO_REUSEPORT")
+    parser.add_argument('--hedge', action='store_true',
+                        help="Send a second copy of slow idempotent requests to another backend (buffered mode only)")
+    parser.add_argument('--hedge-delay-ms', type=float, default=None,
+                        help=f"Fixed hedge delay; defaults to the p{HEDGE_DELAY_PERCENTILE} of recent backend latency")
+    parser.add_argument('--cache', action='store_true',
+                        help="Serve repeated GET/HEAD requests from an in-memory response cache (buffered mode only)")
+    parser.add_argument('--cache-default-ttl-s', type=float, default=CACHE_DEFAULT_TTL_S,
+                        help="Also cache responses without max-age/s-maxage for this long (default: %(default)s, off)")
+    parser.add_argument('--coalesce', action='store_true',
+                        help="Let concurrent identical GET/HEAD requests share one backend request (buffered mode only)")
+    parser.add_argument('--admission', action='store_true',
+                        help="Limit concurrent requests per backend, queue the excess briefly and shed the rest with 503")
+    parser.add_argument('--max-concurrency', type=int, default=ADMISSION_MAX_CONCURRENCY,
+                        help="Concurrent requests per backend allowed by --admission")
+    parser.add_argument('--metrics-port', type=int, default=METRICS_PORT,
+                        help=f"Admin port for /metrics and the /admin/ API (0 disables it; /admin/ also needs ${ADMIN_TOKEN_ENV})")
+    parser.add_argument('--pool-max-connections', type=int, default=POOL_MAX_CONNECTIONS_PER_BACKEND,
+                        help="Maximum connections per backend (0 = unlimited)")
+    parser.add_argument('--pool-keepalive-s', type=float, default=POOL_KEEPALIVE_TIMEOUT_S,
+                        help="Close backend connections idle for longer than this")
+    parser.add_argument('--pool-max-requests', type=int, default=POOL_MAX_REQUESTS_PER_CONNECTION,
+                        help="Close a backend connection after this many requests (0 = unlimited)")
+    parser.add_argument('--prewarm', type=int, default=POOL_PREWARM_CONNECTIONS,
+                        help="Connections to open to each backend at startup")
+    parser.add_argument('--log-level', choices=LOG_LEVELS, default=CONSOLE_LOG_LEVEL,
+                        help="Console log level; 'debug' adds per-request records")
+    parser.add_argument('--log-sample-rate', type=float, default=CONSOLE_LOG_SAMPLE_RATE,
+                        help="Share of requests (0-1) that write debug records")
+    parser.add_argument('--log-format', choices=LOG_FORMATS, default=CONSOLE_LOG_FORMAT,
+                        help="Console log format")
+    return parser.parse_args()
+
+def pool_settings_from_arguments(arguments):
+    return PoolSettings(
+        max_connections=arguments.pool_max_connections,
+        keepalive_timeout_s=arguments.pool_keepalive_s,
+        max_requests_per_connection=arguments.pool_max_requests,
+        prewarm_connections=arguments.prewarm,
+        dns_cache_ttl_s=POOL_DNS_CACHE_TTL_S
+    )
 
 if __name__ == '__main__':
-    selected_mode = sys.argv[1] if len(sys.argv) > 1 else "round-robin"
-    asyncio.run(launch_proxy_server('0.0.0.0', 9090, selected_mode))
+    arguments = parse_command_line()
+    if arguments.workers > 1:
+        share_backend_metrics_across_workers()
+        access_log_writer.prepare_file()
+        health_events_writer.prepare_file()
+        run_worker_processes(arguments.workers, lambda worker_index: asyncio.run(
+            launch_proxy_server('0.0.0.0', 9090, arguments.mode, arguments.stream, reuse_port=True,
+                                hedge_requests=arguments.hedge, hedge_delay_ms=arguments.hedge_delay_ms,
+                                cache_responses=arguments.cache, cache_default_ttl_s=arguments.cache_default_ttl_s,
+                                coalesce_requests=arguments.coalesce,
+                                admission_control=arguments.admission, max_concurrency=arguments.max_concurrency,
+                                hash_key=arguments.hash_key, tail_percentile=arguments.tail_percentile,
+                                metrics_port=arguments.metrics_port and arguments.metrics_port + worker_index,
+                                log_level=arguments.log_level, log_sample_rate=arguments.log_sample_rate,
+                                log_format=arguments.log_format,
+                                pool_settings=pool_settings_from_arguments(arguments))))
+    else:
+        asyncio.run(launch_proxy_server('0.0.0.0', 9090, arguments.mode, arguments.stream,
+                                        hedge_requests=arguments.hedge, hedge_delay_ms=arguments.hedge_delay_ms,
+                                        cache_responses=arguments.cache, cache_default_ttl_s=arguments.cache_default_ttl_s,
+                                        coalesce_requests=arguments.coalesce, metrics_port=arguments.metrics_port,
+                                        admission_control=arguments.admission, max_concurrency=arguments.max_concurrency,
+                                        hash_key=arguments.hash_key, tail_percentile=arguments.tail_percentile,
+                                        pool_settings=pool_settings_from_arguments(arguments),
+                                        log_level=arguments.log_level, log_sample_rate=arguments.log_sample_rate,
+                                        log_format=arguments.log_format))
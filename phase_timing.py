@@ -0,0 +1,50 @@
+import time
+from aiohttp import TraceConfig
+
+# In request order; a request records only the phases it goes through
+PHASES = ('request_read', 'select', 'admission', 'connect', 'send', 'ttfb', 'body_read', 'backend_race', 'stream',
+          'respond', 'score', 'log')
+# Time spent waiting on the backend (or, for 'stream', on the backend and the client together) or held
+# back on purpose by admission control; everything else a forwarded request spends is proxy overhead
+NON_OVERHEAD_PHASES = frozenset(['admission', 'ttfb', 'body_read', 'backend_race', 'stream'])
+
+class PhaseTimer:
+    """perf_counter_ns stopwatch for one forwarded request. mark(phase) charges the time since
+    the previous mark to phase, so the phases always add up to the total."""
+
+    __slots__ = ('started_ns', 'last_ns', 'durations_ns')
+
+    def __init__(self):
+        self.started_ns = self.last_ns = time.perf_counter_ns()
+        self.durations_ns = {}
+
+    def mark(self, phase):
+        now = time.perf_counter_ns()
+        self.durations_ns[phase] = self.durations_ns.get(phase, 0) + now - self.last_ns
+        self.last_ns = now
+
+    def total_ns(self):
+        return self.last_ns - self.started_ns
+
+    def overhead_ns(self):
+        return self.total_ns() - sum(ns for phase, ns in self.durations_ns.items() if phase in NON_OVERHEAD_PHASES)
+
+    def as_us(self):
+        return {phase: ns // 1000 for phase, ns in self.durations_ns.items()}
+
+async def _mark_connected(session, context, params):
+    if context.trace_request_ctx is not None:
+        context.trace_request_ctx.mark('connect')
+
+async def _mark_headers_sent(session, context, params):
+    if context.trace_request_ctx is not None:
+        context.trace_request_ctx.mark('send')
+
+def phase_trace_config():
+    """aiohttp TraceConfig that splits connection acquisition and sending out of the time before
+    the response headers, for requests made with trace_request_ctx=<PhaseTimer>."""
+    trace_config = TraceConfig()
+    trace_config.on_connection_reuseconn.append(_mark_connected)
+    trace_config.on_connection_create_end.append(_mark_connected)
+    trace_config.on_request_headers_sent.append(_mark_headers_sent)
+    return trace_config
@@ -0,0 +1,60 @@
+import collections
+import os
+import sys
+import threading
+
+class SamplingProfiler:
+    """Statistical profiler for one thread, by default the one creating it (the event loop).
+
+    A background thread snapshots the target thread's Python stack every interval_s and counts
+    identical stacks, so the cost is independent of how much code runs in between. folded()
+    returns the counts in the collapsed-stack format (`outer;inner;leaf count` per line) read by
+    flamegraph.pl, speedscope and most other flame graph tools.
+    """
+
+    def __init__(self, thread_id=None, interval_s=0.005, max_depth=128):
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.interval_s = interval_s
+        self.max_depth = max_depth
+        self.stacks = collections.Counter()
+        self.samples = 0
+        self._frame_names = {} # code object -> rendered name, so a sample mostly does dict lookups
+        self._stop_requested = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample_until_stopped, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_requested.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _sample_until_stopped(self):
+        while not self._stop_requested.wait(self.interval_s):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                return # The profiled thread has exited
+            self.stacks[self._fold(frame)] += 1
+            self.samples += 1
+
+    def _fold(self, frame):
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            name = self._frame_names.get(code)
+            if name is None:
+                # ';' separates frames and the last space separates the count in the folded format
+                name = f"{code.co_name}({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(';', ':').replace(' ', '_')
+                self._frame_names[code] = name
+            names.append(name)
+            frame = frame.f_back
+        names.reverse()
+        return ';'.join(names)
+
+    def folded(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
@@ -0,0 +1,109 @@
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+LOG_LEVELS = ('debug', 'info', 'warning', 'error')
+LOG_FORMATS = ('text', 'json')
+
+logger = logging.getLogger('proxy')
+
+_request_sampled = contextvars.ContextVar('request_sampled', default=False)
+_sample_rate = 0.0
+_queue_handler = None
+_listener = None
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the event loop: records go onto a bounded queue untouched
+    (formatting happens on the listener thread) and are counted and dropped when it is full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped_records = 0
+
+    def prepare(self, record):
+        return record # The base class formats here, i.e. on the calling thread
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped_records += 1
+
+class StructuredFormatter(logging.Formatter):
+    """Renders a record's message plus the fields passed as extra={'fields': {...}},
+    either as `key=value` pairs after the message or as one JSON object per line."""
+
+    def __init__(self, log_format='text'):
+        super().__init__()
+        self.log_format = log_format
+
+    def format(self, record):
+        timestamp = datetime.datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds')
+        fields = getattr(record, 'fields', {})
+        if self.log_format == 'json':
+            entry = {'ts': timestamp, 'level': record.levelname.lower(), 'pid': record.process,
+                     'msg': record.getMessage(), **fields}
+            if record.exc_info:
+                entry['exc'] = self.formatException(record.exc_info)
+            return json.dumps(entry, default=str)
+        line = f"{timestamp} {record.levelname:<7} {record.getMessage()}"
+        if fields:
+            line += ' ' + ' '.join(f"{name}={json.dumps(value, default=str) if isinstance(value, (dict, list)) else value}"
+                                   for name, value in fields.items())
+        if record.exc_info:
+            line += '\n' + self.formatException(record.exc_info)
+        return line
+
+def configure_logging(level='info', sample_rate=1.0, log_format='text', max_queue_size=10000, stream=None):
+    """Route the 'proxy' logger through a bounded queue to a background thread writing to stream.
+
+    Debug records are per-request; only the share of requests picked by begin_request_sampling()
+    emits them, and only when level is 'debug'. Call once per process (after forking workers).
+    """
+    global _sample_rate, _queue_handler, _listener
+    if level not in LOG_LEVELS:
+        raise ValueError(f"level must be one of {LOG_LEVELS}, got {level!r}")
+    if log_format not in LOG_FORMATS:
+        raise ValueError(f"log_format must be one of {LOG_FORMATS}, got {log_format!r}")
+    stop_logging()
+    stream_handler = logging.StreamHandler(stream or sys.stdout)
+    stream_handler.setFormatter(StructuredFormatter(log_format))
+    log_queue = queue.Queue(maxsize=max_queue_size)
+    _queue_handler = DroppingQueueHandler(log_queue)
+    logger.handlers[:] = [_queue_handler]
+    logger.setLevel(level.upper())
+    logger.propagate = False
+    _sample_rate = max(0.0, min(1.0, sample_rate))
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+
+def stop_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def dropped_log_records():
+    return _queue_handler.dropped_records if _queue_handler is not None else 0
+
+def begin_request_sampling():
+    # Decided once per request so a sampled request logs all its debug records and others log none;
+    # the context variable is inherited by tasks the request spawns (hedges, revalidations)
+    sampled = logger.isEnabledFor(logging.DEBUG) and (_sample_rate >= 1.0 or random.random() < _sample_rate)
+    _request_sampled.set(sampled)
+    return sampled
+
+def request_debug_enabled():
+    """True if the current request was sampled; check it before building costly debug fields."""
+    return _request_sampled.get()
+
+def debug_event(message, **fields):
+    # Per-request call sites check request_debug_enabled() first, so unsampled requests build no fields
+    if _request_sampled.get():
+        logger.debug(message, extra={'fields': fields})
@@ -0,0 +1,110 @@
+import collections
+import math
+import time
+
+class DDSketch:
+    """Streaming quantile sketch with relative-error guarantees (DDSketch).
+
+    Positive values fall into logarithmic buckets of width gamma = (1 + a) / (1 - a), so any
+    quantile is returned within relative error a of the true value whatever the distribution.
+    When more than max_bins buckets are in use the lowest ones are merged, which only costs
+    accuracy at the bottom of the distribution, not in the tail.
+    """
+
+    def __init__(self, relative_accuracy=0.01, max_bins=2048):
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.bins = collections.Counter()
+        self.count = 0
+
+    def add(self, value):
+        if value <= 0:
+            return
+        self.bins[math.ceil(math.log(value) / self._log_gamma)] += 1
+        self.count += 1
+        if len(self.bins) > self.max_bins:
+            self._collapse_lowest()
+
+    def merge(self, other):
+        self.bins.update(other.bins)
+        self.count += other.count
+        while len(self.bins) > self.max_bins:
+            self._collapse_lowest()
+
+    def quantile(self, q):
+        if self.count == 0:
+            return float('inf')
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen > rank:
+                return 2 * self._gamma ** index / (self._gamma + 1)
+        return 2 * self._gamma ** max(self.bins) / (self._gamma + 1)
+
+    def _collapse_lowest(self):
+        lowest, second = sorted(self.bins)[:2]
+        self.bins[second] += self.bins.pop(lowest)
+
+class SlidingQuantileSketch:
+    """DDSketches over a sliding wall-clock window, split into slices that expire one at a time.
+
+    Samples leave the window window_s after they were recorded whether or not new ones arrive,
+    so a backend that stops being picked loses its score instead of keeping a stale one.
+    The merged window and the quantiles read from it are cached: tail_latency routing asks every
+    backend on every pick, but only a recorded sample or an expired slice changes the answer.
+    """
+
+    def __init__(self, window_s=60.0, slices=6, relative_accuracy=0.01):
+        self.slice_s = window_s / slices
+        self.slices = slices
+        self.relative_accuracy = relative_accuracy
+        self._sketches = collections.deque() # (slice number, DDSketch), oldest first
+        self._merged = None # DDSketch of every live slice, rebuilt only after a slice expires
+        self._quantiles = {} # q -> value read from _merged since the last change
+        self.last_sample_at = None
+
+    def _expire(self, now):
+        oldest_kept = math.floor(now / self.slice_s) - self.slices + 1
+        while self._sketches and self._sketches[0][0] < oldest_kept:
+            self._sketches.popleft()
+            self._merged = None
+            self._quantiles.clear()
+
+    def add(self, value, now=None):
+        now = time.monotonic() if now is None else now
+        self._expire(now)
+        slice_number = math.floor(now / self.slice_s)
+        if not self._sketches or self._sketches[-1][0] != slice_number:
+            self._sketches.append((slice_number, DDSketch(self.relative_accuracy)))
+        self._sketches[-1][1].add(value)
+        if self._merged is not None:
+            self._merged.add(value)
+        self._quantiles.clear()
+        self.last_sample_at = now
+
+    def quantile(self, q, now=None):
+        """Value at quantile q over the window, or inf when the window holds no samples."""
+        self._expire(time.monotonic() if now is None else now)
+        value = self._quantiles.get(q)
+        if value is None:
+            if self._merged is None:
+                self._merged = DDSketch(self.relative_accuracy)
+                for _, sketch in self._sketches:
+                    self._merged.merge(sketch)
+            value = self._quantiles[q] = self._merged.quantile(q)
+        return value
+
+    def age_s(self, now=None):
+        """Seconds since the newest sample, or inf if there has never been one."""
+        if self.last_sample_at is None:
+            return float('inf')
+        return (time.monotonic() if now is None else now) - self.last_sample_at
+
+    def clear(self):
+        self._sketches.clear()
+        self._merged = None
+        self._quantiles.clear()
+        self.last_sample_at = None
@@ -0,0 +1,94 @@
+import heapq
+import itertools
+
+UNMEASURED = float('-inf') # Unmeasured backends sort first so each gets probed before scores are trusted
+
+class ScoreIndex:
+    """Indexed binary min-heap of backend scores.
+
+    update() sifts one backend to its new place in O(log n) and the lowest score sits at the
+    root. ascending() yields backends lowest score first without touching the rest of the heap,
+    so skipping k unroutable backends costs O(k log k) however large the pool is. Equal scores
+    keep the order backends were added in.
+    """
+
+    def __init__(self, backend_urls=()):
+        self._heap = [] # [score, order, url] entries
+        self._positions = {}
+        self._order = itertools.count()
+        for url in backend_urls:
+            self.add(url)
+
+    def __len__(self):
+        return len(self._heap)
+
+    def __contains__(self, url):
+        return url in self._positions
+
+    def score(self, url):
+        return self._heap[self._positions[url]][0]
+
+    def add(self, url, score=UNMEASURED):
+        if url in self._positions:
+            self.update(url, score)
+            return
+        self._heap.append([score, next(self._order), url])
+        self._positions[url] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+
+    def update(self, url, score):
+        index = self._positions[url]
+        previous_score = self._heap[index][0]
+        self._heap[index][0] = score
+        if score < previous_score:
+            self._sift_up(index)
+        elif score > previous_score:
+            self._sift_down(index)
+
+    def remove(self, url):
+        index = self._positions.pop(url)
+        last = self._heap.pop()
+        if index < len(self._heap):
+            self._heap[index] = last
+            self._positions[last[2]] = index
+            self._sift_up(index)
+            self._sift_down(self._positions[last[2]])
+
+    def ascending(self):
+        """Yield backend URLs lowest score first; only the entries actually visited are ordered."""
+        if not self._heap:
+            return
+        frontier = [(self._heap[0][0], self._heap[0][1], 0)]
+        while frontier:
+            _, _, index = heapq.heappop(frontier)
+            yield self._heap[index][2]
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(self._heap):
+                    heapq.heappush(frontier, (self._heap[child][0], self._heap[child][1], child))
+
+    def _less(self, i, j):
+        return self._heap[i][:2] < self._heap[j][:2]
+
+    def _swap(self, i, j):
+        self._heap[i], self._heap[j] = self._heap[j], self._heap[i]
+        self._positions[self._heap[i][2]] = i
+        self._positions[self._heap[j][2]] = j
+
+    def _sift_up(self, index):
+        while index > 0:
+            parent = (index - 1) // 2
+            if not self._less(index, parent):
+                break
+            self._swap(index, parent)
+            index = parent
+
+    def _sift_down(self, index):
+        while True:
+            smallest = index
+            for child in (2 * index + 1, 2 * index + 2):
+                if child < len(self._heap) and self._less(child, smallest):
+                    smallest = child
+            if smallest == index:
+                break
+            self._swap(index, smallest)
+            index = smallest
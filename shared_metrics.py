@@ -0,0 +1,85 @@
+import math
+import mmap
+import multiprocessing
+
+DOUBLE_SIZE = 8
+
+# Scalar per-backend fields kept in shared memory and their initial values.
+# None is stored as NaN; int defaults are read back as int.
+SCALAR_FIELDS = {
+    'ewma': None,
+    'inflight': 0,
+    'peak_ewma': None,
+    'peak_updated_at': 0.0,
+}
+
+class SharedLatencyWindow:
+    """Fixed-size ring of recent latencies that behaves like deque(maxlen=size)."""
+
+    def __init__(self, values, offset, size):
+        self._values = values
+        self._length_index = offset
+        self._position_index = offset + 1
+        self._samples_start = offset + 2
+        self.maxlen = size
+
+    def append(self, latency_ms):
+        position = int(self._values[self._position_index])
+        self._values[self._samples_start + position] = latency_ms
+        self._values[self._position_index] = (position + 1) % self.maxlen
+        self._values[self._length_index] = min(self.maxlen, self._values[self._length_index] + 1)
+
+    def clear(self):
+        self._values[self._length_index] = 0
+        self._values[self._position_index] = 0
+
+    def __len__(self):
+        return int(self._values[self._length_index])
+
+    def __iter__(self):
+        length = len(self)
+        oldest = (int(self._values[self._position_index]) - length) % self.maxlen
+        for i in range(length):
+            yield self._values[self._samples_start + (oldest + i) % self.maxlen]
+
+class SharedBackendSlot:
+    """Dict-like view over one backend's metrics, matching backend_performance_metrics entries."""
+
+    def __init__(self, values, offset, window_size):
+        self._values = values
+        self._scalar_offsets = {name: offset + i for i, name in enumerate(SCALAR_FIELDS)}
+        self._window = SharedLatencyWindow(values, offset + len(SCALAR_FIELDS), window_size)
+
+    def __getitem__(self, key):
+        if key == 'raw_latencies':
+            return self._window
+        value = self._values[self._scalar_offsets[key]]
+        default = SCALAR_FIELDS[key]
+        if math.isnan(value):
+            return None
+        return int(value) if isinstance(default, int) else value
+
+    def __setitem__(self, key, value):
+        self._values[self._scalar_offsets[key]] = math.nan if value is None else value
+
+    def __contains__(self, key):
+        return key == 'raw_latencies' or key in self._scalar_offsets
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+class SharedBackendMetrics:
+    """Per-backend routing metrics in an anonymous shared mapping, inherited by forked workers."""
+
+    def __init__(self, backend_urls, window_size):
+        self.window_size = window_size
+        slot_size = len(SCALAR_FIELDS) + 2 + window_size
+        self._buffer = mmap.mmap(-1, max(1, len(backend_urls) * slot_size) * DOUBLE_SIZE)
+        self._values = memoryview(self._buffer).cast('d')
+        self.lock = multiprocessing.Lock()
+        self.slots = {}
+        for i, url in enumerate(backend_urls):
+            slot = SharedBackendSlot(self._values, i * slot_size, window_size)
+            for name, default in SCALAR_FIELDS.items():
+                slot[name] = default
+            self.slots[url] = slot
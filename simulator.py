@@ -0,0 +1,327 @@
+import argparse
+import collections
+import csv
+import datetime
+import heapq
+import itertools
+import json
+import math
+import multiprocessing
+import random
+import time
+
+import health
+import persistent_proxy_server as proxy
+from backend_profiles import load_profile_specs, profile_for
+from consistent_hash import ConsistentHashRing
+from health import HealthTracker
+from score_index import ScoreIndex
+
+SIM_BACKEND_TIMEOUT_S = 10.0 # The proxy's backend request timeout
+SIM_CONCURRENCY = 100 # Closed-loop clients, like wrk -c100
+SIM_REQUESTS = 200000
+SIM_KEY_SPACE = 10000 # Distinct request keys when simulating consistent_hash
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+ARRIVAL, RESPONSE, BACKEND_FREE = range(3)
+
+PROXY_DEFAULTS = {name: getattr(proxy, name) for name in dir(proxy) if name.isupper()}
+
+class SimulatedClock:
+    """Stands in for the time module inside the proxy and health modules, so their
+    time.monotonic() calls read simulated seconds."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+class TraceProfile:
+    """Replays one backend's latencies from a proxy_log.csv in logged order, looping at the end.
+    Exposes the plan_request() interface of backend_profiles.BackendProfile."""
+
+    capacity = None
+
+    def __init__(self, samples):
+        self._samples = itertools.cycle(samples)
+
+    def plan_request(self, elapsed_s, in_flight):
+        latency_ms, status_code = next(self._samples)
+        if status_code >= 500:
+            return ('error', status_code, latency_ms)
+        return ('ok', latency_ms, 0)
+
+class SimulatedBackend:
+    """Serves requests on the simulated clock: at most profile.capacity at once, the rest wait FIFO."""
+
+    def __init__(self, url, profile):
+        self.url = url
+        self.profile = profile
+        self.busy = 0
+        self.waiting = collections.deque()
+
+def load_trace(path):
+    """Per-backend (latency_ms, status_code) samples and arrival offsets in seconds from a proxy_log.csv."""
+    samples = collections.defaultdict(list)
+    arrivals = []
+    with open(path, newline='') as log_file:
+        for row in csv.DictReader(log_file):
+            try:
+                latency_ms = float(row['latency_ms'])
+                status_code = int(float(row['status_code'] or 0))
+                logged_at = datetime.datetime.fromisoformat(row['timestamp']).timestamp()
+            except (KeyError, ValueError):
+                continue
+            if latency_ms > 0 and row.get('attempt', 'primary') in ('', 'primary'):
+                samples[row['backend_url']].append((latency_ms, status_code))
+                arrivals.append(logged_at - latency_ms / 1000) # Rows are written when the response finishes
+    if not samples:
+        raise ValueError(f"No usable rows in {path}")
+    arrivals.sort()
+    return dict(samples), [arrival - arrivals[0] for arrival in arrivals]
+
+def reset_proxy_state(backend_urls, mode, settings, clock):
+    """Point the proxy module's routing state at a fresh simulated pool."""
+    for name, value in PROXY_DEFAULTS.items():
+        setattr(proxy, name, value) # A pool process may have run other settings before this one
+    for name, value in settings.items():
+        if name not in PROXY_DEFAULTS:
+            raise ValueError(f"Unknown proxy setting {name}")
+        setattr(proxy, name, value)
+    proxy.time = health.time = clock
+    proxy.BACKEND_SERVERS[:] = backend_urls
+    proxy.rebuild_backend_cycler()
+    proxy.backend_performance_metrics.clear()
+    proxy.backend_performance_metrics.update({url: proxy.new_backend_performance_entry() for url in backend_urls})
+    proxy.score_indexes = {index_mode: ScoreIndex(backend_urls) for index_mode in proxy.score_indexes}
+    proxy.latency_sketches = {url: proxy.new_latency_sketch() for url in backend_urls}
+    proxy.tail_probes_sent_at = {}
+    proxy.hash_ring = ConsistentHashRing(backend_urls, vnodes=proxy.HASH_VIRTUAL_NODES)
+    proxy.current_routing_mode = mode
+    health_events = collections.Counter()
+
+    def on_health_event(url, event, detail):
+        health_events[event] += 1
+        if event == 'ejected':
+            proxy.reset_backend_performance(url)
+
+    proxy.health_tracker = HealthTracker(
+        backend_urls,
+        check_interval_s=0, # No active probes in simulation; passive outlier detection still ejects
+        failures_to_eject=proxy.CONSECUTIVE_FAILURES_TO_EJECT,
+        base_ejection_s=proxy.BASE_EJECTION_S,
+        max_ejection_s=proxy.MAX_EJECTION_S,
+        half_open_max_requests=proxy.HALF_OPEN_MAX_REQUESTS,
+        slow_start_s=proxy.SLOW_START_S,
+        on_event=on_health_event
+    )
+    return health_events
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return math.nan
+    return sorted_values[min(len(sorted_values) - 1, int(p / 100 * len(sorted_values)))]
+
+def simulate(run):
+    """Run one strategy/settings combination and return its summary.
+
+    run holds mode, settings (proxy constants to override), backends ({url: profile spec or
+    trace samples}), requests, concurrency or rate (closed or open loop), arrivals (trace offsets
+    for open-loop replay) and seed.
+    """
+    random.seed(run['seed']) # The proxy's p2c sampling and slow start draw from the random module
+    rng = random.Random(run['seed'])
+    clock = SimulatedClock()
+    health_events = reset_proxy_state(list(run['backends']), run['mode'], run['settings'], clock)
+    backends = {}
+    for url, spec in run['backends'].items():
+        if isinstance(spec, list):
+            profile = TraceProfile(spec)
+        else:
+            # Profiles without their own seed still get a reproducible, per-backend one
+            profile = profile_for(url, {url: {'seed': f"{run['seed']}:{url}", **spec}})
+        backends[url] = SimulatedBackend(url, profile)
+
+    requests = run['requests']
+    concurrency = run.get('concurrency')
+    arrivals = run.get('arrivals')
+    events = []
+    sequence = itertools.count()
+    issued = 0
+
+    def schedule_arrival(at_s):
+        nonlocal issued
+        if issued < requests:
+            heapq.heappush(events, (at_s, next(sequence), ARRIVAL, None))
+            issued += 1
+
+    def start_service(backend, request, now):
+        backend.busy += 1
+        plan = backend.profile.plan_request(now, backend.busy - 1)
+        if plan[0] == 'hang':
+            service_s, succeeded = plan[1], False
+        elif plan[0] == 'error':
+            service_s, succeeded = plan[2] / 1000, False
+        else:
+            service_s, succeeded = plan[1] / 1000, True
+        done_at = now + service_s
+        deadline = request[1] + SIM_BACKEND_TIMEOUT_S
+        if done_at > deadline:
+            # The proxy gives up at its timeout; the backend keeps the slot until it finishes
+            heapq.heappush(events, (max(now, deadline), next(sequence), RESPONSE, (backend, request, False, True)))
+            heapq.heappush(events, (done_at, next(sequence), BACKEND_FREE, backend))
+        else:
+            heapq.heappush(events, (done_at, next(sequence), RESPONSE, (backend, request, succeeded, False)))
+
+    def free_slot(backend, now):
+        backend.busy -= 1
+        if backend.waiting:
+            start_service(backend, backend.waiting.popleft(), now)
+
+    if concurrency:
+        for _ in range(min(concurrency, requests)):
+            schedule_arrival(0.0)
+    elif arrivals:
+        schedule_arrival(arrivals[0])
+    else:
+        schedule_arrival(rng.expovariate(run['rate']))
+
+    latencies_ms = []
+    served = collections.Counter()
+    errors = timeouts = 0
+    last_response_at = 0.0
+    keyed = run['mode'] == 'consistent_hash'
+    started_at = time.perf_counter()
+    while events:
+        now, _, kind, payload = heapq.heappop(events)
+        clock.now = now
+        if kind == ARRIVAL:
+            if not concurrency:
+                if arrivals:
+                    if issued < len(arrivals):
+                        schedule_arrival(arrivals[issued])
+                else:
+                    schedule_arrival(now + rng.expovariate(run['rate']))
+            request_key = f"key-{rng.randrange(SIM_KEY_SPACE)}" if keyed else None
+            url = proxy.select_next_backend(request_key=request_key)
+            proxy.begin_backend_request(url)
+            backend = backends[url]
+            request = (url, now)
+            if backend.profile.capacity is not None and backend.busy >= backend.profile.capacity:
+                backend.waiting.append(request)
+            else:
+                start_service(backend, request, now)
+        elif kind == RESPONSE:
+            backend, (url, sent_at), succeeded, timed_out = payload
+            latency_ms = round((now - sent_at) * 1000)
+            # Same order as forward_proxy_request: release, health, then the routing score
+            proxy.end_backend_request(url)
+            proxy.health_tracker.record_result(url, succeeded)
+            proxy.record_backend_performance(url, latency_ms)
+            latencies_ms.append(latency_ms)
+            last_response_at = now
+            served[url] += 1
+            errors += not succeeded
+            timeouts += timed_out
+            if not timed_out:
+                free_slot(backend, now)
+            if concurrency:
+                schedule_arrival(now)
+        else:
+            free_slot(payload, now)
+    wall_s = time.perf_counter() - started_at
+
+    latencies_ms.sort()
+    completed = len(latencies_ms)
+    return {
+        'mode': run['mode'],
+        'settings': run['settings'],
+        'requests': completed,
+        'simulated_s': last_response_at,
+        'throughput_rps': completed / last_response_at if last_response_at else math.nan,
+        'latency_ms': {f"p{p:g}": percentile(latencies_ms, p) for p in PERCENTILES},
+        'mean_ms': sum(latencies_ms) / completed if completed else math.nan,
+        'max_ms': latencies_ms[-1] if completed else math.nan,
+        'error_rate': errors / completed if completed else math.nan,
+        'timeouts': timeouts,
+        'load_share': {url: served[url] / completed for url in backends} if completed else {},
+        'health_events': dict(health_events),
+        'simulated_requests_per_wall_s': completed / wall_s if wall_s else math.nan,
+    }
+
+def parse_sweep(specs):
+    """['EWMA_ALPHA=0.1,0.2', 'LATENCY_WINDOW_SIZE=3,10'] -> every combination as a settings dict."""
+    axes = []
+    for spec in specs:
+        name, _, values = spec.partition('=')
+        if not values:
+            raise ValueError(f"Sweep must look like NAME=v1,v2,..., got {spec!r}")
+        axes.append([(name, json.loads(value)) for value in values.split(',')])
+    return [dict(combination) for combination in itertools.product(*axes)]
+
+def print_results(results):
+    settings_labels = [' '.join(f"{name}={value}" for name, value in result['settings'].items()) or '-'
+                       for result in results]
+    width = max(len('settings'), *map(len, settings_labels))
+    print(f"{'mode':<18} {'settings':<{width}} {'rps':>8} {'p50':>7} {'p95':>7} {'p99':>7} {'p99.9':>7} {'err%':>6}  load share")
+    for result, settings in zip(results, settings_labels):
+        latency = result['latency_ms']
+        shares = ' '.join(f"{url.rsplit('/', 1)[-1]}:{share:.0%}" for url, share in result['load_share'].items())
+        print(f"{result['mode']:<18} {settings:<{width}} {result['throughput_rps']:>8.0f} {latency['p50']:>7.0f} "
+              f"{latency['p95']:>7.0f} {latency['p99']:>7.0f} {latency['p99.9']:>7.0f} "
+              f"{result['error_rate'] * 100:>6.2f}  {shares}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline discrete-event simulation of the proxy's routing strategies")
+    parser.add_argument('--modes', nargs='+', default=['round-robin', 'adaptive_sma', 'adaptive_ewma'],
+                        choices=proxy.ROUTING_MODES)
+    parser.add_argument('--backends', nargs='+', default=['A', 'B', 'C'],
+                        help="Backend profile names; defaults to the original A/B/C latency patterns")
+    parser.add_argument('--profiles', help="Backend profile JSON file, as for backend_server.py")
+    parser.add_argument('--trace', help="Replay per-backend latencies from a proxy_log.csv instead of profiles")
+    parser.add_argument('--requests', type=int, default=SIM_REQUESTS)
+    load = parser.add_mutually_exclusive_group()
+    load.add_argument('--concurrency', type=int,
+                      help=f"Closed loop: clients that each send a request when the last one returns (default {SIM_CONCURRENCY})")
+    load.add_argument('--rate', type=float, help="Open loop: Poisson arrivals per simulated second")
+    load.add_argument('--replay-arrivals', action='store_true', help="Open loop at the arrival times in --trace")
+    parser.add_argument('--sweep', action='append', default=[], metavar='NAME=v1,v2',
+                        help="Proxy constant to vary, e.g. EWMA_ALPHA=0.1,0.2,0.5; repeat for a grid")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--jobs', type=int, default=multiprocessing.cpu_count(), help="Parallel simulation processes")
+    parser.add_argument('--output', help="Also write the results as JSON to this file")
+    arguments = parser.parse_args()
+
+    arrivals = None
+    if arguments.trace:
+        backends, arrivals = load_trace(arguments.trace)
+        if not arguments.replay_arrivals:
+            arrivals = None
+    elif arguments.replay_arrivals:
+        parser.error("--replay-arrivals needs --trace")
+    else:
+        specs = load_profile_specs(arguments.profiles)
+        backends = {f"sim://{name}": specs.get(name, specs.get('default', specs['A'])) for name in arguments.backends}
+    concurrency = arguments.concurrency or (None if arguments.rate or arrivals else SIM_CONCURRENCY)
+    requests = min(arguments.requests, len(arrivals)) if arrivals else arguments.requests
+
+    runs = [
+        {'mode': mode, 'settings': settings, 'backends': backends, 'requests': requests,
+         'concurrency': concurrency, 'rate': arguments.rate, 'arrivals': arrivals, 'seed': arguments.seed}
+        for mode in arguments.modes for settings in parse_sweep(arguments.sweep)
+    ]
+    started_at = time.perf_counter()
+    with multiprocessing.Pool(min(arguments.jobs, len(runs))) as pool:
+        results = pool.map(simulate, runs)
+    elapsed_s = time.perf_counter() - started_at
+    print_results(results)
+    total_requests = sum(result['requests'] for result in results)
+    print(f"\n{len(runs)} runs, {total_requests:,} simulated requests in {elapsed_s:.1f}s "
+          f"({total_requests / elapsed_s:,.0f} requests/s across {min(arguments.jobs, len(runs))} processes)")
+    if arguments.output:
+        with open(arguments.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+
+if __name__ == '__main__':
+    main()
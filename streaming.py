@@ -0,0 +1,25 @@
+from multidict import CIMultiDict
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# RFC 7230 section 6.1: these apply to a single connection and must not be forwarded
+HOP_BY_HOP_HEADERS = frozenset([
+    'connection',
+    'keep-alive',
+    'proxy-authenticate',
+    'proxy-authorization',
+    'proxy-connection',
+    'te',
+    'trailer',
+    'transfer-encoding',
+    'upgrade',
+])
+
+def strip_hop_by_hop_headers(headers):
+    connection_tokens = {
+        token.strip().lower()
+        for value in headers.getall('Connection', [])
+        for token in value.split(',')
+    }
+    excluded = HOP_BY_HOP_HEADERS | connection_tokens
+    return CIMultiDict((name, value) for name, value in headers.items() if name.lower() not in excluded)
@@ -0,0 +1,6 @@
+import os
+import sys
+
+# The modules live at the project root, next to the proxy scripts, as in benchmarks/
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
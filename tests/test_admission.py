@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, BackendOverloaded
+
+BACKEND_URL = 'http://localhost:8081'
+
+def test_full_queue_sheds_at_once():
+    controller = AdmissionController(max_concurrency=1, max_queue=0)
+
+    async def acquire_past_the_limit():
+        await controller.acquire(BACKEND_URL)
+        with pytest.raises(BackendOverloaded) as shed:
+            await controller.acquire(BACKEND_URL)
+        return shed.value
+
+    overload = asyncio.run(acquire_past_the_limit())
+    assert overload.reason == 'queue_full'
+    assert overload.retry_after_s == controller.retry_after_s
+    assert controller.snapshot()[BACKEND_URL]['shed'] == {'queue_full': 1}
+    assert controller.backends[BACKEND_URL].active == 1
+
+def test_waiter_is_shed_when_its_queue_wait_times_out():
+    controller = AdmissionController(max_concurrency=1, max_queue=4, target_s=0.01, interval_s=0.02)
+
+    async def wait_past_the_interval():
+        await controller.acquire(BACKEND_URL)
+        with pytest.raises(BackendOverloaded) as shed:
+            await controller.acquire(BACKEND_URL)
+        return shed.value
+
+    assert asyncio.run(wait_past_the_interval()).reason == 'queue_timeout'
+    state = controller.backends[BACKEND_URL]
+    assert not state.waiters
+    assert state.active == 1
+
+def test_standing_queue_cuts_waits_to_target():
+    controller = AdmissionController(max_concurrency=1, max_queue=4, target_s=0.01, interval_s=5.0)
+
+    async def wait_behind_a_standing_queue():
+        await controller.acquire(BACKEND_URL)
+        controller.backends[BACKEND_URL].last_empty_at -= 10 # The queue has not drained for longer than interval_s
+        started_at = asyncio.get_running_loop().time()
+        with pytest.raises(BackendOverloaded):
+            await controller.acquire(BACKEND_URL)
+        return asyncio.get_running_loop().time() - started_at
+
+    assert asyncio.run(wait_behind_a_standing_queue()) < 1.0
+
+def test_release_hands_the_slot_to_the_oldest_waiter():
+    controller = AdmissionController(max_concurrency=1, max_queue=4, interval_s=5.0)
+
+    async def queue_two_and_release():
+        await controller.acquire(BACKEND_URL)
+        first = asyncio.create_task(controller.acquire(BACKEND_URL))
+        second = asyncio.create_task(controller.acquire(BACKEND_URL))
+        await asyncio.sleep(0.01)
+        controller.release(BACKEND_URL)
+        await first
+        assert not second.done()
+        controller.release(BACKEND_URL)
+        await second
+
+    asyncio.run(queue_two_and_release())
+    state = controller.backends[BACKEND_URL]
+    assert state.active == 1
+    assert state.admitted == 3
+    assert state.queued == 2
+
+def test_cancelled_waiter_leaves_the_queue():
+    controller = AdmissionController(max_concurrency=1, max_queue=4, interval_s=5.0)
+
+    async def cancel_while_queued():
+        await controller.acquire(BACKEND_URL)
+        queued = asyncio.create_task(controller.acquire(BACKEND_URL))
+        await asyncio.sleep(0.01)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        controller.release(BACKEND_URL)
+
+    asyncio.run(cancel_while_queued())
+    state = controller.backends[BACKEND_URL]
+    assert not state.waiters
+    assert state.active == 0
+
+def test_slot_handed_to_a_cancelled_waiter_is_not_lost():
+    controller = AdmissionController(max_concurrency=1, max_queue=4, interval_s=5.0)
+
+    async def cancel_as_the_slot_arrives():
+        await controller.acquire(BACKEND_URL)
+        queued = asyncio.create_task(controller.acquire(BACKEND_URL))
+        await asyncio.sleep(0.01)
+        controller.release(BACKEND_URL) # Hands the slot over
+        queued.cancel() # before the waiter has run again
+        try:
+            await queued
+        except asyncio.CancelledError:
+            return # acquire() gave the slot back itself
+        controller.release(BACKEND_URL) # Admitted after all, so the caller owns the slot
+
+    asyncio.run(cancel_as_the_slot_arrives())
+    assert controller.backends[BACKEND_URL].active == 0
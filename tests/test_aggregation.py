@@ -0,0 +1,67 @@
+import collections
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregation import rolling_backend_latencies
+
+SMA_WINDOW = 10
+EWMA_ALPHA = 0.3
+
+def log_rows(length=500, seed=11):
+    generator = np.random.default_rng(seed)
+    latencies = generator.integers(1, 300, length).astype(float)
+    latencies[generator.random(length) < 0.05] = -1 # Refused connections, which the proxy does not score
+    return pd.DataFrame({'backend_port': generator.choice(['8081', '8082', '8083'], length), 'latency_ms': latencies},
+                        index=pd.RangeIndex(1000, 1000 + length)) # A window that does not start at 0
+
+def proxy_scores_before_each_row(df):
+    """What record_backend_performance would have held before each row, one row at a time."""
+    windows = collections.defaultdict(lambda: collections.deque(maxlen=SMA_WINDOW))
+    ewmas = {}
+    sma_rows, ewma_rows = [], []
+    for port, latency in zip(df['backend_port'], df['latency_ms']):
+        sma_rows.append({p: np.mean(w) for p, w in windows.items()})
+        ewma_rows.append(dict(ewmas))
+        if latency > 0:
+            windows[port].append(latency)
+            previous = ewmas.get(port)
+            ewmas[port] = latency if previous is None else EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * previous
+    return pd.DataFrame(sma_rows, index=df.index), pd.DataFrame(ewma_rows, index=df.index)
+
+def assert_frames_match(actual, expected):
+    pd.testing.assert_frame_equal(actual.sort_index(axis=1), expected.reindex(columns=actual.columns).sort_index(axis=1),
+                                  check_dtype=False, check_names=False)
+
+def test_matches_the_proxys_per_request_scores():
+    df = log_rows()
+    sma_before, ewma_before, _ = rolling_backend_latencies(df, SMA_WINDOW, EWMA_ALPHA)
+    expected_sma, expected_ewma = proxy_scores_before_each_row(df)
+
+    assert list(sma_before.index) == list(df.index)
+    assert_frames_match(sma_before, expected_sma)
+    assert_frames_match(ewma_before, expected_ewma)
+
+def test_final_state_matches_pandas_rolling_and_ewm():
+    df = log_rows()
+    _, _, state = rolling_backend_latencies(df, SMA_WINDOW, EWMA_ALPHA)
+
+    valid = df[df['latency_ms'] > 0].groupby('backend_port')['latency_ms']
+    for port, latencies in valid:
+        assert state.sma[port] == pytest.approx(latencies.rolling(SMA_WINDOW, min_periods=1).mean().iloc[-1])
+        assert state.ewma[port] == pytest.approx(latencies.ewm(alpha=EWMA_ALPHA, adjust=False).mean().iloc[-1])
+
+def test_batches_give_the_same_values_as_one_read():
+    df = log_rows()
+    sma_whole, ewma_whole, _ = rolling_backend_latencies(df, SMA_WINDOW, EWMA_ALPHA)
+
+    state = None
+    sma_parts, ewma_parts = [], []
+    for start in range(0, len(df), 37):
+        sma_part, ewma_part, state = rolling_backend_latencies(df.iloc[start:start + 37], SMA_WINDOW, EWMA_ALPHA, state)
+        sma_parts.append(sma_part)
+        ewma_parts.append(ewma_part)
+
+    assert_frames_match(pd.concat(sma_parts), sma_whole)
+    assert_frames_match(pd.concat(ewma_parts), ewma_whole)
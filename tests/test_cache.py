@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+from multidict import CIMultiDict
+
+import persistent_proxy_server
+import proxy_server_non_persistent
+from cache import CREDENTIAL_HEADERS, ResponseCache
+from coalescing import DEFAULT_KEY_HEADERS, RequestCoalescer
+
+def request_headers(**headers):
+    return CIMultiDict({name.replace('_', '-'): value for name, value in headers.items()})
+
+def store_response(cache, headers, response_headers=None, body=b'alice'):
+    key = cache.key_for('GET', '/account', headers)
+    stored = cache.store(key, 200, 'OK', CIMultiDict(response_headers or {}), body, now=0.0,
+                         authorized='Authorization' in headers)
+    return key, stored
+
+def test_credentialed_response_is_not_served_to_anonymous_request():
+    cache = ResponseCache(default_ttl_s=60.0)
+    store_response(cache, request_headers(Authorization='Bearer alice'), {'Cache-Control': 'public, max-age=60'})
+
+    entry, _ = cache.lookup(cache.key_for('GET', '/account', request_headers()), now=1.0)
+    assert entry is None
+
+def test_authorized_response_without_public_directive_is_not_stored():
+    cache = ResponseCache(default_ttl_s=60.0)
+    key, stored = store_response(cache, request_headers(Authorization='Bearer alice'), {'Cache-Control': 'max-age=60'})
+
+    assert not stored
+    assert cache.lookup(key, now=1.0)[0] is None
+
+def test_authorized_response_marked_public_is_served_to_the_same_credentials():
+    cache = ResponseCache(default_ttl_s=60.0)
+    key, stored = store_response(cache, request_headers(Authorization='Bearer alice'), {'Cache-Control': 'public, max-age=60'})
+
+    assert stored
+    assert cache.lookup(key, now=1.0)[0].body == b'alice'
+    bob_key = cache.key_for('GET', '/account', request_headers(Authorization='Bearer bob'))
+    assert cache.lookup(bob_key, now=1.0)[0] is None
+
+def test_cookie_is_part_of_the_key():
+    cache = ResponseCache(default_ttl_s=60.0)
+    store_response(cache, request_headers(Cookie='session=alice'))
+
+    assert cache.lookup(cache.key_for('GET', '/account', request_headers(Cookie='session=alice')), now=1.0)[0] is not None
+    assert cache.lookup(cache.key_for('GET', '/account', request_headers(Cookie='session=bob')), now=1.0)[0] is None
+    assert cache.lookup(cache.key_for('GET', '/account', request_headers()), now=1.0)[0] is None
+
+def test_anonymous_responses_are_still_cached():
+    cache = ResponseCache(default_ttl_s=60.0)
+    key, stored = store_response(cache, request_headers(), body=b'public page')
+
+    assert stored
+    assert cache.lookup(key, now=1.0)[0].body == b'public page'
+
+def test_coalescer_keys_on_the_same_credential_headers_as_the_cache():
+    assert set(CREDENTIAL_HEADERS) <= set(DEFAULT_KEY_HEADERS)
+    coalescer = RequestCoalescer()
+    assert coalescer.key_for('GET', '/account', request_headers(Cookie='session=alice')) != \
+        coalescer.key_for('GET', '/account', request_headers())
+
+def test_responses_without_freshness_are_not_cached_by_default():
+    cache = ResponseCache(default_stale_s=2.0)
+    key, stored = store_response(cache, request_headers())
+    assert not stored
+    assert cache.lookup(key, now=0.5)[0] is None
+
+    key, stored = store_response(cache, request_headers(), {'Cache-Control': 'max-age=60'})
+    assert stored
+
+@pytest.mark.parametrize('proxy', [persistent_proxy_server, proxy_server_non_persistent], ids=['persistent', 'non_persistent'])
+@pytest.mark.parametrize('method, response_headers, x_cache', [
+    ('GET', {'Cache-Control': 'max-age=60'}, 'MISS'),
+    ('GET', {}, 'BYPASS'), # Nothing says it may be cached
+    ('GET', {'Cache-Control': 'no-store'}, 'BYPASS'),
+    ('POST', {'Cache-Control': 'max-age=60'}, 'BYPASS'), # The cache is not consulted at all
+])
+def test_x_cache_is_miss_only_for_stored_responses(monkeypatch, proxy, method, response_headers, x_cache):
+    async def backend_answer(request):
+        return web.Response(text='page', headers=response_headers)
+
+    monkeypatch.setattr(proxy, 'forward_proxy_request', backend_answer)
+    monkeypatch.setattr(proxy, 'response_cache', ResponseCache())
+    monkeypatch.setattr(proxy, 'caching_enabled', True)
+    monkeypatch.setattr(proxy, 'streaming_enabled', False)
+    request = make_mocked_request(method, '/page')
+    cache_key = proxy.response_cache.key_for(request.method, request.path_qs, request.headers)
+
+    response = asyncio.run(proxy.fetch_proxy_response(request, cache_key))
+    assert response.headers['X-Cache'] == x_cache
+    assert len(proxy.response_cache) == (x_cache == 'MISS')
@@ -0,0 +1,80 @@
+import asyncio
+
+import pytest
+from aiohttp import TCPConnector, web
+
+from connection_pools import BackendConnectionPools, BackendConnector, PoolSettings
+
+async def start_backend(delay_s=0.0):
+    async def answer(request):
+        await asyncio.sleep(delay_s)
+        return web.Response(text='ok')
+
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', answer)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+def run_against_backend(exercise, delay_s=0.0, **settings):
+    async def run():
+        runner, url = await start_backend(delay_s)
+        pools = BackendConnectionPools([url], PoolSettings(**settings))
+        pools.open()
+        try:
+            await exercise(pools, url)
+            return pools.stats()[url]
+        finally:
+            await pools.close()
+            await runner.cleanup()
+
+    return asyncio.run(run())
+
+async def get(pools, url):
+    async with pools.session_for(url).get(f"{url}/work") as response:
+        await response.read()
+
+def test_sequential_requests_reuse_one_connection():
+    async def sequential(pools, url):
+        for _ in range(5):
+            await get(pools, url)
+
+    stats = run_against_backend(sequential)
+    assert (stats['created'], stats['reused'], stats['retired']) == (1, 4, 0)
+    assert (stats['idle'], stats['active']) == (1, 0)
+
+def test_connection_is_retired_after_max_requests():
+    async def sequential(pools, url):
+        for _ in range(5):
+            await get(pools, url)
+
+    stats = run_against_backend(sequential, max_requests_per_connection=2)
+    assert (stats['created'], stats['reused'], stats['retired']) == (3, 2, 2)
+    assert stats['idle'] == 1 # The third connection has served one request
+
+def test_concurrency_is_capped_at_max_connections():
+    async def concurrent(pools, url):
+        await asyncio.gather(*(get(pools, url) for _ in range(8)))
+
+    stats = run_against_backend(concurrent, delay_s=0.02, max_connections=2)
+    assert stats['created'] == 2
+    assert stats['reused'] == 6
+
+def test_prewarm_opens_the_configured_connections():
+    async def prewarm(pools, url):
+        assert await pools.prewarm() == {url: 3}
+
+    stats = run_against_backend(prewarm, delay_s=0.02, prewarm_connections=3)
+    assert (stats['created'], stats['idle']) == (3, 3)
+
+def test_missing_connector_internals_fail_at_startup(monkeypatch):
+    monkeypatch.setattr(TCPConnector, '_release', lambda self, key, protocol: None)
+
+    async def build_connector():
+        BackendConnector()
+
+    with pytest.raises(RuntimeError, match='_release'):
+        asyncio.run(build_connector())
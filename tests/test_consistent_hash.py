@@ -0,0 +1,67 @@
+import collections
+
+import pytest
+
+from consistent_hash import ConsistentHashRing, key_extractor
+
+BACKENDS = [f"http://localhost:{8081 + i}" for i in range(4)]
+KEYS = [f"user-{i}" for i in range(5000)]
+
+def owners(ring):
+    return {key: next(ring.walk(key)) for key in KEYS}
+
+def test_adding_a_backend_moves_only_the_keys_it_takes_over():
+    ring = ConsistentHashRing(BACKENDS, vnodes=100)
+    before = owners(ring)
+    ring.add('http://localhost:8085')
+    after = owners(ring)
+
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert all(after[key] == 'http://localhost:8085' for key in moved)
+    assert len(moved) / len(KEYS) == pytest.approx(1 / 5, abs=0.05)
+
+def test_removing_a_backend_moves_only_its_own_keys():
+    ring = ConsistentHashRing(BACKENDS, vnodes=100)
+    before = owners(ring)
+    ring.remove(BACKENDS[0])
+    after = owners(ring)
+
+    moved = [key for key in KEYS if before[key] != after[key]]
+    assert moved == [key for key in KEYS if before[key] == BACKENDS[0]]
+    assert BACKENDS[0] not in after.values()
+    assert len(moved) / len(KEYS) == pytest.approx(1 / 4, abs=0.05)
+
+def test_rings_built_in_any_order_agree():
+    assert owners(ConsistentHashRing(BACKENDS)) == owners(ConsistentHashRing(reversed(BACKENDS)))
+
+def test_bounded_load_spills_past_a_backend_at_capacity():
+    ring = ConsistentHashRing(BACKENDS, vnodes=100)
+    load = collections.Counter()
+    for key in KEYS[:1000]:
+        chosen, owner = ring.choose(key, BACKENDS, load.__getitem__, load_factor=1.25)
+        assert owner == next(ring.walk(key))
+        load[chosen] += 1 # Requests stay in flight, so the load only grows
+        assert max(load.values()) <= 1.25 * sum(load.values()) / len(BACKENDS) + 1
+    assert max(load.values()) <= 1.25 * 1000 / len(BACKENDS) + 1
+
+def test_owner_is_kept_while_it_is_under_capacity():
+    ring = ConsistentHashRing(BACKENDS, vnodes=100)
+    owner = next(ring.walk('user-1'))
+    assert ring.choose('user-1', BACKENDS, lambda url: 0) == (owner, owner)
+
+    overloaded = {owner: 100}
+    chosen, reported_owner = ring.choose('user-1', BACKENDS, lambda url: overloaded.get(url, 0))
+    assert reported_owner == owner
+    assert chosen != owner
+
+def test_unroutable_owner_hands_its_keys_to_the_next_backend():
+    ring = ConsistentHashRing(BACKENDS, vnodes=100)
+    owner, successor = list(ring.walk('user-1'))[:2]
+    candidates = [url for url in BACKENDS if url != owner]
+    assert ring.choose('user-1', candidates, lambda url: 0) == (successor, successor)
+
+def test_key_extractor_rejects_unknown_specs():
+    with pytest.raises(ValueError):
+        key_extractor('query:user')
+    with pytest.raises(ValueError):
+        key_extractor('path:0')
@@ -0,0 +1,52 @@
+import datetime
+import time
+
+import pandas as pd
+import pytest
+
+import dashboard
+from log_segments import LogSegments
+
+@pytest.fixture
+def non_utc_local_time(monkeypatch):
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+def test_epoch_ms_bound_is_read_in_the_local_clock_the_logs_use(non_utc_local_time):
+    logged_at = datetime.datetime(2026, 10, 16, 9, 30) # What datetime.now().isoformat() wrote to the log
+    epoch_ms = logged_at.timestamp() * 1000
+
+    assert dashboard.parse_time_bound(str(epoch_ms)) == pd.Timestamp(logged_at)
+
+def test_date_string_bound_is_taken_as_written():
+    assert dashboard.parse_time_bound('2026-10-16T09:30') == pd.Timestamp(2026, 10, 16, 9, 30)
+    assert dashboard.parse_time_bound('') is None
+
+@pytest.fixture
+def history_client(tmp_path, monkeypatch, non_utc_local_time):
+    log_path = tmp_path / 'proxy_log.csv'
+    log_path.write_text(
+        "timestamp,backend_url,latency_ms,status_code,routing_mode\n"
+        "2026-10-16T07:59:00,http://localhost:8081,10,200,round_robin\n"
+        "2026-10-16T08:01:00,http://localhost:8081,20,200,round_robin\n"
+    )
+    monkeypatch.setattr(dashboard, 'LOG_FILE', str(log_path))
+    monkeypatch.setattr(dashboard, 'log_segments', LogSegments(str(log_path)))
+    return dashboard.app.test_client()
+
+@pytest.mark.parametrize('start', ['2026-10-16T12:00:00Z', '2026-10-16T14:00:00+02:00'])
+def test_history_reads_offset_date_bounds_in_local_time(history_client, start):
+    response = history_client.get('/history', query_string={'start': start})
+
+    assert response.status_code == 200
+    assert response.get_json()['start'] == '2026-10-16T08:00:00' # New York is UTC-4 in October
+    assert [row['latency_ms'] for row in response.get_json()['rows']] == [20]
+
+@pytest.mark.parametrize('start', ['yesterday-ish', 'NaT', 'inf'])
+def test_history_rejects_unparseable_bounds(history_client, start):
+    response = history_client.get('/history', query_string={'start': start})
+
+    assert response.status_code == 400
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+from downsampling import downsample, lttb, min_max_buckets
+
+def latency_trace(length=10000, seed=10):
+    generator = np.random.default_rng(seed)
+    x = np.arange(length, dtype=float) * 1000 # Epoch-ms-like, strictly increasing
+    y = generator.lognormal(3, 0.5, length)
+    y[length // 3] = 5000.0 # A single slow request
+    return x, y
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+@pytest.mark.parametrize('target_points', [3, 100, 999])
+def test_keeps_endpoints_time_order_and_the_point_budget(method, target_points):
+    x, y = latency_trace()
+    sampled_x, sampled_y = downsample(x, y, target_points, method)
+
+    assert len(sampled_x) == len(sampled_y) <= target_points
+    assert np.all(np.diff(sampled_x) > 0)
+    assert set(zip(sampled_x, sampled_y)) <= set(zip(x, y)) # Only original points, never averages
+    if method == 'lttb':
+        assert len(sampled_x) == target_points
+        assert (sampled_x[0], sampled_x[-1]) == (x[0], x[-1])
+
+def test_lttb_keeps_an_isolated_spike():
+    x, y = latency_trace()
+    _, sampled_y = lttb(x, y, 200)
+    assert 5000.0 in sampled_y
+
+def test_minmax_keeps_every_buckets_extremes():
+    x, y = latency_trace()
+    _, sampled_y = min_max_buckets(x, y, 100)
+    assert sampled_y.max() == y.max()
+    assert sampled_y.min() == y.min()
+    for bucket in np.array_split(y, 50):
+        assert bucket.max() in sampled_y
+        assert bucket.min() in sampled_y
+
+@pytest.mark.parametrize('method', ['lttb', 'minmax'])
+def test_short_traces_are_returned_unchanged(method):
+    x, y = latency_trace(50)
+    sampled_x, sampled_y = downsample(x, y, 100, method)
+    assert np.array_equal(sampled_x, x)
+    assert np.array_equal(sampled_y, y)
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+import persistent_proxy_server
+import proxy_server_non_persistent
+from admission import AdmissionController, BackendOverloaded
+from health import HALF_OPEN, HEALTHY, HealthTracker
+
+BACKEND_URL = persistent_proxy_server.BACKEND_SERVERS[0]
+
+def half_open_tracker():
+    tracker = HealthTracker([BACKEND_URL], check_interval_s=0, healthy_threshold=2, half_open_max_requests=1,
+                            slow_start_s=0)
+    tracker._eject(BACKEND_URL, "test", now=0.0)
+    tracker.backends[BACKEND_URL].ejected_until = 0.0
+    assert tracker.is_routable(BACKEND_URL) # Backoff expired, so this moves it to half-open
+    assert tracker.backends[BACKEND_URL].state == HALF_OPEN
+    return tracker
+
+@pytest.fixture(params=[persistent_proxy_server, proxy_server_non_persistent], ids=['persistent', 'non_persistent'])
+def admitting_proxy(request, monkeypatch):
+    proxy = request.param
+    tracker = half_open_tracker()
+    controller = AdmissionController(max_concurrency=1, max_queue=1, target_s=5.0, interval_s=5.0)
+    monkeypatch.setattr(proxy, 'health_tracker', tracker)
+    monkeypatch.setattr(proxy, 'admission_controller', controller)
+    monkeypatch.setattr(proxy, 'admission_enabled', True)
+    return proxy, tracker, controller
+
+def test_shed_admission_returns_the_half_open_trial_slot(admitting_proxy):
+    proxy, tracker, controller = admitting_proxy
+
+    async def shed_trial_request():
+        controller.max_queue = 0
+        await controller.acquire(BACKEND_URL) # Another request holds the only slot and nothing may queue
+        tracker.on_selected(BACKEND_URL)
+        with pytest.raises(BackendOverloaded):
+            await proxy.admit_backend_request(BACKEND_URL)
+
+    asyncio.run(shed_trial_request())
+    assert tracker.backends[BACKEND_URL].trial_requests == 0
+    assert tracker.is_routable(BACKEND_URL)
+
+def test_cancelled_queued_request_returns_the_half_open_trial_slot(admitting_proxy):
+    proxy, tracker, controller = admitting_proxy
+
+    async def cancel_queued_trial_request():
+        await controller.acquire(BACKEND_URL)
+        tracker.on_selected(BACKEND_URL)
+        queued = asyncio.create_task(proxy.admit_backend_request(BACKEND_URL))
+        await asyncio.sleep(0.01)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+
+    asyncio.run(cancel_queued_trial_request())
+    assert tracker.backends[BACKEND_URL].trial_requests == 0
+    assert tracker.is_routable(BACKEND_URL)
+
+def test_passing_probes_recover_a_half_open_backend_with_a_stuck_trial_slot():
+    tracker = half_open_tracker()
+    tracker.on_selected(BACKEND_URL) # A trial request that never reports back
+    assert not tracker.is_routable(BACKEND_URL)
+
+    tracker.record_probe(BACKEND_URL, True)
+    assert tracker.backends[BACKEND_URL].state == HALF_OPEN
+    tracker.record_probe(BACKEND_URL, True)
+    assert tracker.backends[BACKEND_URL].state == HEALTHY
+    assert tracker.backends[BACKEND_URL].trial_requests == 0
+    assert tracker.is_routable(BACKEND_URL)
+
+def test_probes_do_not_skip_a_free_half_open_trial():
+    tracker = half_open_tracker()
+    for _ in range(3):
+        tracker.record_probe(BACKEND_URL, True)
+    assert tracker.backends[BACKEND_URL].state == HALF_OPEN # The next request is still the trial
@@ -0,0 +1,61 @@
+import asyncio
+import types
+
+import persistent_proxy_server as proxy
+from consistent_hash import ConsistentHashRing
+from health import HealthTracker
+from hedging import BackendReply, HedgeStats, RetryBudget
+from score_index import ScoreIndex
+
+PRIMARY_URL, HEDGE_URL = proxy.BACKEND_SERVERS[:2]
+
+class StubPools:
+    async def remove_backend(self, url):
+        pass
+
+async def fake_backend_attempt(backend_pools, request, backend_url, request_body):
+    """Mirrors send_backend_attempt: released in finally, and a cancelled loser takes a while to close."""
+    await proxy.admit_backend_request(backend_url)
+    try:
+        if backend_url == PRIMARY_URL:
+            await asyncio.sleep(0.05) # Slow enough that the hedge is sent
+            return BackendReply(200, 'OK', {}, b'primary', 50, 50)
+        await asyncio.sleep(10)
+    except asyncio.CancelledError:
+        await asyncio.sleep(0.05) # Closing the loser's connection yields to the removal task
+        raise
+    finally:
+        proxy.release_backend_request(backend_url)
+
+def test_backend_removed_while_its_hedged_win_is_finishing(monkeypatch):
+    monkeypatch.setattr(proxy, 'send_backend_attempt', fake_backend_attempt)
+    monkeypatch.setattr(proxy, 'backend_pools', StubPools())
+    monkeypatch.setattr(proxy, 'admission_enabled', False)
+    monkeypatch.setattr(proxy, 'DRAIN_POLL_INTERVAL_S', 0.01)
+    monkeypatch.setattr(proxy, 'retry_budget', RetryBudget())
+    monkeypatch.setattr(proxy, 'hedge_stats', HedgeStats())
+    monkeypatch.setattr(proxy.hedge_delay, '_current_ms', 10.0)
+    monkeypatch.setattr(proxy, 'BACKEND_SERVERS', list(proxy.BACKEND_SERVERS))
+    monkeypatch.setattr(proxy, 'backend_performance_metrics', dict(proxy.backend_performance_metrics))
+    monkeypatch.setattr(proxy, 'latency_sketches', dict(proxy.latency_sketches))
+    monkeypatch.setattr(proxy, 'backend_removal_tasks', {})
+    monkeypatch.setattr(proxy, 'health_tracker', HealthTracker(proxy.BACKEND_SERVERS))
+    monkeypatch.setattr(proxy, 'hash_ring', ConsistentHashRing(proxy.BACKEND_SERVERS))
+    monkeypatch.setattr(proxy, 'score_indexes', {mode: ScoreIndex(proxy.BACKEND_SERVERS) for mode in proxy.score_indexes})
+    request = types.SimpleNamespace(app={'backend_pools': None})
+
+    async def race_and_remove():
+        hedged = asyncio.create_task(proxy.process_hedged_request(request, PRIMARY_URL, None, None))
+        await asyncio.sleep(0.02) # Both attempts are in flight now
+        proxy.stop_routing_to(PRIMARY_URL)
+        proxy.backend_removal_tasks[PRIMARY_URL] = asyncio.create_task(proxy.finish_backend_removal(PRIMARY_URL))
+        response = await hedged
+        await asyncio.sleep(0.05)
+        return response
+
+    response = asyncio.run(race_and_remove())
+    assert response.status == 200
+    assert response.body == b'primary'
+    assert PRIMARY_URL not in proxy.backend_performance_metrics
+    assert PRIMARY_URL not in proxy.latency_sketches
+    assert proxy.backend_performance_metrics[HEDGE_URL]['inflight'] == 0
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from hedging import HedgeDelay, HedgeStats, RetryBudget, race_with_hedge
+
+PRIMARY_URL, ALTERNATE_URL = 'http://localhost:8081', 'http://localhost:8082'
+
+def run_race(attempt_s, budget=None, hedge_delay_s=0.01, failing=()):
+    """Race attempts that take attempt_s[url] seconds, recording which ones were cancelled."""
+    stats = HedgeStats()
+    cancelled = []
+
+    async def send_attempt(url):
+        try:
+            await asyncio.sleep(attempt_s[url])
+        except asyncio.CancelledError:
+            cancelled.append(url)
+            raise
+        if url in failing:
+            raise ConnectionError(url)
+        return url
+
+    async def race():
+        return await race_with_hedge(send_attempt, PRIMARY_URL, lambda url: ALTERNATE_URL, hedge_delay_s,
+                                     budget or RetryBudget(), stats, is_success=lambda reply: True)
+
+    return asyncio.run(race()), stats, cancelled
+
+def test_hedge_wins_when_the_primary_is_slow():
+    (outcome, role, url), stats, cancelled = run_race({PRIMARY_URL: 1.0, ALTERNATE_URL: 0.01})
+
+    assert (outcome, role, url) == (ALTERNATE_URL, 'hedge', ALTERNATE_URL)
+    assert stats.hedges_sent == 1
+    assert stats.hedge_wins == 1
+    assert cancelled == [PRIMARY_URL]
+    assert stats.losses_by_backend == {PRIMARY_URL: 1}
+
+def test_primary_that_answers_within_the_delay_sends_no_hedge():
+    (outcome, role, _), stats, cancelled = run_race({PRIMARY_URL: 0.0, ALTERNATE_URL: 0.01}, hedge_delay_s=1.0)
+
+    assert (outcome, role) == (PRIMARY_URL, 'primary')
+    assert stats.hedges_sent == 0
+    assert cancelled == []
+
+def test_primary_winning_after_a_hedge_cancels_the_hedge():
+    (_, role, _), stats, cancelled = run_race({PRIMARY_URL: 0.03, ALTERNATE_URL: 1.0})
+
+    assert role == 'primary'
+    assert stats.primary_wins_after_hedge == 1
+    assert cancelled == [ALTERNATE_URL]
+
+def test_failed_primary_is_retried_once():
+    (outcome, role, _), stats, _ = run_race({PRIMARY_URL: 0.0, ALTERNATE_URL: 0.0}, hedge_delay_s=1.0,
+                                             failing=(PRIMARY_URL,))
+
+    assert (outcome, role) == (ALTERNATE_URL, 'retry')
+    assert stats.retries_sent == 1
+
+def test_empty_budget_refuses_the_hedge():
+    budget = RetryBudget(percent=10.0, max_tokens=10.0, min_per_s=0.0)
+    budget.tokens = 0.0
+
+    (_, role, _), stats, _ = run_race({PRIMARY_URL: 0.05, ALTERNATE_URL: 0.0}, budget=budget)
+
+    assert role == 'primary'
+    assert stats.hedges_sent == 0
+    assert stats.budget_denied == 1
+
+def test_budget_earns_a_token_per_two_primaries_at_fifty_percent():
+    budget = RetryBudget(percent=50.0, max_tokens=10.0, min_per_s=0.0)
+    budget.tokens = 0.0
+    budget.deposit()
+    assert not budget.try_withdraw()
+    budget.deposit()
+    assert budget.try_withdraw()
+    assert not budget.try_withdraw()
+
+def test_delay_is_recomputed_every_fifty_observations():
+    delay = HedgeDelay(percentile=95, fallback_ms=100.0, recompute_every=50)
+    for latency_ms in range(1, 50):
+        delay.observe(float(latency_ms))
+    assert delay.delay_s() == pytest.approx(0.1) # Still the fallback after 49
+
+    delay.observe(50.0)
+    assert delay.delay_s() == pytest.approx(0.048) # p95 of 1..50 ms
+
+    for _ in range(49):
+        delay.observe(500.0)
+    assert delay.delay_s() == pytest.approx(0.048)
+    delay.observe(500.0)
+    assert delay.delay_s() == pytest.approx(0.5)
+
+def test_fixed_delay_ignores_observations():
+    delay = HedgeDelay(fixed_ms=25.0)
+    for _ in range(100):
+        delay.observe(500.0)
+    assert delay.delay_s() == pytest.approx(0.025)
@@ -0,0 +1,104 @@
+import asyncio
+import datetime
+import gzip
+import os
+
+import pandas as pd
+
+import access_log
+from access_log import AccessLogWriter
+from log_segments import LogSegments
+
+FIELDNAMES = ['timestamp', 'backend_url', 'latency_ms', 'status_code', 'routing_mode']
+BACKENDS = ['http://localhost:8081', 'http://localhost:8082']
+
+def log_entry(i, at=None):
+    at = at or datetime.datetime.now()
+    return {'timestamp': at.isoformat(), 'backend_url': BACKENDS[i % 2], 'latency_ms': i,
+            'status_code': 200, 'routing_mode': 'round_robin'}
+
+def write_through_writer(segments, entries):
+    writer = AccessLogWriter(segments.log_path, FIELDNAMES, batch_size=5, flush_interval_s=0.01, segments=segments)
+
+    async def write_all():
+        await writer.start()
+        for entry in entries:
+            await writer.submit(entry)
+            await asyncio.sleep(0) # Lets the writer take batches as they fill
+        await writer.close() # Also waits for the closed segments to be compressed and indexed
+
+    asyncio.run(write_all())
+    return writer
+
+def write_segment(segments, name, entries):
+    os.makedirs(segments.segment_dir, exist_ok=True)
+    path = os.path.join(segments.segment_dir, name)
+    pd.DataFrame(entries, columns=FIELDNAMES).to_csv(path, index=False)
+    return path
+
+def test_writer_rotates_the_live_log_into_indexed_gzip_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(access_log, 'SEGMENT_GRACE_S', 0)
+    segments = LogSegments(str(tmp_path / 'proxy_log.csv'), rotate_bytes=400)
+
+    writer = write_through_writer(segments, [log_entry(i) for i in range(60)])
+
+    index = segments.read_index()
+    assert len(index) >= 2
+    assert writer.closed_segments == len(index)
+    assert segments.pending_segments(min_age_s=0) == []
+    segment_rows = [pd.read_csv(os.path.join(segments.segment_dir, entry['file'])) for entry in index]
+    for entry, rows in zip(index, segment_rows):
+        assert entry['file'].endswith('.csv.gz')
+        assert entry['rows'] == len(rows)
+        assert entry['first_timestamp'] == rows['timestamp'].min()
+        assert entry['last_timestamp'] == rows['timestamp'].max()
+        assert entry['backends'] == rows['backend_url'].value_counts().to_dict()
+    live_rows = pd.read_csv(segments.log_path)
+    all_latencies = sorted(pd.concat(segment_rows + [live_rows])['latency_ms'])
+    assert all_latencies == list(range(60)) # Nothing lost or repeated across the rotations
+
+def test_segments_between_picks_overlapping_segments_for_a_backend(tmp_path):
+    segments = LogSegments(str(tmp_path / 'proxy_log.csv'))
+    day = datetime.datetime(2026, 10, 16)
+    for hour in (9, 10, 11):
+        at = day.replace(hour=hour)
+        path = write_segment(segments, f"proxy_log.{hour}.csv", [log_entry(0, at), log_entry(0, at.replace(minute=59))])
+        segments.finish_segment(path)
+
+    def hours(paths):
+        return [int(os.path.basename(path).split('.')[1]) for path in paths]
+
+    assert hours(segments.segments_between()) == [9, 10, 11]
+    assert hours(segments.segments_between('2026-10-16T10:30:00', '2026-10-16T11:00:00')) == [10, 11]
+    assert hours(segments.segments_between(end='2026-10-16T09:59:00')) == [9]
+    assert segments.segments_between(backend_url=BACKENDS[1]) == []
+
+def test_retention_drops_the_oldest_segments(tmp_path):
+    segments = LogSegments(str(tmp_path / 'proxy_log.csv'), retention_s=3600)
+    now = datetime.datetime.now()
+    old = segments.finish_segment(write_segment(segments, 'proxy_log.old.csv', [log_entry(0, now - datetime.timedelta(hours=2))]))
+    recent = segments.finish_segment(write_segment(segments, 'proxy_log.recent.csv', [log_entry(0, now)]))
+
+    assert [entry['file'] for entry in segments.read_index()] == [recent['file']]
+    assert not os.path.exists(os.path.join(segments.segment_dir, old['file']))
+
+    segments.retention_s = 0
+    segments.retention_bytes = 1 # Over budget, but the newest segment is always kept
+    newest = segments.finish_segment(write_segment(segments, 'proxy_log.newest.csv',
+                                                   [log_entry(0, now + datetime.timedelta(seconds=1))]))
+    assert [entry['file'] for entry in segments.read_index()] == [newest['file']]
+
+def test_segment_claimed_by_another_process_is_skipped(tmp_path):
+    segments = LogSegments(str(tmp_path / 'proxy_log.csv'))
+    path = write_segment(segments, 'proxy_log.claimed.csv', [log_entry(0)])
+    assert segments.finish_segment(path) is not None
+    assert segments.finish_segment(path) is None
+    assert len(segments.read_index()) == 1
+    with gzip.open(f"{path}.gz", 'rt') as compressed:
+        assert compressed.readline().strip() == ','.join(FIELDNAMES)
+
+def test_time_based_rotation_needs_rows(tmp_path):
+    segments = LogSegments(str(tmp_path / 'proxy_log.csv'), rotate_interval_s=60)
+    assert not segments.rotation_due(0, started_at=0, now=120)
+    assert not segments.rotation_due(100, started_at=100, now=120)
+    assert segments.rotation_due(100, started_at=0, now=120)
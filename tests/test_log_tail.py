@@ -0,0 +1,86 @@
+import os
+
+from log_tail import LogTail
+
+HEADER = "timestamp,backend_url,latency_ms,status_code,routing_mode\n"
+
+def row(latency_ms):
+    return f"2026-10-16T09:00:00,http://localhost:8081,{latency_ms},200,round_robin\n"
+
+def append(path, text):
+    with open(path, 'a') as log_file:
+        log_file.write(text)
+
+def latencies(df):
+    return list(df['latency_ms'])
+
+def test_reads_only_complete_new_lines(tmp_path):
+    path = tmp_path / 'proxy_log.csv'
+    path.write_text(HEADER + row(1) + row(2))
+    tail = LogTail(str(path))
+
+    assert latencies(tail.read_new_rows()) == [1, 2]
+    append(path, row(3) + "2026-10-16T09:00:00,http://localh") # The writer is mid-line
+    assert latencies(tail.read_new_rows()) == [3]
+    append(path, "ost:8081,4,200,round_robin\n")
+    assert latencies(tail.read_new_rows()) == [4]
+    assert tail.read_new_rows().empty
+
+def test_rotation_returns_the_old_files_last_rows_then_the_new_file(tmp_path):
+    path = tmp_path / 'proxy_log.csv'
+    path.write_text(HEADER + row(1))
+    tail = LogTail(str(path))
+    assert latencies(tail.read_new_rows()) == [1]
+
+    append(path, row(2)) # Written after the last read, just before rotation
+    os.replace(path, tmp_path / 'proxy_log.segment.csv')
+    path.write_text(HEADER + row(3))
+
+    assert latencies(tail.read_new_rows()) == [2, 3]
+    assert tail.rotation_count == 1
+    assert tail.reset_count == 1 # Only the first open
+
+def test_missing_file_resets_and_is_read_from_the_start_when_it_returns(tmp_path):
+    path = tmp_path / 'proxy_log.csv'
+    path.write_text(HEADER + row(1))
+    tail = LogTail(str(path))
+    tail.read_new_rows()
+    resets_before = tail.reset_count
+
+    os.remove(path)
+    assert tail.read_new_rows() is None
+    assert tail.reset_count > resets_before
+    path.write_text(HEADER + row(5))
+    assert latencies(tail.read_new_rows()) == [5]
+
+def test_truncated_file_is_read_again_from_the_start(tmp_path):
+    path = tmp_path / 'proxy_log.csv'
+    path.write_text(HEADER + row(1) + row(2))
+    tail = LogTail(str(path))
+    tail.read_new_rows()
+
+    with open(path, 'w') as log_file: # Same inode, shorter than the offset
+        log_file.write(HEADER + row(7))
+    assert latencies(tail.read_new_rows()) == [7]
+    assert tail.reset_count == 2
+
+def test_changed_columns_drop_the_old_generation(tmp_path):
+    path = tmp_path / 'proxy_log.csv'
+    path.write_text(HEADER + row(1))
+    tail = LogTail(str(path))
+    tail.read_new_rows()
+
+    append(path, row(2))
+    os.replace(path, tmp_path / 'proxy_log.1700000000.csv') # access_log.py sets it aside on a header change
+    path.write_text(HEADER.rstrip('\n') + ",ttfb_ms\n" + row(3).rstrip('\n') + ",1\n")
+
+    new_rows = tail.read_new_rows()
+    assert latencies(new_rows) == [3]
+    assert list(new_rows['ttfb_ms']) == [1]
+    assert tail.rotation_count == 0
+    assert tail.reset_count == 2
+
+def test_missing_file_before_the_first_read(tmp_path):
+    tail = LogTail(str(tmp_path / 'proxy_log.csv'))
+    assert tail.read_new_rows() is None
+    assert tail.reset_count == 0
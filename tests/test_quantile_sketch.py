@@ -0,0 +1,42 @@
+import random
+
+import pytest
+
+from quantile_sketch import DDSketch, SlidingQuantileSketch
+
+def fresh_window_quantile(window, q):
+    merged = DDSketch(window.relative_accuracy)
+    for _, sketch in window._sketches:
+        merged.merge(sketch)
+    return merged.quantile(q)
+
+def test_cached_quantiles_match_a_fresh_merge_as_samples_arrive():
+    window = SlidingQuantileSketch(window_s=60.0, slices=6)
+    generator = random.Random(7)
+    for step in range(600):
+        now = step * 0.25
+        window.add(generator.lognormvariate(3, 0.8), now)
+        for q in (0.5, 0.99):
+            assert window.quantile(q, now) == fresh_window_quantile(window, q)
+
+def test_expired_slice_is_dropped_from_the_cached_window():
+    window = SlidingQuantileSketch(window_s=60.0, slices=6)
+    window.add(1000.0, now=0.0)
+    window.add(10.0, now=30.0)
+    assert window.quantile(1.0, now=30.0) == pytest.approx(1000.0, rel=0.01)
+
+    assert window.quantile(1.0, now=65.0) == pytest.approx(10.0, rel=0.01)
+    assert window.quantile(1.0, now=95.0) == float('inf')
+
+def test_repeated_queries_do_not_merge_again(monkeypatch):
+    window = SlidingQuantileSketch(window_s=60.0, slices=6)
+    for now in range(0, 60, 5):
+        window.add(float(now + 1), now)
+    window.quantile(1.0, now=59.0)
+
+    merges = []
+    monkeypatch.setattr(DDSketch, 'merge', lambda self, other: merges.append(other))
+    window.quantile(1.0, now=59.0)
+    window.add(500.0, now=59.0)
+    assert window.quantile(1.0, now=59.0) == pytest.approx(500.0, rel=0.01)
+    assert merges == []
@@ -0,0 +1,61 @@
+import random
+
+from score_index import UNMEASURED, ScoreIndex
+
+def assert_heap_invariants(index):
+    heap = index._heap
+    for position, entry in enumerate(heap):
+        assert index._positions[entry[2]] == position
+        if position > 0:
+            assert heap[(position - 1) // 2][:2] <= entry[:2]
+    assert len(index._positions) == len(heap)
+
+def expected_order(scores, added_order):
+    return sorted(scores, key=lambda url: (scores[url], added_order[url]))
+
+def test_heap_holds_after_random_updates_and_removes():
+    generator = random.Random(19)
+    urls = [f"http://backend-{i}:8080" for i in range(200)]
+    index = ScoreIndex(urls)
+    scores = dict.fromkeys(urls, UNMEASURED)
+    added_order = {url: order for order, url in enumerate(urls)}
+    assert_heap_invariants(index)
+
+    for _ in range(2000):
+        url = generator.choice(list(scores))
+        action = generator.random()
+        if action < 0.8:
+            scores[url] = generator.choice([generator.uniform(1, 500), 50.0]) # Ties on 50.0 fall back to add order
+            index.update(url, scores[url])
+        elif action < 0.9 and len(scores) > 1:
+            del scores[url]
+            index.remove(url)
+        else:
+            new_url = f"http://backend-new-{len(added_order)}:8080"
+            added_order[new_url] = len(added_order)
+            scores[new_url] = UNMEASURED
+            index.add(new_url)
+        assert_heap_invariants(index)
+
+    assert len(index) == len(scores)
+    assert list(index.ascending()) == expected_order(scores, added_order)
+    for url, score in scores.items():
+        assert index.score(url) == score
+
+def test_ascending_yields_unmeasured_backends_first_and_stops_early():
+    index = ScoreIndex(['a', 'b', 'c', 'd'])
+    index.update('a', 30.0)
+    index.update('b', 10.0)
+    index.update('d', 20.0)
+
+    walk = index.ascending()
+    assert next(walk) == 'c'
+    assert next(walk) == 'b'
+    assert list(walk) == ['d', 'a']
+
+def test_removing_the_last_backend_empties_the_index():
+    index = ScoreIndex(['a'])
+    index.remove('a')
+    assert len(index) == 0
+    assert 'a' not in index
+    assert list(index.ascending()) == []
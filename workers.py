@@ -0,0 +1,44 @@
+import os
+import signal
+
+def run_worker_processes(worker_count, worker_main):
+    """Fork worker_count children that each run worker_main(), and wait for all of them.
+
+    SIGINT or SIGTERM received by the parent is forwarded to the workers as SIGTERM,
+    which each worker handles by flushing and closing cleanly.
+    """
+    worker_pids = []
+    for worker_index in range(worker_count):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                worker_main(worker_index)
+            except KeyboardInterrupt:
+                pass
+            except Exception as e:
+                print(f"Worker {worker_index} failed: {e}", flush=True)
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        worker_pids.append(pid)
+
+    def forward_termination(signum, frame):
+        for pid in worker_pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward_termination)
+    print(f"Started {worker_count} workers: {worker_pids}", flush=True)
+
+    remaining = set(worker_pids)
+    while remaining:
+        try:
+            pid, _ = os.wait()
+            remaining.discard(pid)
+        except KeyboardInterrupt:
+            forward_termination(signal.SIGINT, None)
+        except ChildProcessError:
+            break